@@ -0,0 +1,12 @@
+from django.db.backends.mysql import base
+
+from backend.db.backends.pooled import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def is_connection_usable(self, connection):
+        try:
+            connection.ping()
+        except self.Database.Error:
+            return False
+        return True
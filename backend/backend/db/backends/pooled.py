@@ -0,0 +1,80 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from backend.db.pool import ConnectionPool, get_pool
+
+# Defaults for OPTIONS['pool'] = True
+POOL_DEFAULTS = {
+    'max_size': 10,
+    'timeout': 10,
+    'max_lifetime': 3600,
+    'check_after': 30,
+}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Take connections from a ``ConnectionPool`` when ``OPTIONS['pool']`` is
+    set, either to ``True`` or to a dict overriding ``POOL_DEFAULTS``, like
+    Django's own PostgreSQL pool. Closing the Django connection returns the
+    raw connection to the pool.
+    """
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+        if options is True:
+            options = {}
+        return {**POOL_DEFAULTS, **options}
+
+    @property
+    def pool(self):
+        options = self.pool_options
+        if options is None or (hasattr(self, 'is_in_memory_db') and self.is_in_memory_db()):
+            return None
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured('Connection pooling does not support persistent connections (CONN_MAX_AGE).')
+        conn_params = self.get_connection_params()
+        return get_pool(
+            (self.alias, self.settings_dict['NAME']),
+            lambda: ConnectionPool(
+                lambda: self.create_connection(conn_params), self.is_connection_usable, **options
+            )
+        )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def create_connection(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def is_connection_usable(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return self.create_connection(conn_params)
+        return pool.acquire()
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        # Connections left mid-transaction or after errors are not reused
+        discard = self.errors_occurred or self.in_atomic_block
+        if not discard and not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                discard = True
+        pool.release(self.connection, discard=discard)
@@ -0,0 +1,167 @@
+"""
+Process-wide database connection pool.
+
+Django keeps one connection per thread and, with ``CONN_MAX_AGE = 0``, opens
+a new one for every request. Under ASGI each request also runs its database
+work on a fresh thread, so persistent connections are not reused either.
+The pool hands raw DB-API connections to whichever thread needs one and takes
+them back when Django closes its connection, so the TCP and authentication
+handshake is only paid when the pool grows.
+"""
+import threading
+import time
+from collections import deque
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+    """
+    At most ``max_size`` connections made by ``connect()``. Idle connections
+    unused for ``check_after`` seconds are checked with ``is_usable()`` before
+    being handed out, and connections older than ``max_lifetime`` seconds are
+    replaced. ``acquire()`` waits up to ``timeout`` seconds for a free slot.
+    """
+
+    def __init__(self, connect, is_usable, max_size=10, timeout=10, max_lifetime=3600, check_after=30):
+        if max_size < 1:
+            raise ImproperlyConfigured('The connection pool max_size must be at least 1.')
+        self.connect = connect
+        self.is_usable = is_usable
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.condition = threading.Condition()
+        self.idle = deque()  # (connection, created_at, released_at), most recent last
+        self.created_at = {}  # id(connection) -> created_at, for checked-out connections
+        self.active = 0
+        self.waiting = 0
+        # Counters exposed by stats()
+        self.acquired = 0
+        self.created = 0
+        self.closed = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            entry = self.reserve(started)
+            if entry is None:
+                # A free slot was reserved: open a new connection outside the lock
+                try:
+                    connection = self.connect()
+                except Exception:
+                    with self.condition:
+                        self.active -= 1
+                        self.condition.notify()
+                    raise
+                created_at = time.monotonic()
+                with self.condition:
+                    self.created += 1
+                    self.created_at[id(connection)] = created_at
+                break
+
+            connection, created_at, released_at = entry
+            now = time.monotonic()
+            if now - created_at < self.max_lifetime and (
+                    now - released_at < self.check_after or self.is_usable(connection)):
+                with self.condition:
+                    self.created_at[id(connection)] = created_at
+                break
+            self.close(connection)
+            with self.condition:
+                self.active -= 1
+                self.condition.notify()
+
+        waited = time.monotonic() - started
+        with self.condition:
+            self.acquired += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        return connection
+
+    def reserve(self, started):
+        """Take an idle connection, or ``None`` after reserving a slot for a new one."""
+        with self.condition:
+            while not self.idle and self.active >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s '
+                        f'({self.max_size} in use).'
+                    )
+                self.waiting += 1
+                try:
+                    self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            return self.idle.pop() if self.idle else None
+
+    def release(self, connection, discard=False):
+        with self.condition:
+            created_at = self.created_at.pop(id(connection), None)
+            self.active -= 1
+            if not discard and created_at is not None:
+                self.idle.append((connection, created_at, time.monotonic()))
+                self.condition.notify()
+                return
+            self.condition.notify()
+        self.close(connection)
+
+    def close(self, connection):
+        with self.condition:
+            self.closed += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for connection, _, _ in idle:
+            self.close(connection)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_size': self.max_size,
+                'active': self.active,
+                'idle': len(self.idle),
+                'waiting': self.waiting,
+                'acquired': self.acquired,
+                'created': self.created,
+                'closed': self.closed,
+                'timeouts': self.timeouts,
+                'wait_time_total_ms': round(self.wait_time * 1000, 3),
+                'wait_time_avg_ms': round(self.wait_time * 1000 / self.acquired, 3) if self.acquired else 0,
+                'wait_time_max_ms': round(self.max_wait_time * 1000, 3),
+            }
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    with pools_lock:
+        if key not in pools:
+            pools[key] = factory()
+        return pools[key]
+
+
+def pool_stats():
+    """Stats of every pool, keyed by database alias."""
+    with pools_lock:
+        items = list(pools.items())
+    return {alias: pool.stats() for (alias, _), pool in items}
@@ -0,0 +1,143 @@
+"""
+Primary/replica database routing.
+
+Writes, and every query of requests with unsafe methods, go to the
+``default`` primary. Other reads of requests go to one of the
+``DATABASE_REPLICAS`` aliases, picked at random once per request so a
+request sees a single, consistent replica. More replicas spread more reads.
+Reads outside requests (commands, workers) and inside a transaction on the
+primary stay on the primary, which alone sees rows written but not yet
+committed.
+
+Replicas lag behind the primary, so reads stick to the primary for the rest
+of a request once it has written, and ``ReplicaRoutingMiddleware`` keeps
+the client on the primary for ``REPLICA_LAG`` seconds after that with a
+cookie: whoever created or updated a vendor or service reads it back. Apps
+whose rows are claimed and updated in place (job queue, uploads, orders)
+always use the primary, as does code wrapped in ``use_primary()``, such as
+the loading of the process-wide caches of derived vendor data.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Seconds a replica may be behind the primary
+REPLICA_LAG = 5
+
+PRIMARY_COOKIE = 'db_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+routing_state = contextvars.ContextVar('routing_state', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_replica_lag():
+    return getattr(settings, 'REPLICA_LAG', REPLICA_LAG)
+
+
+class RoutingState:
+    """How the current request is routed; mutated in place so changes made in worker threads are kept."""
+
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+        self.replica = None
+
+
+@contextmanager
+def use_primary():
+    """Send the reads of the block to the primary, e.g. to refresh derived data right after a write."""
+    token = routing_state.set(RoutingState(primary=True))
+    try:
+        yield
+    finally:
+        routing_state.reset(token)
+
+
+def reads_are_current(since):
+    """
+    Whether the reads of the current request include every write made up to
+    the ``since`` timestamp, so their results may be cached.
+    """
+    if not get_replicas() or time.time() - since >= get_replica_lag():
+        return True
+    state = routing_state.get()
+    return state is not None and state.primary
+
+
+class PrimaryReplicaRouter:
+    primary_apps = {'jobs', 'documents', 'orders'}
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or model._meta.app_label in self.primary_apps:
+            return DEFAULT_DB_ALIAS
+        state = routing_state.get()
+        if state is None or state.primary or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.primary = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.get_state(request)
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self.stick(response, state)
+
+    async def __acall__(self, request):
+        state = self.get_state(request)
+        token = routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self.stick(response, state)
+
+    def get_state(self, request):
+        # Writes read what they change from the primary too
+        return RoutingState(primary=PRIMARY_COOKIE in request.COOKIES or request.method not in SAFE_METHODS)
+
+    def stick(self, response, state):
+        if state.wrote and get_replicas():
+            # Until the replicas have caught up with the write
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=get_replica_lag(), httponly=True, samesite='Lax')
+        return response
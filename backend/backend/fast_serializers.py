@@ -0,0 +1,88 @@
+"""
+Read-only serialization straight from ``.values()`` rows.
+
+``ValuesSerializer`` wraps a (possibly sparse) ``ModelSerializer`` and produces
+the same representation without building model instances or running the
+per-field machinery for every object: each field is reduced to a column and a
+converter up front, and nested many-to-many serializers are filled from one
+query on the through table plus one on the related table.
+"""
+from rest_framework import serializers
+from backend.instrumentation import serialization_timer
+
+
+def field_converter(field):
+    """Return a function converting a column value like ``field`` would, or ``None`` if as is."""
+    if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.BooleanField)):
+        # Database values already have the type these fields render
+        return None
+    if isinstance(field, serializers.FloatField):
+        return float
+    return field.to_representation
+
+
+class ValuesSerializer:
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.pk_name = model._meta.pk.attname
+        columns = {field.name for field in model._meta.concrete_fields}
+        # (name, column, converter) in output order; nested relations are
+        # represented ahead of time and stored in the row under their name
+        self.fields = []
+        self.relations = []  # (name, many-to-many field, ValuesSerializer)
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                self.relations.append((name, model._meta.get_field(field.source), ValuesSerializer(field.child)))
+                self.fields.append((name, name, None))
+            else:
+                self.fields.append((name, field.source, field_converter(field)))
+        self.columns = list(dict.fromkeys(
+            [self.pk_name, *(column for _, column, _ in self.fields if column in columns)]
+        ))
+
+    def get_rows(self, queryset):
+        """Fetch the rows of ``queryset``, with the nested relations already represented."""
+        rows = list(queryset.values(*self.columns))
+        if rows and self.relations:
+            self.add_relations(rows)
+        return rows
+
+    def in_bulk(self, queryset, ids):
+        return {row[self.pk_name]: row for row in self.get_rows(queryset.filter(pk__in=ids))}
+
+    def add_relations(self, rows):
+        ids = [row[self.pk_name] for row in rows]
+        for name, relation, child in self.relations:
+            through = relation.remote_field.through
+            source = through._meta.get_field(relation.m2m_field_name()).attname
+            target = through._meta.get_field(relation.m2m_reverse_field_name()).attname
+            links = list(
+                through.objects.filter(**{f'{source}__in': ids}).order_by(target).values_list(source, target)
+            )
+            related = child.in_bulk(relation.related_model.objects.all(), {target_id for _, target_id in links})
+            grouped = {pk: [] for pk in ids}
+            for source_id, target_id in links:
+                if target_id in related:
+                    grouped[source_id].append(child.to_representation(related[target_id]))
+            for row in rows:
+                row[name] = grouped[row[self.pk_name]]
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, converter in self.fields:
+            if column not in row:
+                # Attributes outside the table (like a computed distance) are
+                # left out when not supplied, as the serializer skips them
+                continue
+            value = row[column]
+            data[name] = value if converter is None or value is None else converter(value)
+        return data
+
+    def represent(self, rows):
+        with serialization_timer():
+            return [self.to_representation(row) for row in rows]
+
+    def serialize(self, queryset):
+        return self.represent(self.get_rows(queryset))
@@ -0,0 +1,230 @@
+"""
+Opt-in per-endpoint request metrics.
+
+With ``REQUEST_METRICS`` enabled, ``RequestMetricsMiddleware`` records for
+every request its latency, the number and duration of its SQL queries, the
+time spent serializing and rendering, and the response size. Totals and
+histograms are kept per endpoint (method and URL route) in this process and
+served by ``/metrics/requests/``. Requests slower than
+``REQUEST_METRICS_SLOW_MS`` are logged with their query fingerprints.
+
+Queries are counted by a database execute wrapper installed on each new
+connection, and the current request is found through a context variable, so
+work handed to other threads by ``sync_to_async`` is attributed correctly.
+When the middleware is disabled nothing is installed.
+"""
+import bisect
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS_BYTES = (1024, 10240, 102400, 1048576, 10485760)
+
+SLOW_REQUEST_MS = 500
+
+current_request = contextvars.ContextVar('current_request', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_time', 'serialize_time', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serialize_time = 0.0
+        self.statements = Counter()
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query_time += time.perf_counter() - started
+        stats.queries += 1
+        stats.statements[sql] += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serialization_timer():
+    """Count the time spent in the block as serialization time of the current request."""
+    stats = current_request.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_time += time.perf_counter() - started
+
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql):
+    """Collapse literals and IN lists so statements differing only by values match."""
+    return LITERALS.sub('?', IN_LIST.sub('IN (...)', sql))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+
+    def as_dict(self):
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return dict(zip(labels, self.counts))
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.queries = 0
+        self.query_time_ms = 0.0
+        self.serialize_time_ms = 0.0
+        self.response_bytes = 0
+        self.latency_histogram = Histogram(LATENCY_BUCKETS_MS)
+        self.query_histogram = Histogram(QUERY_COUNT_BUCKETS)
+        self.size_histogram = Histogram(SIZE_BUCKETS_BYTES)
+
+    def observe(self, status_code, latency_ms, stats, size):
+        self.count += 1
+        self.errors += status_code >= 500
+        self.latency_ms += latency_ms
+        self.queries += stats.queries
+        self.query_time_ms += stats.query_time * 1000
+        self.serialize_time_ms += stats.serialize_time * 1000
+        self.latency_histogram.observe(latency_ms)
+        self.query_histogram.observe(stats.queries)
+        if size is not None:
+            self.response_bytes += size
+            self.size_histogram.observe(size)
+
+    def as_dict(self):
+        def average(total):
+            return round(total / self.count, 3) if self.count else 0
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'latency_ms_avg': average(self.latency_ms),
+            'queries_avg': average(self.queries),
+            'query_time_ms_avg': average(self.query_time_ms),
+            'serialize_time_ms_avg': average(self.serialize_time_ms),
+            'response_bytes_avg': average(self.response_bytes),
+            'latency_ms': self.latency_histogram.as_dict(),
+            'queries': self.query_histogram.as_dict(),
+            'response_bytes': self.size_histogram.as_dict(),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def observe(self, endpoint, *args):
+        with self.lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = EndpointMetrics()
+            metrics.observe(*args)
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: metrics.as_dict() for endpoint, metrics in sorted(self.endpoints.items())}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', SLOW_REQUEST_MS)
+        connection_created.connect(install_query_recorder, dispatch_uid='request-metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, stats, started)
+        return response
+
+    def observe(self, request, response, stats, started):
+        latency_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        endpoint = f"{request.method} /{match.route if match else '<unmatched>'}"
+        size = None if response.streaming else len(response.content)
+        registry.observe(endpoint, response.status_code, latency_ms, stats, size)
+        if latency_ms >= self.slow_ms:
+            fingerprints = Counter()
+            for sql, count in stats.statements.items():
+                fingerprints[fingerprint(sql)] += count
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, serialization %.1f ms, %s bytes; '
+                'top queries: %s',
+                request.method, request.get_full_path(), endpoint, latency_ms, stats.queries,
+                stats.query_time * 1000, stats.serialize_time * 1000, size,
+                '; '.join(f'{count}x {sql}' for sql, count in fingerprints.most_common(5)),
+            )
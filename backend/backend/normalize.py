@@ -0,0 +1,270 @@
+"""
+Parsers turning the free-text rating and pricing fields into numbers that
+can be stored in indexed columns, sorted and filtered on, the business hours
+into weekly opening intervals and the accepted file formats into a set of
+format names.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+# (max_digits, decimal_places) of the columns parsed amounts are stored in:
+# per-page rates, and charges such as minimums and base prices. Larger
+# amounts are treated as unparsed.
+RATE_DIGITS = (10, 4)
+CHARGE_DIGITS = (10, 2)
+
+# Largest review count a PositiveIntegerField holds on every database
+MAX_REVIEW_COUNT = 2147483647
+
+CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '₹': 'INR',
+    '€': 'EUR',
+    '£': 'GBP',
+}
+
+# "4.5/5 based on 100 reviews", "4.5 out of 5", "4.5 stars (100 reviews)"
+_RATING_RE = re.compile(r'(?P<value>\d+(?:\.\d+)?)\s*(?:/|out of)\s*(?P<scale>\d+)|(?P<stars>\d+(?:\.\d+)?)\s*stars?', re.I)
+_REVIEW_COUNT_RE = re.compile(r'(?P<count>\d[\d,]*)\s*(?:reviews?|ratings?)', re.I)
+
+_COLOR = r'colou?r'
+_BLACK_AND_WHITE = r'\bb\s*(?:&|/|and)?\s*w\b|black|mono(?:chrome)?|gr[ae]y(?:scale)?'
+# "₹0.80 per page", "$0.10/page", "₹1.00 per A4 sheet", "per page: $0.10", "$0.50 per colour page"
+_PER_PAGE_RE = re.compile(
+    r'(?P<symbol>[$₹€£])?\s*(?P<amount>\d+(?:\.\d+)?)\s*(?:per|/)\s*(?:a\d\s+)?'
+    rf'(?:(?P<kind>{_COLOR}|{_BLACK_AND_WHITE})(?:\s*(?:&|and)\s*white)?\s+)?(?:page|sheet|print)\b'
+    r'|per\s+(?:a\d\s+)?'
+    rf'(?:(?P<kind2>{_COLOR}|{_BLACK_AND_WHITE})(?:\s*(?:&|and)\s*white)?\s+)?(?:page|sheet|print)'
+    r'\s*:?\s*(?P<symbol2>[$₹€£])?\s*(?P<amount2>\d+(?:\.\d+)?)',
+    re.I,
+)
+# The label a price is listed under, like "Color:" in "B&W: $0.10/page, Color: $0.50/page", or
+# followed by, like "color" in "$0.10/page bw, $0.50/page color"
+_PRICE_LABEL_RE = re.compile(r'[^,;\n|]*$')
+_PRICE_SUFFIX_RE = re.compile(r'[^,;\n|]*')
+_COLOR_RE = re.compile(_COLOR, re.I)
+_BLACK_AND_WHITE_RE = re.compile(_BLACK_AND_WHITE, re.I)
+# "Minimum charge: $2", "min. order ₹50"; not "minimum 10 pages"
+_MINIMUM_RE = re.compile(
+    r'\bmin(?:imum|\.)?\s*(?:charge|order|fee|price|amount)?\s*(?:of|is)?\s*:?\s*(?P<symbol>[$₹€£])?\s*'
+    r'(?P<amount>\d+(?:\.\d+)?)\b(?!\s*(?:pages?|sheets?|prints?|copies|copy)\b)',
+    re.I,
+)
+_ANY_AMOUNT_RE = re.compile(r'(?P<symbol>[$₹€£])\s*(?P<amount>\d+(?:\.\d+)?)|(?P<bare>\d+(?:\.\d+)?)')
+
+# "PDF, DOCX, JPEG", "pdf/jpg", ".png; .tiff"
+_FILE_FORMAT_RE = re.compile(r'[a-z0-9]+', re.I)
+
+# Spellings of the same format, mapped to one name
+FILE_FORMAT_ALIASES = {
+    'jpg': 'jpeg',
+    'tif': 'tiff',
+    'htm': 'html',
+}
+
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MINUTES_PER_DAY = 24 * 60
+
+_DAY = r'\b(?:mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:rs?|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b\.?'
+_TIME = r'(?P<hour{n}>\d{{1,2}})(?:[:.](?P<minute{n}>\d{{2}}))?(?:\s*(?P<period{n}>[ap])\.?m\b\.?)?'
+# "Mon-Fri, 9 AM - 5 PM", "Mon-Sat 09:00-18:00; Sun closed", "Daily 10am-2pm, 4pm-8pm", "24/7"
+_HOURS_RE = re.compile(
+    rf'(?P<first>{_DAY})(?:\s*(?:-|–|to|through)\s*(?P<last>{_DAY}))?'
+    r'|(?P<group>weekdays|weekends?|daily|every\s*day|all\s+week)\b'
+    r'|(?P<always>24\s*/\s*7|24\s*hours|open\s+24\b)'
+    rf'|{_TIME.format(n=1)}\s*(?:-|–|to)\s*{_TIME.format(n=2)}'
+    r'|(?P<closed>\bclosed\b)',
+    re.I,
+)
+_DAY_GROUPS = {'weekday': range(5), 'weekend': range(5, 7)}
+
+
+def parse_rating(text):
+    """Return ``(average out of 5, review count)``; either may be None."""
+    if not text:
+        return None, None
+    average = None
+    match = _RATING_RE.search(text)
+    if match:
+        if match.group('stars') is not None:
+            average = Decimal(match.group('stars'))
+        elif int(match.group('scale')):
+            average = Decimal(match.group('value')) * 5 / int(match.group('scale'))
+        if average is not None:
+            average = min(average, Decimal(5)).quantize(Decimal('0.01'))
+    count = None
+    match = _REVIEW_COUNT_RE.search(text)
+    if match:
+        count = int(match.group('count').replace(',', ''))
+        if count > MAX_REVIEW_COUNT:
+            count = None
+    return average, count
+
+
+def parse_price_per_page(text):
+    """Return ``(price, currency code)`` of a per-page price, or ``(None, '')``."""
+    black_and_white, color, _, currency = parse_print_prices(text)
+    price = black_and_white if black_and_white is not None else color
+    return price, currency if price is not None else ''
+
+
+def parse_print_prices(text):
+    """
+    Return ``(black and white price, colour price, minimum charge, currency
+    code)`` of a pricing text; each price may be None. Per-page prices are
+    told apart by the words around them, and one listed for neither kind
+    applies to both.
+    """
+    text = text or ''
+    prices = {}
+    symbol = None
+    matches = list(_PER_PAGE_RE.finditer(text))
+    for index, match in enumerate(matches):
+        # A label before the price wins over one after it
+        label_start = matches[index - 1].end() if index else 0
+        label_end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        label = _PRICE_LABEL_RE.search(text, label_start, match.start()).group()
+        kind = _price_kind(match.group('kind') or match.group('kind2') or label) or \
+            _price_kind(_PRICE_SUFFIX_RE.match(text, match.end(), label_end).group())
+        prices.setdefault(kind, _decimal(match.group('amount') or match.group('amount2'), RATE_DIGITS))
+        symbol = symbol or match.group('symbol') or match.group('symbol2')
+    black_and_white = prices.get('black_and_white', prices.get(None))
+    color = prices.get('color', prices.get(None))
+    minimum = None
+    match = _MINIMUM_RE.search(text)
+    if match:
+        minimum = _decimal(match.group('amount'), CHARGE_DIGITS)
+        symbol = symbol or match.group('symbol')
+    if black_and_white is None and color is None and minimum is None:
+        symbol = None
+    return black_and_white, color, minimum, CURRENCY_SYMBOLS.get(symbol, '')
+
+
+def _price_kind(label):
+    if _COLOR_RE.search(label):
+        return 'color'
+    if _BLACK_AND_WHITE_RE.search(label):
+        return 'black_and_white'
+    return None
+
+
+def parse_amount(text):
+    """Return the first monetary amount in the text, preferring ones with a currency symbol."""
+    return parse_price(text)[0]
+
+
+def parse_price(text):
+    """
+    Return ``(amount, currency code)`` of the first monetary amount in the
+    text, preferring ones with a currency symbol, or ``(None, '')``. Bare
+    amounts have no currency code.
+    """
+    matches = list(_ANY_AMOUNT_RE.finditer(text or ''))
+    for match in matches:
+        if match.group('symbol'):
+            amount = _decimal(match.group('amount'), CHARGE_DIGITS)
+            return amount, CURRENCY_SYMBOLS[match.group('symbol')] if amount is not None else ''
+    for match in matches:
+        return _decimal(match.group('bare'), CHARGE_DIGITS), ''
+    return None, ''
+
+
+def normalize_file_format(name):
+    """Return the lowercase format name of an extension such as ``.JPG`` (``jpeg``)."""
+    name = name.strip().lstrip('.').lower()
+    return FILE_FORMAT_ALIASES.get(name, name)
+
+
+def parse_file_formats(text):
+    """Return the set of format names listed in an accepted file formats field."""
+    return frozenset(normalize_file_format(name) for name in _FILE_FORMAT_RE.findall(text or ''))
+
+
+def parse_business_hours(text):
+    """
+    Return the weekly opening intervals of a business hours text as sorted
+    ``(weekday, opens, closes)``, with Monday as weekday 0 and times in
+    minutes after midnight. Intervals past midnight are split over two days;
+    hours without days apply to every day. Unrecognized text gives no
+    intervals.
+    """
+    intervals = set()
+    pending_days = []  # days listed since the last hours
+    days = None  # the days the last hours applied to
+    for match in _HOURS_RE.finditer(text or ''):
+        if match.group('first') or match.group('group'):
+            pending_days.extend(_weekdays(match))
+            continue
+        if pending_days:
+            days, pending_days = pending_days, []
+        elif days is None:
+            days = range(7)
+        if match.group('closed'):
+            days = None
+        elif match.group('always'):
+            intervals.update((day, 0, MINUTES_PER_DAY) for day in days)
+        else:
+            opens, closes = _time_range(match)
+            for day in days:
+                if opens < closes:
+                    intervals.add((day, opens, closes))
+                else:
+                    # Open past midnight, or around the clock when both are equal
+                    intervals.add((day, opens, MINUTES_PER_DAY))
+                    if closes:
+                        intervals.add(((day + 1) % 7, 0, closes))
+    return sorted(intervals)
+
+
+def _weekdays(match):
+    group = match.group('group')
+    if group:
+        return list(_DAY_GROUPS.get(group.lower().rstrip('s'), range(7)))
+    first = WEEKDAYS.index(match.group('first')[:3].lower())
+    if not match.group('last'):
+        return [first]
+    last = WEEKDAYS.index(match.group('last')[:3].lower())
+    # "Fri-Mon" wraps around the weekend
+    return [(first + offset) % 7 for offset in range((last - first) % 7 + 1)]
+
+
+def _time_range(match):
+    """Return the opening and closing minutes of a time range, guessing missing AM/PM."""
+    opens_period, closes_period = match.group('period1'), match.group('period2')
+    # "9-5pm": the opening shares the closing's period unless that puts it after the closing
+    if opens_period is None and closes_period is not None:
+        opens_period = closes_period
+        if _minutes(match, 1, opens_period) > _minutes(match, 2, closes_period):
+            opens_period = 'a' if closes_period.lower() == 'p' else 'p'
+    opens = _minutes(match, 1, opens_period)
+    closes = _minutes(match, 2, closes_period)
+    if closes_period is None and closes <= opens and closes <= 12 * 60:
+        # "9 AM - 5", "9-5": a closing hour before the opening is in the afternoon
+        closes += 12 * 60
+    return opens % MINUTES_PER_DAY, min(closes, MINUTES_PER_DAY)
+
+
+def _minutes(match, n, period):
+    hour = int(match.group(f'hour{n}'))
+    minute = int(match.group(f'minute{n}') or 0)
+    if period is not None:
+        hour = hour % 12 + (12 if period.lower() == 'p' else 0)
+    return min(hour, 24) * 60 + min(minute, 59)
+
+
+def _decimal(value, digits=None):
+    """
+    ``value`` as a Decimal, rounded to the ``(max_digits, decimal_places)``
+    of ``digits`` when given; None when it is not a number or does not fit.
+    """
+    try:
+        value = Decimal(value)
+        if digits is not None:
+            max_digits, decimal_places = digits
+            value = value.quantize(Decimal(1).scaleb(-decimal_places))
+            if value.adjusted() >= max_digits - decimal_places:
+                return None
+        return value
+    except (InvalidOperation, TypeError):
+        return None
@@ -0,0 +1,90 @@
+"""
+Per-endpoint response cache with versioned keys.
+
+Each cached response depends on one or more *scopes* (for example
+``'services'`` or ``'vendor:12'``). A scope's version is a timestamp stored in
+the cache; bumping it makes every response that depends on the scope
+unreachable, and doubles as the Last-Modified time for conditional requests.
+Versions are bumped once the write commits, so that a request reading the
+old rows cannot cache them under the new version.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from backend.db.routers import reads_are_current
+
+CACHE_TIMEOUT = 300
+
+
+def version_key(scope):
+    return f'response-version:{scope}'
+
+
+def get_versions(scopes):
+    keys = {version_key(scope): scope for scope in scopes}
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        # add() so concurrent first requests agree on a single version
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Bump the versions of the scopes when the current transaction commits."""
+    def bump():
+        now = time.time()
+        cache.set_many({version_key(scope): now for scope in scopes}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def response_key(request, versions):
+    return hashlib.md5(f'{request.get_full_path()}|{versions}'.encode()).hexdigest()
+
+
+def cached_response(data, etag, last_modified):
+    response = Response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class CachedResponseMixin:
+    """
+    Cache the serialized data of successful GET responses and answer
+    conditional requests with 304 Not Modified. Views list the scopes their
+    response depends on in ``get_cache_scopes()``.
+    """
+    cache_timeout = CACHE_TIMEOUT
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        versions = get_versions(self.get_cache_scopes())
+        key = response_key(request, versions)
+        etag = quote_etag(key)
+        last_modified = int(max(versions))
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        data = cache.get(f'response:{key}')
+        if data is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data = response.data
+            if reads_are_current(max(versions)):
+                cache.set(f'response:{key}', data, self.cache_timeout)
+        return cached_response(data, etag, last_modified)
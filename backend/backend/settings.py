@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,9 +40,18 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'vendors',
     'services',
+    'jobs',
+    'documents',
+    'orders',
 ]
 
 MIDDLEWARE = [
+    # Per-endpoint query/latency metrics, only active with REQUEST_METRICS
+    'backend.instrumentation.RequestMetricsMiddleware',
+    # Keeps clients that just wrote on the primary database
+    'backend.db.routers.ReplicaRoutingMiddleware',
+    # Runs work deferred by model signals once the response is sent
+    'jobs.deferred.DeferredWorkMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,17 +85,108 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections come from a per-process pool of at most DB_POOL_SIZE connections
+# (backend/db/pool.py); set DB_POOL_SIZE=0 to use Django's persistent
+# connections instead, kept for DB_CONN_MAX_AGE seconds.
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'backend.db.backends.mysql',
         'NAME': 'bg_prints',
         'USER': 'root',
         'PASSWORD': 'harsh',
         'HOST': 'localhost',
         'PORT': '3305',
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'max_size': DB_POOL_SIZE,
+                # Seconds to wait for a free connection before failing the request
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                'max_lifetime': 3600,
+                # Idle connections unused for this long are pinged before reuse
+                'check_after': 30,
+            },
+        } if DB_POOL_SIZE else {},
     }
 }
 
+# Read replicas
+# Reads go to the replicas and writes to the default primary
+# (backend/db/routers.py). DB_REPLICA_HOSTS lists MySQL replicas of the
+# primary as comma-separated "host[:port]". Any other alias listed in
+# DATABASE_REPLICAS is a replica too, such as SQLite copies standing in for
+# replicas locally:
+#     DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'replica.sqlite3'}
+#     DATABASE_REPLICAS = ['replica']
+# Clients read from the primary for DB_REPLICA_LAG seconds after writing.
+
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # Tests read what they write through the primary's test database
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['backend.db.routers.PrimaryReplicaRouter']
+REPLICA_LAG = float(os.environ.get('DB_REPLICA_LAG', 5))
+
+
+# REST framework
+# JSON is rendered through orjson when it is installed (backend/renderers.py).
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (e.g. Redis or Memcached) when running several worker
+# processes, so response cache invalidations reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bg-prints',
+    }
+}
+
+
+# Request metrics
+# Opt-in per-endpoint query counts, timings and response sizes, served at
+# /metrics/requests/; requests slower than REQUEST_METRICS_SLOW_MS (ms) are
+# logged with their query fingerprints.
+
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', '') == '1'
+REQUEST_METRICS_SLOW_MS = int(os.environ.get('REQUEST_METRICS_SLOW_MS', 500))
+
+
+# Document uploads
+# Documents are uploaded in chunks (documents/uploads.py, which also reads
+# DOCUMENT_MAX_SIZE and DOCUMENT_CHUNK_MAX_SIZE) and kept under
+# DOCUMENT_STORAGE_ROOT.
+
+DOCUMENT_STORAGE_ROOT = Path(os.environ.get('DOCUMENT_STORAGE_ROOT', BASE_DIR / 'document_storage'))
+
+
+# Order dispatch
+# Orders are assigned to vendors and courier runs by the orders.tasks
+# dispatch_orders job (orders/dispatch.py, which also reads DISPATCH_WINDOW,
+# DISPATCH_HORIZON, DISPATCH_RADIUS_KM, DISPATCH_CANDIDATES, COURIER_RUN_SIZE
+# and DISPATCH_CLUSTER_PRECISION).
+
+DISPATCH_VENDOR_CAPACITY = int(os.environ.get('DISPATCH_VENDOR_CAPACITY', 50))
 
 
 # Password validation
@@ -118,6 +219,9 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Time zone of the business hours of vendors without one of their own
+BUSINESS_HOURS_TIME_ZONE = os.environ.get('BUSINESS_HOURS_TIME_ZONE', 'Asia/Kolkata')
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
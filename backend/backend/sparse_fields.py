@@ -0,0 +1,87 @@
+"""
+Sparse fieldsets: ``?fields=id,business_name`` picks the serialized fields,
+``?fields=compact`` a named set of them, and ``?expand=services`` adds nested
+relations a compact representation leaves out. Views load only the columns
+the selected fields need.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ALL_FIELDS
+
+
+def split_param(value):
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin accepting ``fields`` and ``expand`` keyword arguments.
+
+    ``default_fields`` is the representation used when no fields are asked
+    for (``None`` for every field), ``fieldsets`` maps names that may be
+    asked for in place of fields to lists of fields, and
+    ``expandable_fields`` maps expand names to the serializer fields they
+    add. ``fields='__all__'`` keeps every field.
+    """
+    default_fields = None
+    fieldsets = {}
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(fields, expand)
+        if selected is not None:
+            for name in [name for name in self.fields if name not in selected]:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, fields=None, expand=()):
+        """Names of the fields to serialize, or ``None`` for all of them."""
+        if fields is None:
+            fields = cls.default_fields
+        if fields is None or fields == ALL_FIELDS:
+            return None
+        fields = [field for name in fields for field in cls.fieldsets.get(name, [name])]
+        return {*fields, *(cls.expandable_fields[name] for name in expand)}
+
+    @classmethod
+    def available_fields(cls):
+        return set(cls(fields=ALL_FIELDS).fields)
+
+
+class SparseFieldsViewMixin:
+    """Read ``?fields=`` and ``?expand=`` for views using a ``SparseFieldsMixin`` serializer."""
+
+    def get_sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            serializer_class = self.serializer_class
+            fields = self.request.query_params.get('fields')
+            if fields is not None:
+                fields = split_param(fields)
+                unknown = set(fields) - serializer_class.available_fields() - set(serializer_class.fieldsets)
+                if not fields:
+                    raise ValidationError({'fields': 'At least one field is required.'})
+                if unknown:
+                    raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+            expand = split_param(self.request.query_params.get('expand', ''))
+            unknown = set(expand) - set(serializer_class.expandable_fields)
+            if unknown:
+                raise ValidationError({'expand': f"Must be among: {', '.join(serializer_class.expandable_fields)}."})
+            self._sparse_fields = fields, expand
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse_fields()
+        return super().get_serializer(*args, fields=fields, expand=expand, **kwargs)
+
+    def sparse_queryset(self, queryset):
+        """
+        Restrict ``queryset`` to the columns of the selected fields and
+        prefetch the selected many-to-many relations.
+        """
+        selected = self.serializer_class.selected_fields(*self.get_sparse_fields())
+        if selected is None:
+            selected = self.serializer_class.available_fields()
+        model = queryset.model
+        columns = [field.name for field in model._meta.concrete_fields if field.name in selected]
+        relations = [field.name for field in model._meta.many_to_many if field.name in selected]
+        return queryset.only(model._meta.pk.name, *columns).prefetch_related(*relations)
@@ -0,0 +1,64 @@
+"""
+Streaming JSON Lines exports.
+
+Rows are read in primary-key order, one chunk at a time, with a keyset
+condition (``pk > last seen``) rather than one long-running cursor, so
+memory stays flat whatever the table size, and the first records go out as
+soon as the first chunk is read.
+
+WSGI servers are given a plain iterator. Django would read an async one to
+the end before sending anything, so it is only used for requests served over
+ASGI, where a sync one would hold a worker thread for the whole download.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from backend.renderers import FastJSONRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def get_chunk(serializer, queryset, after, chunk_size):
+    queryset = queryset.order_by('pk')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    return serializer.get_rows(queryset[:chunk_size])
+
+
+def iter_json_lines(serializer, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one encoded chunk of ``serializer`` records, one JSON object per line, at a time."""
+    renderer = FastJSONRenderer()
+    after = None
+    while True:
+        rows = get_chunk(serializer, queryset, after, chunk_size)
+        if not rows:
+            return
+        yield b''.join(renderer.render(serializer.to_representation(row)) + b'\n' for row in rows)
+        if len(rows) < chunk_size:
+            return
+        after = rows[-1][serializer.pk_name]
+
+
+async def aiter_json_lines(serializer, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """``iter_json_lines`` for ASGI servers, reading each chunk in a worker thread."""
+    chunks = iter_json_lines(serializer, queryset, chunk_size)
+    while True:
+        chunk = await sync_to_async(next)(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def json_lines_response(request, serializer, queryset, filename, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream ``queryset`` as JSON Lines. ``serializer`` is a
+    ``backend.fast_serializers.ValuesSerializer``.
+    """
+    asgi = isinstance(getattr(request, '_request', request), ASGIRequest)
+    response = StreamingHttpResponse(
+        (aiter_json_lines if asgi else iter_json_lines)(serializer, queryset, chunk_size),
+        content_type='application/x-ndjson'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
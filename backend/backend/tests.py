@@ -0,0 +1,270 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from backend.db.pool import ConnectionPool, PoolTimeout, pools
+from backend.db.routers import PRIMARY_COOKIE, PrimaryReplicaRouter, reads_are_current, routing_state, use_primary
+from backend.db.routers import RoutingState
+from backend.instrumentation import fingerprint, registry
+from jobs.models import Job
+from jobs.queue import Worker
+from services.models import Service
+from vendors.hours import open_vendors
+from vendors.models import Vendor
+from vendors.quotes import pricing_rules
+from vendors.search import catalog_index
+from vendors.service_index import service_index
+
+
+class FakeConnection:
+    def __init__(self):
+        self.usable = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    def make_pool(self, **options):
+        return ConnectionPool(FakeConnection, lambda connection: connection.usable, **options)
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.stats()['created'], 2)
+        self.assertEqual(pool.stats()['active'], 2)
+
+    def test_waits_for_a_free_connection_then_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.5)
+        connection = pool.acquire()
+        threading.Timer(0.05, pool.release, [connection]).start()
+        self.assertIs(pool.acquire(), connection)
+        self.assertGreater(pool.stats()['wait_time_max_ms'], 0)
+
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_unusable_expired_and_discarded_connections_are_replaced(self):
+        pool = self.make_pool(max_size=1, check_after=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.usable = False
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+
+        pool.release(replacement, discard=True)
+        self.assertTrue(replacement.closed)
+
+        pool = self.make_pool(max_size=1, max_lifetime=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(), connection)
+
+
+class PooledDatabaseTestCase(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.alias = 'pooled'
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'backend.db.backends.sqlite3',
+            'NAME': self.path,
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {'pool': {'max_size': 2}},
+        }
+        self.connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, self.alias)
+        self.addCleanup(self.close_pool)
+
+    def close_pool(self):
+        self.connection.close()
+        pools.pop((self.alias, self.path)).close_idle()
+
+    def test_closed_connections_return_to_the_pool(self):
+        connection = self.connection
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = connection.connection
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(connection.connection, raw)
+
+        response = APIClient().get(reverse('db-pool-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[self.alias]['created'], 1)
+        self.assertEqual(response.data[self.alias]['acquired'], 2)
+
+
+@override_settings(REQUEST_METRICS=True, REQUEST_METRICS_SLOW_MS=0)
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.client = APIClient()
+        for index in range(3):
+            Service.objects.create(name=f"Service {index}", pricing=f"${index}")
+
+    def test_metrics_per_endpoint(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': 0})
+        with self.assertLogs('backend.instrumentation', 'WARNING') as logs:
+            self.client.get(url, {'latitude': 40.7, 'longitude': -74, 'limit': 5})
+            self.client.get(reverse('service-list'))
+        self.assertIn('Slow request GET /services/0/vendors/', logs.output[0])
+
+        metrics = self.client.get(reverse('request-metrics')).data
+        nearby = metrics['GET /services/<int:service_id>/vendors/']
+        self.assertEqual(nearby['count'], 1)
+        self.assertGreaterEqual(nearby['queries_avg'], 1)
+        self.assertEqual(sum(nearby['latency_ms'].values()), 1)
+        services = metrics['GET /services/']
+        self.assertGreater(services['response_bytes_avg'], 0)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?"
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], REPLICA_LAG=5)
+class PrimaryReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_one_replica_per_request_until_it_writes(self):
+        token = routing_state.set(RoutingState())
+        self.addCleanup(routing_state.reset, token)
+        replica = self.router.db_for_read(Vendor)
+        self.assertEqual({self.router.db_for_read(Service) for _ in range(20)}, {replica})
+        self.assertEqual(self.router.db_for_write(Vendor), 'default')
+        self.assertEqual(self.router.db_for_read(Vendor), 'default')
+
+    def test_primary_only_reads(self):
+        self.assertEqual(self.router.db_for_read(Job), 'default')
+        # Outside requests
+        self.assertEqual(self.router.db_for_read(Vendor), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Vendor), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Vendor), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'vendors'))
+        self.assertTrue(self.router.allow_migrate('default', 'vendors'))
+
+    def test_responses_read_from_replicas_are_cached_once_they_caught_up(self):
+        self.assertTrue(reads_are_current(time.time() - 10))
+        self.assertFalse(reads_are_current(time.time()))
+        with use_primary():
+            self.assertTrue(reads_are_current(time.time()))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaStickinessTestCase(TransactionTestCase):
+    """
+    Reads from a stale SQLite replica: it has the schema but none of the
+    primary's rows. Not run in a transaction, which keeps reads on the primary.
+    """
+    # Resolved when the class is set up, once the replica has been added
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.settings['replica'] = {
+            **connections['default'].settings_dict, 'ENGINE': 'django.db.backends.sqlite3', 'NAME': cls.replica_path,
+        }
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(Service)
+            editor.create_model(Vendor)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(
+            business_name='Print Shop', contact_person='Jane Doe', contact_email='jane@example.com',
+            contact_phone_number='1234567890', address='1 Main St', location_latitude='12.900000',
+            location_longitude='77.600000', business_hours='9AM-5PM', accepted_file_formats='PDF',
+            pricing_information='$0.10 per page', payment_methods='Cash', terms_and_conditions='None',
+        )
+        self.url = reverse('vendor-detail', kwargs={'pk': self.vendor.pk})
+
+    def test_clients_read_their_writes(self):
+        client = APIClient()
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        response = client.patch(reverse('vendor-edit', kwargs={'pk': self.vendor.pk}), {'business_name': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.cookies[PRIMARY_COOKIE]['max-age'], 5)
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['business_name'], 'Renamed')
+        # Other clients still read from the replica
+        self.assertEqual(APIClient().get(reverse('vendor-list')).data, [])
+
+    def test_job_claims_use_the_primary(self):
+        Job.objects.create(task='jobs.tests.missing')
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(Worker().run_once(), 1)
+
+    def test_reads_in_transactions_use_the_primary(self):
+        token = routing_state.set(RoutingState())
+        self.addCleanup(routing_state.reset, token)
+        self.assertFalse(Vendor.objects.exists())
+        with transaction.atomic():
+            self.assertTrue(Vendor.objects.exists())
+
+    def test_process_caches_load_from_the_primary(self):
+        for cache in (service_index, open_vendors, pricing_rules):
+            cache.clear()
+        catalog_index.reset()
+        token = routing_state.set(RoutingState())
+        self.addCleanup(routing_state.reset, token)
+        self.assertFalse(Vendor.objects.exists())
+        # Shared with every client, so not filled from a replica that is behind
+        self.assertEqual(len(service_index.get_points(0)), 1)
+        self.assertIn(self.vendor.pk, open_vendors.get(datetime(2026, 10, 19, 10)))
+        self.assertIn(self.vendor.pk, pricing_rules.get_columns().rows)
+        self.assertEqual(catalog_index.search_vendors('print'), (1, [self.vendor.pk]))
+
+    def test_commands_read_their_writes(self):
+        service = Service.objects.create(name='Binding')
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as stream:
+            json.dump([{
+                'business_name': 'Imported Shop', 'contact_person': 'John Doe', 'contact_email': 'john@example.com',
+                'contact_phone_number': '1234567890', 'address': '2 Main St', 'location_latitude': 12.9,
+                'location_longitude': 77.6, 'business_hours': '9AM-5PM', 'services_offered_ids': [service.id],
+                'accepted_file_formats': 'PDF', 'pricing_information': '$0.10 per page', 'payment_methods': 'Cash',
+                'terms_and_conditions': 'None',
+            }], stream)
+        self.addCleanup(os.remove, stream.name)
+        out = StringIO()
+        call_command('import_vendors', stream.name, stdout=out, stderr=StringIO())
+        self.assertIn('Imported 1 vendors', out.getvalue())
+        self.assertEqual(Vendor.objects.get(contact_email='john@example.com').services_offered.get(), service)
@@ -19,10 +19,15 @@ from django.urls import path
 
 from django.contrib import admin
 from django.urls import path, include
+from .views import DatabasePoolStatsView, RequestMetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('vendors/', include('vendors.urls')),
     path('services/', include('services.urls')),
+    path('documents/', include('documents.urls')),
+    path('orders/', include('orders.urls')),
+    path('metrics/db-pool/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
+    path('metrics/requests/', RequestMetricsView.as_view(), name='request-metrics'),
 ]
 
@@ -0,0 +1,12 @@
+from rest_framework import generics
+from rest_framework.response import Response
+from backend.db.pool import pool_stats
+from backend.instrumentation import registry
+
+class DatabasePoolStatsView(generics.GenericAPIView):
+    def get(self, request, *args, **kwargs):
+        return Response(pool_stats())
+
+class RequestMetricsView(generics.GenericAPIView):
+    def get(self, request, *args, **kwargs):
+        return Response(registry.snapshot())
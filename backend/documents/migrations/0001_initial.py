@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:22
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('vendors', '0005_vendor_logo_check'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('file_format', models.CharField(editable=False, max_length=10)),
+                ('size', models.PositiveBigIntegerField()),
+                ('offset', models.PositiveBigIntegerField(default=0, editable=False)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete'), ('rejected', 'Rejected')], default='uploading', editable=False, max_length=10)),
+                ('expected_checksum', models.CharField(blank=True, max_length=64)),
+                ('checksum', models.CharField(blank=True, editable=False, max_length=64)),
+                ('page_count', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('error', models.CharField(blank=True, editable=False, max_length=255)),
+                ('storage_key', models.CharField(blank=True, editable=False, max_length=255)),
+                ('locked_until', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='vendors.vendor')),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+import uuid
+
+from django.db import models
+
+from vendors.models import Vendor
+
+
+class Upload(models.Model):
+    """A document uploaded in chunks for printing by a vendor."""
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+    REJECTED = 'rejected'
+    STATUS_CHOICES = [(UPLOADING, 'Uploading'), (COMPLETE, 'Complete'), (REJECTED, 'Rejected')]
+
+    # Random ids: whoever knows one can append to the upload
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    file_format = models.CharField(max_length=10, editable=False)
+    size = models.PositiveBigIntegerField()
+    # Bytes received so far; the next chunk must start here
+    offset = models.PositiveBigIntegerField(default=0, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING, editable=False)
+    # SHA-256 the client expects, checked once the upload completes
+    expected_checksum = models.CharField(max_length=64, blank=True)
+    checksum = models.CharField(max_length=64, blank=True, editable=False)
+    page_count = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    error = models.CharField(max_length=255, blank=True, editable=False)
+    storage_key = models.CharField(max_length=255, blank=True, editable=False)
+    # Held while a chunk is being written, so chunks of an upload never interleave
+    locked_until = models.DateTimeField(blank=True, null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.status})'
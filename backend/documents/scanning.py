@@ -0,0 +1,170 @@
+"""
+Incremental inspection of uploaded documents.
+
+A ``DocumentScanner`` is fed an upload's bytes in order, a piece at a time,
+and keeps everything it learns in a few bytes of state: the SHA-256 digest,
+whether the content matches the claimed format (decided from the first
+``SNIFF_SIZE`` bytes, so a mislabelled file is rejected with its first chunk)
+and the page count. Nothing is buffered beyond a short tail carried over
+between pieces.
+
+Scanners live in a small per-process LRU keyed by upload id and offset. A
+chunk landing in another process, or after a restart, rebuilds the scanner by
+reading the stored prefix back from disk once.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+# Bytes inspected to recognize a format; PDF headers may start anywhere in them
+SNIFF_SIZE = 1024
+
+# Leading bytes of each binary format; formats not listed are not checked
+MAGIC_NUMBERS = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'bmp': (b'BM',),
+    'tiff': (b'II*\x00', b'MM\x00*'),
+    'webp': (b'RIFF',),
+    # Office Open XML and OpenDocument files are zip archives
+    'docx': (b'PK\x03\x04',),
+    'xlsx': (b'PK\x03\x04',),
+    'pptx': (b'PK\x03\x04',),
+    'odt': (b'PK\x03\x04',),
+    # Legacy Office files are OLE compound documents
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'xls': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'ppt': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+}
+
+SINGLE_PAGE_FORMATS = frozenset({'png', 'jpeg', 'gif', 'bmp', 'webp'})
+
+# Page objects, but not the /Pages tree nodes, and the page counts of tree nodes
+_PDF_PAGE_RE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_PDF_COUNT_RE = re.compile(rb'/Count\s+(\d+)')
+
+# Bytes kept between pieces so markers split across them are still found
+_TAIL_SIZE = 64
+
+# Scanners kept per process for the next chunk of each upload
+SCANNER_CACHE_SIZE = 256
+
+
+class DocumentScanner:
+    def __init__(self, file_format):
+        self.file_format = file_format
+        self.sha256 = hashlib.sha256()
+        self.position = 0
+        self.head = b''
+        self.format_ok = file_format not in MAGIC_NUMBERS
+        # PDF page markers: the tail of the previous piece, where it starts,
+        # and where the last counted marker ended
+        self.tail = b''
+        self.scanned_to = 0
+        self.page_objects = 0
+        self.page_tree_count = 0
+
+    def copy(self):
+        scanner = DocumentScanner.__new__(DocumentScanner)
+        scanner.__dict__.update(self.__dict__)
+        scanner.sha256 = self.sha256.copy()
+        return scanner
+
+    def update(self, data):
+        """
+        Feed the next piece of the document. Return False once the content is
+        known not to match the format.
+        """
+        if len(self.head) < SNIFF_SIZE:
+            self.head += data[:SNIFF_SIZE - len(self.head)]
+            if len(self.head) >= SNIFF_SIZE and not self.sniff():
+                return False
+        self.sha256.update(data)
+        if self.file_format == 'pdf':
+            self.scan_pdf(data)
+        self.position += len(data)
+        return True
+
+    def finish(self):
+        """Check the format of documents shorter than ``SNIFF_SIZE``; return False if it does not match."""
+        if self.file_format == 'pdf':
+            self.scan_pdf(b'', final=True)
+        return self.format_ok or self.sniff()
+
+    def sniff(self):
+        magic_numbers = MAGIC_NUMBERS.get(self.file_format)
+        if magic_numbers is None:
+            return True
+        if self.file_format == 'pdf':
+            self.format_ok = magic_numbers[0] in self.head
+        else:
+            self.format_ok = self.head.startswith(magic_numbers)
+        return self.format_ok
+
+    def scan_pdf(self, data, final=False):
+        buffer = self.tail + data
+        start = self.position - len(self.tail)
+        # A marker ending at the end of the buffer may continue in the next piece
+        end = len(buffer) if final else len(buffer) - 1
+        for match in _PDF_PAGE_RE.finditer(buffer):
+            if match.end() <= end and start + match.start() >= self.scanned_to:
+                self.page_objects += 1
+                self.scanned_to = start + match.end()
+        for match in _PDF_COUNT_RE.finditer(buffer):
+            if match.end() <= end:
+                self.page_tree_count = max(self.page_tree_count, int(match.group(1)))
+        self.tail = buffer[-_TAIL_SIZE:]
+
+    @property
+    def checksum(self):
+        return self.sha256.hexdigest()
+
+    @property
+    def page_count(self):
+        """The number of pages, or None when it cannot be told from the raw bytes."""
+        if self.file_format in SINGLE_PAGE_FORMATS:
+            return 1
+        if self.file_format == 'pdf':
+            # Page objects may be hidden in compressed object streams, and only
+            # then is the largest /Count taken as the root of the page tree:
+            # outlines have a /Count of their own
+            return self.page_objects or self.page_tree_count or None
+        return None
+
+
+class ScannerCache:
+    """LRU of the scanner of each upload at the offset it has reached."""
+
+    def __init__(self, max_size=SCANNER_CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.scanners = OrderedDict()  # upload_id -> scanner
+
+    def get(self, upload_id, offset):
+        with self.lock:
+            scanner = self.scanners.get(upload_id)
+            if scanner is None or scanner.position != offset:
+                return None
+            self.scanners.move_to_end(upload_id)
+            return scanner.copy()
+
+    def put(self, upload_id, scanner):
+        with self.lock:
+            self.scanners[upload_id] = scanner
+            self.scanners.move_to_end(upload_id)
+            while len(self.scanners) > self.max_size:
+                self.scanners.popitem(last=False)
+
+    def discard(self, upload_id):
+        with self.lock:
+            self.scanners.pop(upload_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.scanners.clear()
+
+
+scanner_cache = ScannerCache()
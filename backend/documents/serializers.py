@@ -0,0 +1,43 @@
+import re
+
+from rest_framework import serializers
+
+from backend.normalize import normalize_file_format
+from .models import Upload
+from .uploads import get_max_size, is_checksum
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Upload
+        fields = [
+            'id', 'vendor', 'filename', 'file_format', 'size', 'offset', 'status', 'expected_checksum',
+            'checksum', 'page_count', 'error', 'created_at', 'updated_at',
+        ]
+
+    def validate_filename(self, value):
+        # Browsers and some clients send the full client-side path
+        return re.split(r'[\\/]', value)[-1]
+
+    def validate_size(self, value):
+        if not 0 < value <= get_max_size():
+            raise serializers.ValidationError(f'Must be between 1 and {get_max_size()} bytes.')
+        return value
+
+    def validate_expected_checksum(self, value):
+        value = value.lower()
+        if value and not is_checksum(value):
+            raise serializers.ValidationError('Expected a hex SHA-256 digest.')
+        return value
+
+    def validate(self, attrs):
+        vendor = attrs['vendor']
+        name, dot, extension = attrs['filename'].rpartition('.')
+        file_format = normalize_file_format(extension) if dot else ''
+        accepted = vendor.accepted_formats()
+        if file_format not in accepted:
+            raise serializers.ValidationError({
+                'filename': f"{vendor} accepts {', '.join(sorted(accepted)) or 'no'} files only."
+            })
+        attrs['file_format'] = file_format
+        return attrs
@@ -0,0 +1,78 @@
+"""
+Local stand-in for an object store holding uploaded documents.
+
+Uploads in progress are written to ``parts/<upload id>`` at the offset each
+chunk belongs to. Completed documents are moved to ``objects/``, keyed by
+their SHA-256 digest, the way they would be put into S3 or Cloud Storage.
+The root is the ``DOCUMENT_STORAGE_ROOT`` setting.
+"""
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+# Bytes read from the request or disk at a time
+IO_CHUNK_SIZE = 64 * 1024
+
+
+class DocumentStore:
+    def __init__(self, root=None):
+        self.root = root
+
+    def get_root(self):
+        return Path(self.root if self.root is not None else settings.DOCUMENT_STORAGE_ROOT)
+
+    def part_path(self, upload_id):
+        return self.get_root() / 'parts' / str(upload_id)
+
+    def object_path(self, key):
+        return self.get_root() / 'objects' / key
+
+    def write_part(self, upload_id, offset, pieces):
+        """
+        Write the byte strings of ``pieces`` to the part file from ``offset``,
+        flushing each one to disk; return the number of bytes written. Pieces
+        are written until the iterator ends or raises, so the bytes received
+        before a dropped connection are kept.
+        """
+        path = self.part_path(upload_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        written = 0
+        with open(path, 'r+b' if path.exists() else 'w+b') as file:
+            file.seek(offset)
+            try:
+                for piece in pieces:
+                    file.write(piece)
+                    written += len(piece)
+            finally:
+                file.truncate()
+                file.flush()
+                os.fsync(file.fileno())
+        return written
+
+    def read_part(self, upload_id, length):
+        """Yield the first ``length`` bytes of the part file in ``IO_CHUNK_SIZE`` pieces."""
+        with open(self.part_path(upload_id), 'rb') as file:
+            while length > 0:
+                piece = file.read(min(IO_CHUNK_SIZE, length))
+                if not piece:
+                    break
+                length -= len(piece)
+                yield piece
+
+    def commit_part(self, upload_id, key):
+        """Move a finished part to the object ``key``; return the key."""
+        path = self.object_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Identical documents share an object
+        os.replace(self.part_path(upload_id), path)
+        return key
+
+    def delete_part(self, upload_id):
+        self.part_path(upload_id).unlink(missing_ok=True)
+
+    def open(self, key):
+        return open(self.object_path(key), 'rb')
+
+
+document_store = DocumentStore()
@@ -0,0 +1,144 @@
+import hashlib
+import io
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from vendors.models import Vendor
+from .models import Upload
+from .scanning import DocumentScanner, scanner_cache
+from .storage import document_store
+from .uploads import receive_chunk
+
+
+def make_pdf(pages, padding=200000):
+    objects = b''.join(b'%d 0 obj << /Type /Page /Parent 2 0 R >> endobj\n' % (index + 3) for index in range(pages))
+    return (
+        b'%PDF-1.4\n1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n'
+        b'2 0 obj << /Type /Pages /Count ' + str(pages).encode() + b' >> endobj\n'
+        + objects + b'%' + b'x' * padding + b'\n%%EOF\n'
+    )
+
+
+class InterruptedStream(io.BytesIO):
+    """A request body whose connection drops after ``limit`` bytes."""
+
+    def __init__(self, data, limit):
+        super().__init__(data[:limit])
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            raise OSError('Connection reset')
+        return data
+
+
+class UploadTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.storage_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_root)
+        settings_override = override_settings(DOCUMENT_STORAGE_ROOT=self.storage_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        scanner_cache.clear()
+        self.vendor = Vendor.objects.create(
+            business_name='Print Shop', contact_person='Jane Doe', contact_email='jane@example.com',
+            contact_phone_number='1234567890', address='1 Main St', location_latitude='12.900000',
+            location_longitude='77.600000', business_hours='9AM-5PM', accepted_file_formats='PDF, JPEG',
+            pricing_information='$0.10 per page', payment_methods='Cash', terms_and_conditions='None',
+        )
+
+    def start(self, filename, data, **extra):
+        response = self.client.post(
+            reverse('upload-create'),
+            {'vendor': self.vendor.pk, 'filename': filename, 'size': len(data), **extra}, format='json',
+        )
+        return response
+
+    def send(self, upload_id, offset, chunk):
+        return self.client.patch(
+            reverse('upload-detail', args=[upload_id]), chunk,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunked_upload(self):
+        data = make_pdf(3)
+        response = self.start('C:\\Users\\me\\report.pdf', data, expected_checksum=hashlib.sha256(data).hexdigest())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.data['id']
+        self.assertEqual((response.data['filename'], response.data['file_format']), ('report.pdf', 'pdf'))
+
+        response = self.send(upload_id, 0, data[:70001])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Upload-Offset'], '70001')
+        # A chunk sent again, or out of order, is refused with the current offset
+        response = self.send(upload_id, 0, data[:70001])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.head(reverse('upload-detail', args=[upload_id]))['Upload-Offset'], '70001')
+
+        self.send(upload_id, 70001, data[70001:140000])
+        response = self.send(upload_id, 140000, data[140000:])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Upload.COMPLETE)
+        self.assertEqual(response.data['checksum'], hashlib.sha256(data).hexdigest())
+        self.assertEqual(response.data['page_count'], 3)
+        with document_store.open(Upload.objects.get().storage_key) as file:
+            self.assertEqual(file.read(), data)
+
+    def test_formats_the_vendor_does_not_accept_are_refused(self):
+        response = self.start('thesis.docx', b'PK\x03\x04')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pdf', str(response.data['filename']))
+        # "jpg" is the same format as the "JPEG" the vendor lists
+        self.assertEqual(self.start('photo.JPG', b'\xff\xd8\xff').status_code, status.HTTP_201_CREATED)
+
+    def test_content_not_matching_the_format_is_refused_with_the_first_chunk(self):
+        data = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100000
+        upload_id = self.start('scan.pdf', data).data['id']
+        response = self.send(upload_id, 0, data[:4096])
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(Upload.objects.get().status, Upload.REJECTED)
+        self.assertFalse(document_store.part_path(upload_id).exists())
+
+    def test_checksum_mismatch_rejects_the_upload(self):
+        data = make_pdf(1, padding=10)
+        upload_id = self.start('a.pdf', data, expected_checksum='0' * 64).data['id']
+        self.assertEqual(self.send(upload_id, 0, data).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Upload.objects.get().status, Upload.REJECTED)
+
+    def test_interrupted_chunks_keep_the_bytes_received(self):
+        data = make_pdf(2)
+        upload = Upload.objects.get(pk=self.start('a.pdf', data).data['id'])
+        upload = receive_chunk(upload, 0, InterruptedStream(data, 100000), 150000)
+        self.assertEqual((upload.offset, upload.status, upload.locked_until), (100000, Upload.UPLOADING, None))
+
+        # Resumed in a process that has not seen the upload yet
+        scanner_cache.clear()
+        upload = receive_chunk(upload, 100000, io.BytesIO(data[100000:]), len(data) - 100000)
+        self.assertEqual(upload.status, Upload.COMPLETE)
+        self.assertEqual(upload.checksum, hashlib.sha256(data).hexdigest())
+        self.assertEqual(upload.page_count, 2)
+
+    def test_outline_counts_are_not_pages(self):
+        outline = b'9 0 obj << /Type /Outlines /First 10 0 R /Count 12 >> endobj\n'
+        scanner = DocumentScanner('pdf')
+        scanner.update(make_pdf(2, padding=0) + outline)
+        self.assertTrue(scanner.finish())
+        self.assertEqual(scanner.page_count, 2)
+
+        # Without visible page objects, the page tree count is used
+        scanner = DocumentScanner('pdf')
+        scanner.update(b'%PDF-1.5\n2 0 obj << /Type /Pages /Count 3 >> endobj\n')
+        self.assertTrue(scanner.finish())
+        self.assertEqual(scanner.page_count, 3)
+
+    def test_page_markers_split_between_pieces(self):
+        data = make_pdf(4, padding=0) + b'<< /Type /Pages /Kids [] >> << /Type/Page >>'
+        scanner = DocumentScanner('pdf')
+        for index in range(0, len(data), 7):
+            scanner.update(data[index:index + 7])
+        self.assertTrue(scanner.finish())
+        self.assertEqual(scanner.page_objects, 5)
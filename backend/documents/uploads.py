@@ -0,0 +1,176 @@
+"""
+Resumable document uploads.
+
+An upload is created with its vendor, file name and size, which rejects
+formats the vendor does not accept before any byte is sent. The document is
+then sent in chunks, each one a request with the offset it starts at. A
+chunk is streamed to the part file in small pieces while the scanner checks
+the format, hashes the bytes and counts pages, so no request holds a whole
+chunk, let alone a whole document, in memory.
+
+A connection dropped mid-chunk keeps the bytes that arrived; the client
+asks for the current offset and sends the rest from there. Once the last
+byte is in, the checksum is verified and the document moved to the store.
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Upload
+from .scanning import DocumentScanner, scanner_cache
+from .storage import IO_CHUNK_SIZE, document_store
+
+# Largest document accepted, in bytes
+DOCUMENT_MAX_SIZE = 1024 * 1024 * 1024
+
+# Largest chunk accepted in one request, in bytes
+DOCUMENT_CHUNK_MAX_SIZE = 16 * 1024 * 1024
+
+# Seconds a chunk may take to arrive before another request may resume the upload
+LOCK_TIMEOUT = 300
+
+_CHECKSUM_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The upload cannot take this chunk.'
+    default_code = 'conflict'
+
+
+class ChunkTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'The chunk is too large.'
+    default_code = 'too_large'
+
+
+class FormatMismatch(APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = 'The content does not match the file format.'
+    default_code = 'format_mismatch'
+
+
+def get_max_size():
+    return getattr(settings, 'DOCUMENT_MAX_SIZE', DOCUMENT_MAX_SIZE)
+
+
+def get_chunk_max_size():
+    return getattr(settings, 'DOCUMENT_CHUNK_MAX_SIZE', DOCUMENT_CHUNK_MAX_SIZE)
+
+
+def is_checksum(value):
+    return bool(_CHECKSUM_RE.fullmatch(value))
+
+
+def receive_chunk(upload, offset, stream, length):
+    """
+    Write ``length`` bytes read from ``stream`` to ``upload`` from ``offset``
+    and return the upload as it is afterwards. Fewer bytes are kept when the
+    stream ends early.
+    """
+    if upload.status != Upload.UPLOADING:
+        raise UploadConflict(f'The upload is {upload.status}.')
+    if offset != upload.offset:
+        raise UploadConflict(f'The upload is at offset {upload.offset}.')
+    if length > get_chunk_max_size():
+        raise ChunkTooLarge(f'Chunks may be at most {get_chunk_max_size()} bytes.')
+    if offset + length > upload.size:
+        raise ChunkTooLarge(f'The upload is {upload.size} bytes long.')
+
+    now = timezone.now()
+    claimed = Upload.objects.filter(pk=upload.pk, status=Upload.UPLOADING, offset=offset).filter(
+        Q(locked_until=None) | Q(locked_until__lt=now)
+    ).update(locked_until=now + timedelta(seconds=LOCK_TIMEOUT))
+    if not claimed:
+        raise UploadConflict('Another chunk of this upload is being written.')
+    try:
+        scanner = scanner_cache.get(upload.pk, offset) or rebuild_scanner(upload, offset)
+        mismatch = []
+
+        def pieces():
+            remaining = length
+            while remaining:
+                try:
+                    piece = stream.read(min(IO_CHUNK_SIZE, remaining))
+                except OSError:
+                    # The client went away; keep what arrived
+                    return
+                if not piece:
+                    return
+                if not scanner.update(piece):
+                    mismatch.append(piece)
+                    return
+                remaining -= len(piece)
+                yield piece
+
+        written = document_store.write_part(upload.pk, offset, pieces())
+    except BaseException:
+        Upload.objects.filter(pk=upload.pk).update(locked_until=None)
+        raise
+
+    if mismatch:
+        reject(upload, f'The content is not a valid {upload.file_format} file.')
+        raise FormatMismatch(upload.error)
+    upload.offset = offset + written
+    if upload.offset < upload.size:
+        scanner_cache.put(upload.pk, scanner)
+        Upload.objects.filter(pk=upload.pk).update(offset=upload.offset, locked_until=None, updated_at=timezone.now())
+    else:
+        complete(upload, scanner)
+    upload.refresh_from_db()
+    return upload
+
+
+def rebuild_scanner(upload, offset):
+    """Scan the stored first ``offset`` bytes of an upload, for a chunk arriving at another process."""
+    scanner = DocumentScanner(upload.file_format)
+    if offset:
+        try:
+            for piece in document_store.read_part(upload.pk, offset):
+                scanner.update(piece)
+        except FileNotFoundError:
+            pass
+    if scanner.position != offset:
+        # The part file is missing or short; resume from what is stored
+        Upload.objects.filter(pk=upload.pk).update(offset=scanner.position, locked_until=None)
+        raise UploadConflict(f'The upload is at offset {scanner.position}.')
+    return scanner
+
+
+def complete(upload, scanner):
+    if not scanner.finish():
+        reject(upload, f'The content is not a valid {upload.file_format} file.')
+        raise FormatMismatch(upload.error)
+    if upload.expected_checksum and upload.expected_checksum != scanner.checksum:
+        reject(upload, 'The checksum does not match the content.')
+        raise ValidationError({'expected_checksum': [upload.error]})
+    storage_key = document_store.commit_part(upload.pk, f'{scanner.checksum[:2]}/{scanner.checksum}')
+    scanner_cache.discard(upload.pk)
+    Upload.objects.filter(pk=upload.pk).update(
+        status=Upload.COMPLETE, offset=upload.offset, checksum=scanner.checksum, page_count=scanner.page_count,
+        storage_key=storage_key, locked_until=None, updated_at=timezone.now(),
+    )
+
+
+def reject(upload, error):
+    """Give up on an upload, dropping what was received."""
+    upload.status = Upload.REJECTED
+    upload.error = error
+    Upload.objects.filter(pk=upload.pk).update(
+        status=Upload.REJECTED, error=error, locked_until=None, updated_at=timezone.now()
+    )
+    document_store.delete_part(upload.pk)
+    scanner_cache.discard(upload.pk)
+
+
+def abort(upload):
+    """Delete an upload, and its part file if it was still in progress."""
+    if upload.status == Upload.UPLOADING:
+        document_store.delete_part(upload.pk)
+        scanner_cache.discard(upload.pk)
+    upload.delete()
@@ -0,0 +1,46 @@
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .models import Upload
+from .serializers import UploadSerializer
+from .uploads import abort, receive_chunk
+
+
+class UploadCreateView(generics.CreateAPIView):
+    """Start an upload; formats the vendor does not accept are rejected here."""
+    queryset = Upload.objects.all()
+    serializer_class = UploadSerializer
+
+
+class UploadDetailView(generics.RetrieveDestroyAPIView):
+    """
+    The state of an upload, with its offset also in the ``Upload-Offset``
+    header. PATCH sends the next chunk as the raw request body, starting at
+    the ``Upload-Offset`` request header; DELETE aborts the upload.
+    """
+    queryset = Upload.objects.all()
+    serializer_class = UploadSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.upload_response(self.get_object())
+
+    def patch(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            raise ValidationError('Upload-Offset and Content-Length headers are required.')
+        if offset < 0 or length <= 0:
+            raise ValidationError('Upload-Offset must not be negative and the chunk not empty.')
+        # The raw body, read as it arrives rather than parsed into request.data
+        return self.upload_response(receive_chunk(upload, offset, request.stream, length))
+
+    def perform_destroy(self, instance):
+        abort(instance)
+
+    def upload_response(self, upload):
+        response = Response(self.get_serializer(upload).data)
+        response['Upload-Offset'] = str(upload.offset)
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,91 @@
+"""
+Work deferred until the response has been sent.
+
+Model signals refresh in-process derived data (search and geo indexes) with
+``defer``. During a request the calls are merged and run once, after the
+response has gone out, so write requests stay fast however much derived data
+depends on them. Outside of a request, as in management commands and the
+shell, deferred work runs immediately.
+
+This is for process-local state that a separate worker could not update;
+durable work goes through ``jobs.queue``.
+"""
+import contextvars
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+logger = logging.getLogger(__name__)
+
+pending_work = contextvars.ContextVar('pending_work', default=None)
+
+
+def defer(func, *items):
+    """
+    Call ``func(items)`` after the current response, merging the ``items`` of
+    every ``defer(func, ...)`` of the request into a single call.
+    """
+    work = pending_work.get()
+    if work is None:
+        func(list(dict.fromkeys(items)))
+        return
+    work.setdefault(func, {}).update(dict.fromkeys(items))
+
+
+def run_deferred(work):
+    for func, items in work.items():
+        try:
+            func(list(items))
+        except Exception:
+            logger.exception('Deferred %s failed', func.__qualname__)
+
+
+class DeferredWorkMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        work = {}
+        token = pending_work.set(work)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            run_deferred(work)
+            raise
+        finally:
+            pending_work.reset(token)
+        return self.schedule(response, work)
+
+    async def __acall__(self, request):
+        work = {}
+        token = pending_work.set(work)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            run_deferred(work)
+            raise
+        finally:
+            pending_work.reset(token)
+        return self.schedule(response, work)
+
+    def schedule(self, response, work):
+        if work:
+            # Servers close the response once it is sent; the work runs before
+            # the request_finished handlers that close() sends clean up
+            close = response.close
+
+            def run_and_close():
+                try:
+                    run_deferred(work)
+                finally:
+                    close()
+
+            response.close = run_and_close
+        return response
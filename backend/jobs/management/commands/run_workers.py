@@ -0,0 +1,56 @@
+import logging
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from jobs.queue import LOCK_TIMEOUT, Worker, registry
+
+logger = logging.getLogger('jobs.queue')
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers until interrupted, or until the queue is empty with --once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--tasks', nargs='+', help='Only run these tasks.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when idle.')
+        parser.add_argument('--lock-timeout', type=int, default=LOCK_TIMEOUT)
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Running {options['threads']} worker(s) for: {', '.join(options['tasks'] or registry)}")
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self.work, args=(stop, options), name=f'worker-{index}')
+            for index in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            # Let running batches finish
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, stop, options):
+        worker = Worker(options['tasks'], options['lock_timeout'])
+        try:
+            while not stop.is_set():
+                try:
+                    processed = worker.run_once()
+                except DatabaseError:
+                    logger.exception('Claiming jobs failed')
+                    processed = 0
+                # Like the end of a request: honour CONN_MAX_AGE and return pooled connections
+                close_old_connections()
+                if not processed:
+                    if options['once']:
+                        break
+                    stop.wait(options['poll_interval'])
+        finally:
+            connection.close()
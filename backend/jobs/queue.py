@@ -0,0 +1,143 @@
+"""
+Durable background jobs, stored in the database and run by
+``manage.py run_workers``.
+
+Tasks are functions registered with ``@task`` in an app's ``tasks.py``. They
+are called with a list of payloads, so a worker hands them up to
+``batch_size`` queued jobs at once. A failing batch is retried job by job,
+and each job is retried with exponential backoff until ``max_attempts``,
+after which it is kept with status ``failed`` and its last error.
+
+Enqueueing inside a transaction commits the job together with the write that
+caused it.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed batch may run before other workers take it over
+LOCK_TIMEOUT = 300
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, name, batch_size=1, max_attempts=5, retry_delay=30):
+        self.func = func
+        self.name = name
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, payloads):
+        return self.func(payloads)
+
+    def enqueue(self, payload, key='', delay=0):
+        self.enqueue_many([(key, payload)], delay)
+
+    def enqueue_many(self, items, delay=0):
+        """
+        Queue ``(key, payload)`` pairs, skipping the keys that already have a
+        pending job of this task.
+        """
+        keys = {key for key, _ in items if key}
+        pending = set()
+        if keys:
+            pending = set(Job.objects.filter(
+                task=self.name, key__in=keys, status=Job.PENDING
+            ).values_list('key', flat=True))
+        run_after = timezone.now() + timedelta(seconds=delay)
+        jobs = []
+        for key, payload in items:
+            if key in pending:
+                continue
+            if key:
+                pending.add(key)
+            jobs.append(Job(task=self.name, key=key, payload=payload, run_after=run_after))
+        Job.objects.bulk_create(jobs, batch_size=1000)
+
+
+def task(name=None, **options):
+    """Register a function taking a list of payloads as a background task."""
+    def decorator(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', **options)
+        registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+class Worker:
+    def __init__(self, tasks=None, lock_timeout=LOCK_TIMEOUT):
+        self.tasks = tasks
+        self.lock_timeout = lock_timeout
+
+    def run_once(self):
+        """Claim and run one batch of due jobs; return the number of jobs run."""
+        jobs = self.claim()
+        if jobs:
+            self.run(jobs)
+        return len(jobs)
+
+    def claim(self):
+        now = timezone.now()
+        # Take over the batches of workers that died mid-run
+        Job.objects.filter(status=Job.RUNNING, locked_until__lt=now).update(status=Job.PENDING, locked_by='')
+
+        due = Job.objects.filter(status=Job.PENDING, run_after__lte=now)
+        if self.tasks is not None:
+            due = due.filter(task__in=self.tasks)
+        name = due.order_by('run_after', 'id').values_list('task', flat=True).first()
+        if name is None:
+            return []
+        batch_size = registry[name].batch_size if name in registry else 1
+
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            candidates = due.filter(task=name).order_by('run_after', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            ids = list(candidates.values_list('id', flat=True)[:batch_size])
+            # The status condition keeps two workers from claiming a job where
+            # rows cannot be locked
+            Job.objects.filter(id__in=ids, status=Job.PENDING).update(
+                status=Job.RUNNING, locked_by=token, attempts=F('attempts') + 1,
+                locked_until=now + timedelta(seconds=self.lock_timeout),
+            )
+        return list(Job.objects.filter(locked_by=token, status=Job.RUNNING).order_by('id'))
+
+    def run(self, jobs):
+        registered = registry.get(jobs[0].task)
+        try:
+            if registered is None:
+                raise LookupError(f'Unknown task {jobs[0].task!r}.')
+            registered([job.payload for job in jobs])
+        except Exception as exc:
+            if len(jobs) > 1:
+                # Find the failing jobs instead of retrying the whole batch
+                for job in jobs:
+                    self.run([job])
+                return
+            logger.warning('Job %s failed on attempt %d', jobs[0], jobs[0].attempts, exc_info=True)
+            self.retry(jobs[0], registered, exc)
+        else:
+            Job.objects.filter(id__in=[job.id for job in jobs]).delete()
+
+    def retry(self, job, registered, exc):
+        job.last_error = ''.join(traceback.format_exception(exc))
+        job.locked_by = ''
+        job.locked_until = None
+        if registered is None or job.attempts >= registered.max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=registered.retry_delay * 2 ** (job.attempts - 1))
+        job.save(update_fields=['status', 'run_after', 'last_error', 'locked_by', 'locked_until'])
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+from .deferred import DeferredWorkMiddleware, defer
+from .models import Job
+from .queue import Worker, task
+
+calls = []
+
+
+@task(name='jobs.tests.record', batch_size=2, max_attempts=2, retry_delay=60)
+def record(payloads):
+    if any(payload.get('fail') for payload in payloads):
+        raise ValueError('Bad payload')
+    calls.append([payload['value'] for payload in payloads])
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_batches_and_coalescing(self):
+        record.enqueue({'value': 1}, key='a')
+        record.enqueue({'value': 2}, key='a')
+        record.enqueue_many([('', {'value': 3}), ('', {'value': 4}), ('b', {'value': 5}), ('b', {'value': 6})])
+        self.assertEqual(Job.objects.count(), 4)
+
+        worker = Worker()
+        self.assertEqual(worker.run_once(), 2)
+        self.assertEqual(worker.run_once(), 2)
+        self.assertEqual(worker.run_once(), 0)
+        self.assertEqual(calls, [[1, 3], [4, 5]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failing_jobs_are_isolated_and_retried(self):
+        record.enqueue_many([('', {'value': 1}), ('', {'value': 2, 'fail': True})])
+        worker = Worker()
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(worker.run_once(), 2)
+        self.assertEqual(calls, [[1]])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+        self.assertIn('ValueError: Bad payload', job.last_error)
+
+        # Not due yet, then failed for good after max_attempts
+        self.assertEqual(worker.run_once(), 0)
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(worker.run_once(), 0)
+
+    def test_stale_claims_are_taken_over(self):
+        record.enqueue({'value': 1})
+        Job.objects.update(status=Job.RUNNING, locked_by='gone', locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(Worker(tasks=['jobs.tests.record']).run_once(), 1)
+        self.assertEqual(calls, [[1]])
+
+    def test_unknown_tasks_fail(self):
+        Job.objects.create(task='jobs.tests.missing')
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            Worker().run_once()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+
+class RunWorkersCommandTestCase(TransactionTestCase):
+    def test_run_until_empty(self):
+        calls.clear()
+        record.enqueue_many([('', {'value': value}) for value in range(5)])
+        call_command('run_workers', once=True, stdout=StringIO())
+        self.assertEqual(sorted(value for batch in calls for value in batch), list(range(5)))
+        self.assertFalse(Job.objects.exists())
+
+
+class DeferredWorkTestCase(TestCase):
+    def test_work_runs_after_the_response(self):
+        done = []
+
+        def view(request):
+            defer(done.extend, 1, 2)
+            defer(done.extend, 2, 3)
+            self.assertEqual(done, [])
+            return HttpResponse()
+
+        response = DeferredWorkMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(done, [])
+
+        def finished(**kwargs):
+            done.append('finished')
+
+        request_finished.connect(finished)
+        self.addCleanup(request_finished.disconnect, finished)
+        response.close()
+        # Before the request_finished handlers, which close the database connections
+        self.assertEqual(done, [1, 2, 3, 'finished'])
+
+        # Outside of a request it runs right away
+        defer(done.extend, 4)
+        self.assertEqual(done, [1, 2, 3, 'finished', 4])
@@ -0,0 +1,215 @@
+"""
+Order dispatch.
+
+New orders are queued for the ``dispatch_orders`` background task, which
+assigns the orders of a whole job batch at once. Each order goes to the
+nearest of the closest vendors offering its service that still has room in
+the delivery window the order asks for, or failing that in one of the
+following windows. A vendor takes ``order_capacity`` orders per window, the
+``DISPATCH_VENDOR_CAPACITY`` setting when it sets none. The candidates of a
+batch come from one vectorized geo index search per service. Orders nobody
+can take are marked unassignable with the reason.
+
+Assigned orders are grouped into delivery runs by vendor, window and the
+geohash cell of their address, up to ``COURIER_RUN_SIZE`` orders a run, so
+each courier leaving a vendor delivers to one neighbourhood. To fill runs,
+an order goes to a vendor already delivering to its cell in the window
+rather than the nearest one when that is at most ``DISPATCH_DETOUR_KM``
+farther.
+
+The vendors of a batch are locked, in id order, while it is assigned so
+concurrent workers cannot overbook them. The geo index may predate changes
+to the vendors, so the lock query also reads which of the batch's services
+each still offers, and candidates that no longer offer an order's service
+are dropped.
+"""
+import datetime
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from backend.db.routers import use_primary
+from vendors.geo import encode_geohash
+from vendors.models import Vendor
+from vendors.nearby import find_nearby_many
+from .models import DeliveryRun, Order
+
+# Seconds in a delivery window
+DISPATCH_WINDOW = 3600
+
+# Windows after the one asked for that an order may be moved to
+DISPATCH_HORIZON = 24
+
+# Vendors farther than this from the delivery address are not considered
+DISPATCH_RADIUS_KM = 10
+
+# Closest vendors considered for each order
+DISPATCH_CANDIDATES = 5
+
+# Orders per window of vendors without an order_capacity
+DISPATCH_VENDOR_CAPACITY = 50
+
+# How much farther than the nearest vendor with room an order may be sent to join a run
+DISPATCH_DETOUR_KM = 2
+
+# Most orders delivered by one courier run
+COURIER_RUN_SIZE = 20
+
+# Geohash precision of the areas a run delivers to; 5 is ~4.9 km x 4.9 km
+DISPATCH_CLUSTER_PRECISION = 5
+
+
+class Dispatcher:
+    """Assigns orders to vendors and delivery runs; unset options come from the ``DISPATCH_*`` settings."""
+
+    def __init__(self, window=None, horizon=None, radius_km=None, candidates=None, vendor_capacity=None,
+                 detour_km=None, run_size=None, cluster_precision=None):
+        def option(value, name, default):
+            return value if value is not None else getattr(settings, name, default)
+
+        self.window = datetime.timedelta(seconds=option(window, 'DISPATCH_WINDOW', DISPATCH_WINDOW))
+        self.horizon = option(horizon, 'DISPATCH_HORIZON', DISPATCH_HORIZON)
+        self.radius_km = option(radius_km, 'DISPATCH_RADIUS_KM', DISPATCH_RADIUS_KM)
+        self.candidates = option(candidates, 'DISPATCH_CANDIDATES', DISPATCH_CANDIDATES)
+        self.vendor_capacity = option(vendor_capacity, 'DISPATCH_VENDOR_CAPACITY', DISPATCH_VENDOR_CAPACITY)
+        self.detour_km = option(detour_km, 'DISPATCH_DETOUR_KM', DISPATCH_DETOUR_KM)
+        self.run_size = option(run_size, 'COURIER_RUN_SIZE', COURIER_RUN_SIZE)
+        self.cluster_precision = option(cluster_precision, 'DISPATCH_CLUSTER_PRECISION', DISPATCH_CLUSTER_PRECISION)
+
+    def window_of(self, moment):
+        """The start of the delivery window ``moment`` falls in."""
+        seconds = self.window.total_seconds()
+        start = moment.timestamp() // seconds * seconds
+        return datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc)
+
+    def dispatch(self, order_ids):
+        """Assign the pending orders of ``order_ids``; return the number of orders left in each status."""
+        with use_primary(), transaction.atomic():
+            orders = list(
+                Order.objects.select_for_update().filter(id__in=order_ids, status=Order.PENDING)
+                .order_by('deliver_after', 'id')
+            )
+            if not orders:
+                return Counter()
+            candidates = self.find_candidates(orders)
+            vendor_ids = {vendor_id for nearby in candidates.values() for _, vendor_id in nearby}
+            capacities = {}
+            offered = set()  # (vendor_id, service_id)
+            for vendor_id, service_id, order_capacity in Vendor.objects.select_for_update().filter(
+                id__in=vendor_ids, services_offered__in={order.service_id for order in orders}
+            ).order_by('id').values_list('id', 'services_offered', 'order_capacity'):
+                capacities[vendor_id] = order_capacity
+                offered.add((vendor_id, service_id))
+
+            first = self.window_of(orders[0].deliver_after)
+            last = self.window_of(orders[-1].deliver_after) + self.horizon * self.window
+            booked = Counter(dict(
+                ((vendor_id, window_start), count) for vendor_id, window_start, count in
+                Order.objects.filter(
+                    status=Order.ASSIGNED, vendor__in=capacities, window_start__range=(first, last)
+                ).order_by().values_list('vendor', 'window_start').annotate(count=Count('id'))
+            ))
+            runs = {
+                (run.vendor_id, run.window_start, run.cluster): run for run in DeliveryRun.objects.filter(
+                    vendor__in=capacities, window_start__range=(first, last), order_count__lt=self.run_size
+                )
+            }
+
+            filled = {}  # id(run) -> (run, orders joining it)
+            unassignable = defaultdict(list)  # error -> orders
+            for order in orders:
+                # Vendors deleted or no longer offering the service since the geo index was loaded are skipped
+                nearby = [
+                    (distance, vendor_id) for distance, vendor_id in candidates[order.pk]
+                    if (vendor_id, order.service_id) in offered
+                ]
+                run = self.assign(order, nearby, capacities, booked, runs)
+                if run is None:
+                    unassignable[order.error].append(order.pk)
+                else:
+                    filled.setdefault(id(run), (run, []))[1].append(order.pk)
+
+            # One update per run and reason rather than per order
+            now = timezone.now()
+            for run, joined in filled.values():
+                if run.pk is None:
+                    run.save()
+                else:
+                    DeliveryRun.objects.filter(pk=run.pk).update(order_count=F('order_count') + len(joined))
+                Order.objects.filter(pk__in=joined).update(
+                    status=Order.ASSIGNED, vendor_id=run.vendor_id, run=run, window_start=run.window_start,
+                    assigned_at=now,
+                )
+            for error, refused in unassignable.items():
+                Order.objects.filter(pk__in=refused).update(status=Order.UNASSIGNABLE, error=error)
+        return Counter(order.status for order in orders)
+
+    def find_candidates(self, orders):
+        """Return ``{order_id: [(distance, vendor_id), ...]}`` of the closest vendors offering each order's service."""
+        by_service = defaultdict(list)
+        for order in orders:
+            by_service[order.service_id].append(order)
+        candidates = {}
+        for service_id, service_orders in by_service.items():
+            locations = [(float(order.delivery_latitude), float(order.delivery_longitude)) for order in service_orders]
+            nearby = find_nearby_many(service_id, locations, self.radius_km, limit=self.candidates)
+            candidates.update(zip((order.pk for order in service_orders), nearby))
+        return candidates
+
+    def assign(self, order, nearby, capacities, booked, runs):
+        """
+        Give ``order`` to a vendor of ``nearby`` with room in the earliest
+        window possible, and return the run it joins; None when no vendor can
+        take it.
+        """
+        if not nearby:
+            order.status = Order.UNASSIGNABLE
+            order.error = f'No vendor offers the service within {self.radius_km:g} km.'
+            return None
+        cluster = encode_geohash(order.delivery_latitude, order.delivery_longitude, self.cluster_precision)
+        window_start = self.window_of(order.deliver_after)
+        for _ in range(self.horizon + 1):
+            available = [
+                (distance, vendor_id) for distance, vendor_id in nearby
+                if booked[vendor_id, window_start] < self.capacity_of(capacities[vendor_id])
+            ]
+            if available:
+                vendor_id = self.choose(available, window_start, cluster, runs)
+                booked[vendor_id, window_start] += 1
+                order.status = Order.ASSIGNED
+                order.vendor_id = vendor_id
+                order.window_start = window_start
+                return self.join_run(order, cluster, runs)
+            window_start += self.window
+        order.status = Order.UNASSIGNABLE
+        order.error = 'Every nearby vendor is booked up.'
+        return None
+
+    def capacity_of(self, order_capacity):
+        return order_capacity if order_capacity is not None else self.vendor_capacity
+
+    def choose(self, available, window_start, cluster, runs):
+        """The nearest of the ``available`` vendors with a run to ``cluster`` within the detour, or the nearest."""
+        farthest = available[0][0] + self.detour_km
+        for distance, vendor_id in available:
+            if distance > farthest:
+                break
+            run = runs.get((vendor_id, window_start, cluster))
+            if run is not None and run.order_count < self.run_size:
+                return vendor_id
+        return available[0][1]
+
+    def join_run(self, order, cluster, runs):
+        """
+        The open run of the order's vendor, window and area, started anew
+        (unsaved) when there is none or it is full.
+        """
+        key = (order.vendor_id, order.window_start, cluster)
+        run = runs.get(key)
+        if run is None or run.order_count >= self.run_size:
+            run = runs[key] = DeliveryRun(vendor_id=order.vendor_id, window_start=order.window_start, cluster=cluster)
+        run.order_count += 1
+        return run
@@ -0,0 +1,143 @@
+import datetime
+import statistics
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from jobs.queue import Worker
+from orders.dispatch import Dispatcher
+from orders.models import DeliveryRun, Order
+from orders.synthetic import build_orders
+from orders.tasks import dispatch_orders
+from services.models import Service
+from vendors.geo import haversine_km
+from vendors.models import Vendor
+from vendors.nearby import tile_cache
+from vendors.search import catalog_index
+from vendors.service_index import service_index
+from vendors.synthetic import seed_vendors
+
+SERVICE_NAMES = ['Black & White Printing', 'Color Printing', 'Binding']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a synthetic order stream through the dispatch job against a synthetic catalog and report '
+        'assignment latency, throughput and delivery batching. Runs on whatever database is configured; '
+        'all data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--hours', type=float, default=8, help='Simulated hours the orders arrive over.')
+        parser.add_argument(
+            '--tick', type=float, default=60, help='Simulated seconds between dispatch rounds.'
+        )
+        parser.add_argument('--capacity', type=int, help='Orders per delivery window of every vendor.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # In-process indexes and caches may now refer to rolled back rows
+            catalog_index.reset()
+            tile_cache.clear()
+            service_index.clear()
+            cache.clear()
+
+    def run(self, options):
+        services = [
+            Service.objects.create(name=name, description=f'{name} service', pricing='$0.10 per page')
+            for name in SERVICE_NAMES
+        ]
+        started = time.perf_counter()
+        seed_vendors(options['vendors'], seed=options['seed'], services=services)
+        if options['capacity'] is not None:
+            Vendor.objects.update(order_capacity=options['capacity'])
+        self.stdout.write(f"Seeded {options['vendors']} vendors in {time.perf_counter() - started:.1f}s")
+
+        dispatcher = Dispatcher()
+        start = dispatcher.window_of(timezone.now())
+        stream = build_orders(options['orders'], services, start, options['hours'], options['seed'])
+        worker = Worker([dispatch_orders.name])
+        latencies = []
+        dispatching = rounds = 0
+        replay_started = time.perf_counter()
+        arrival, order = next(stream, (None, None))
+        tick_end = start
+        while order is not None:
+            tick_end += datetime.timedelta(seconds=options['tick'])
+            arrived = []
+            while order is not None and arrival < tick_end:
+                arrived.append(order)
+                arrival, order = next(stream, (None, None))
+            if not arrived:
+                continue
+            rounds += 1
+            # A round: the orders placed during the tick are stored and queued, then dispatched
+            Order.objects.bulk_create(arrived)
+            # MySQL does not return the ids of bulk inserts
+            queued = list(Order.objects.order_by('-id').values_list('id', flat=True)[:len(arrived)])
+            dispatch_orders.enqueue_many([('', {'order_id': order_id}) for order_id in queued])
+            enqueued = time.perf_counter()
+            while True:
+                processed = worker.run_once()
+                if not processed:
+                    break
+                latencies.extend([(time.perf_counter() - enqueued) * 1000] * processed)
+            dispatching += time.perf_counter() - enqueued
+        replay = time.perf_counter() - replay_started
+        self.report(options, dispatcher, rounds, latencies, dispatching, replay)
+
+    def report(self, options, dispatcher, rounds, latencies, dispatching, replay):
+        total = len(latencies)
+        statuses = Counter(dict(Order.objects.order_by().values_list('status').annotate(count=Count('id'))))
+        assigned = Order.objects.filter(status=Order.ASSIGNED)
+        later = sum(
+            window_start != dispatcher.window_of(deliver_after)
+            for deliver_after, window_start in assigned.values_list('deliver_after', 'window_start')
+        )
+        runs = DeliveryRun.objects.aggregate(count=Count('id'), orders=Avg('order_count'))
+        distances = [
+            haversine_km(*point) for point in assigned.values_list(
+                'delivery_latitude', 'delivery_longitude', 'vendor__location_latitude', 'vendor__location_longitude'
+            )
+        ]
+        distance = statistics.fmean(distances) if distances else 0
+
+        self.stdout.write(
+            f"Replayed {total} orders over {options['hours']:g} simulated hours in {rounds} dispatch rounds"
+        )
+        for status, _ in Order.STATUS_CHOICES:
+            self.stdout.write(f"{status:<13} {statuses[status]:>7} ({statuses[status] / max(total, 1):.1%})")
+        self.stdout.write(f"Moved to a later window: {later / max(statuses[Order.ASSIGNED], 1):.1%}")
+        self.stdout.write(
+            f"Delivery runs: {runs['count']}, {runs['orders'] or 0:.1f} orders per run, "
+            f"{distance:.2f} km from the vendor on average"
+        )
+        if latencies:
+            # From the end of a round's tick, when its orders are queued, to their assignment
+            p99 = statistics.quantiles(latencies, n=100)[98] if total > 1 else latencies[0]
+            self.stdout.write(
+                f"Assignment latency: p50 {statistics.median(latencies):.1f} ms, p99 {p99:.1f} ms, "
+                f"max {max(latencies):.1f} ms"
+            )
+            self.stdout.write(
+                f"Throughput: {total / dispatching:.0f} orders/s dispatching, "
+                f"{total / replay:.0f} orders/s including storing and queueing them"
+            )
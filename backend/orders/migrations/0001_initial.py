@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('services', '0003_service_base_price'),
+        ('vendors', '0008_vendor_order_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateTimeField()),
+                ('cluster', models.CharField(max_length=12)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_runs', to='vendors.vendor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pages', models.PositiveIntegerField(default=1)),
+                ('copies', models.PositiveIntegerField(default=1)),
+                ('delivery_latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('delivery_longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('deliver_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('window_start', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('unassignable', 'Unassignable')], default='pending', editable=False, max_length=12)),
+                ('error', models.CharField(blank=True, editable=False, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('assigned_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('run', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='orders.deliveryrun')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='services.service')),
+                ('vendor', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='vendors.vendor')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='deliveryrun',
+            index=models.Index(fields=['vendor', 'window_start', 'cluster'], name='delivery_run_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendor', 'window_start'], name='order_vendor_window_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+from services.models import Service
+from vendors.models import Vendor
+
+
+class DeliveryRun(models.Model):
+    """A courier run: orders of one vendor delivered to one area in one delivery window."""
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='delivery_runs')
+    window_start = models.DateTimeField()
+    # Geohash cell every delivery address of the run lies in
+    cluster = models.CharField(max_length=12)
+    order_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'window_start', 'cluster'], name='delivery_run_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.vendor} run to {self.cluster} at {self.window_start:%Y-%m-%d %H:%M}'
+
+
+class Order(models.Model):
+    """A print order delivered to the customer; assigned to a vendor by ``orders.dispatch``."""
+    PENDING = 'pending'
+    ASSIGNED = 'assigned'
+    UNASSIGNABLE = 'unassignable'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (ASSIGNED, 'Assigned'), (UNASSIGNABLE, 'Unassignable')]
+
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='orders')
+    pages = models.PositiveIntegerField(default=1)
+    copies = models.PositiveIntegerField(default=1)
+    delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    # Earliest time the customer wants the delivery
+    deliver_after = models.DateTimeField(default=timezone.now)
+    # Start of the delivery window the order was assigned to; later than deliver_after's when vendors are booked up
+    window_start = models.DateTimeField(blank=True, null=True, editable=False)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDING, editable=False)
+    vendor = models.ForeignKey(
+        Vendor, on_delete=models.SET_NULL, blank=True, null=True, related_name='orders', editable=False
+    )
+    run = models.ForeignKey(
+        DeliveryRun, on_delete=models.SET_NULL, blank=True, null=True, related_name='orders', editable=False
+    )
+    error = models.CharField(max_length=255, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    assigned_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Counts the orders a vendor has taken in a window
+            models.Index(fields=['vendor', 'window_start'], name='order_vendor_window_idx'),
+        ]
+
+    def __str__(self):
+        return f'Order #{self.pk} ({self.status})'
@@ -0,0 +1,47 @@
+from rest_framework import serializers
+
+from .models import DeliveryRun, Order
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'service', 'pages', 'copies', 'delivery_latitude', 'delivery_longitude', 'deliver_after',
+            'status', 'vendor', 'run', 'window_start', 'error', 'created_at', 'assigned_at',
+        ]
+
+    def validate_pages(self, value):
+        if value < 1:
+            raise serializers.ValidationError('At least one page is required.')
+        return value
+
+    def validate_copies(self, value):
+        if value < 1:
+            raise serializers.ValidationError('At least one copy is required.')
+        return value
+
+    def validate_delivery_latitude(self, value):
+        if not -90 <= value <= 90:
+            raise serializers.ValidationError('Must be between -90 and 90.')
+        return value
+
+    def validate_delivery_longitude(self, value):
+        if not -180 <= value <= 180:
+            raise serializers.ValidationError('Must be between -180 and 180.')
+        return value
+
+
+class DeliveryStopSerializer(serializers.ModelSerializer):
+    """An order as a courier sees it."""
+    class Meta:
+        model = Order
+        fields = ['id', 'delivery_latitude', 'delivery_longitude', 'pages', 'copies']
+
+
+class DeliveryRunSerializer(serializers.ModelSerializer):
+    orders = DeliveryStopSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = DeliveryRun
+        fields = ['id', 'vendor', 'window_start', 'cluster', 'order_count', 'orders', 'created_at']
@@ -0,0 +1,34 @@
+import datetime
+import random
+from decimal import Decimal
+
+from vendors.synthetic import random_point
+from .models import Order
+
+# Share of customers booking a later delivery instead of the earliest one
+SCHEDULED_SHARE = 0.2
+
+
+def build_orders(count, services, start, hours=8, seed=0):
+    """
+    Yield ``(arrival, order)`` for a stream of ``count`` unsaved orders
+    arriving at random over ``hours`` from ``start``, in arrival order. Orders
+    go to the cities synthetic vendors are spread over.
+    """
+    rng = random.Random(seed)
+    rate = count / (hours * 3600)
+    arrival = start
+    for _ in range(count):
+        arrival += datetime.timedelta(seconds=rng.expovariate(rate))
+        latitude, longitude = random_point(rng)
+        deliver_after = arrival
+        if rng.random() < SCHEDULED_SHARE:
+            deliver_after += datetime.timedelta(hours=rng.randint(1, 6))
+        yield arrival, Order(
+            service=rng.choice(services),
+            pages=rng.randint(1, 50),
+            copies=rng.choice((1, 1, 1, 2, 5)),
+            delivery_latitude=Decimal(latitude).quantize(Decimal('0.000001')),
+            delivery_longitude=Decimal(longitude).quantize(Decimal('0.000001')),
+            deliver_after=deliver_after,
+        )
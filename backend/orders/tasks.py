@@ -0,0 +1,8 @@
+from jobs.queue import task
+from .dispatch import Dispatcher
+
+
+@task(batch_size=500, max_attempts=5, retry_delay=10)
+def dispatch_orders(payloads):
+    """Assign each ``{"order_id": ...}`` order to a vendor and a delivery run."""
+    Dispatcher().dispatch({payload['order_id'] for payload in payloads})
@@ -0,0 +1,158 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from jobs.models import Job
+from jobs.queue import Worker
+from services.models import Service
+from vendors.models import Vendor
+from vendors.nearby import tile_cache
+from vendors.service_index import service_index
+from .dispatch import Dispatcher
+from .models import DeliveryRun, Order
+
+NOON = datetime.datetime(2026, 10, 19, 12, 10, tzinfo=datetime.timezone.utc)
+
+
+class DispatchTestCase(TestCase):
+    def setUp(self):
+        service_index.clear()
+        tile_cache.clear()
+        self.client = APIClient()
+        self.service = Service.objects.create(name="Home Delivery Printing")
+        # Two shops in San Francisco ~1.8 km apart, and one ~3.5 km south
+        self.mission = self.create_vendor("Mission Prints", "37.780000", "-122.420000", order_capacity=2)
+        self.soma = self.create_vendor("SoMa Prints", "37.780000", "-122.400000", order_capacity=2)
+        self.noe = self.create_vendor("Noe Prints", "37.750000", "-122.433000")
+
+    def create_vendor(self, name, latitude, longitude, **extra):
+        vendor = Vendor.objects.create(
+            business_name=name, contact_person="Jane Doe", contact_email=f"{name.split()[0].lower()}@example.com",
+            contact_phone_number="1234567890", address="1 Main St", location_latitude=latitude,
+            location_longitude=longitude, business_hours="9AM-5PM", accepted_file_formats="PDF",
+            pricing_information="$0.10 per page", payment_methods="Cash", terms_and_conditions="None", **extra
+        )
+        vendor.services_offered.add(self.service)
+        return vendor
+
+    def place(self, latitude, longitude, count=1, deliver_after=NOON):
+        return [
+            Order.objects.create(
+                service=self.service, delivery_latitude=latitude, delivery_longitude=longitude,
+                deliver_after=deliver_after,
+            ).pk
+            for _ in range(count)
+        ]
+
+    def test_orders_go_to_the_nearest_vendor_with_room(self):
+        order_ids = self.place("37.781000", "-122.419000", count=5)
+        statuses = Dispatcher(horizon=0).dispatch(order_ids)
+        self.assertEqual(statuses, {Order.ASSIGNED: 5})
+        orders = Order.objects.order_by('id')
+        self.assertEqual(
+            [order.vendor_id for order in orders],
+            [self.mission.id, self.mission.id, self.soma.id, self.soma.id, self.noe.id]
+        )
+        self.assertEqual({order.window_start for order in orders}, {NOON.replace(minute=0)})
+        # Each vendor delivers its orders to the area in one run
+        self.assertEqual(DeliveryRun.objects.count(), 3)
+        self.assertEqual(orders[0].run.order_count, 2)
+        self.assertEqual(orders[0].run_id, orders[1].run_id)
+
+        # Already dispatched orders are left alone
+        self.assertEqual(Dispatcher().dispatch(order_ids), {})
+
+    def test_booked_up_vendors_move_orders_to_later_windows(self):
+        Vendor.objects.update(order_capacity=1)
+        order_ids = self.place("37.781000", "-122.419000", count=4)
+        Dispatcher(candidates=2).dispatch(order_ids)
+        orders = Order.objects.order_by('id')
+        self.assertEqual(
+            [(order.vendor_id, order.window_start.hour) for order in orders],
+            [(self.mission.id, 12), (self.soma.id, 12), (self.mission.id, 13), (self.soma.id, 13)]
+        )
+        # Capacity already taken is counted by later dispatches
+        order_ids = self.place("37.781000", "-122.419000")
+        Dispatcher(candidates=2, horizon=1).dispatch(order_ids)
+        order = Order.objects.get(pk=order_ids[0])
+        self.assertEqual((order.status, order.error), (Order.UNASSIGNABLE, 'Every nearby vendor is booked up.'))
+
+    def test_orders_without_nearby_vendors_are_unassignable(self):
+        order_ids = self.place("34.052235", "-118.243683")
+        self.assertEqual(Dispatcher().dispatch(order_ids), {Order.UNASSIGNABLE: 1})
+        self.assertIn('No vendor', Order.objects.get().error)
+
+    def test_vendors_changed_since_the_index_was_loaded_are_skipped(self):
+        order_ids = self.place("37.781000", "-122.419000", count=2)
+        Dispatcher().find_candidates(Order.objects.filter(pk__in=order_ids))
+        # Made without signals, like a write from another process the index has not picked up yet
+        Vendor.services_offered.through.objects.filter(vendor=self.mission).delete()
+        Vendor.objects.filter(pk=self.soma.pk).update(order_capacity=1)
+        Dispatcher(candidates=2, horizon=0).dispatch(order_ids)
+        orders = Order.objects.order_by('id')
+        self.assertEqual([(order.status, order.vendor_id) for order in orders],
+                         [(Order.ASSIGNED, self.soma.id), (Order.UNASSIGNABLE, None)])
+
+        Vendor.services_offered.through.objects.filter(vendor=self.soma).delete()
+        order_ids = self.place("37.781000", "-122.419000")
+        Dispatcher(candidates=2).dispatch(order_ids)
+        self.assertIn('No vendor', Order.objects.get(pk=order_ids[0]).error)
+
+    def test_orders_join_runs_within_the_detour(self):
+        # Nearest to SoMa
+        first = self.place("37.780000", "-122.402000")
+        Dispatcher().dispatch(first)
+        # Mission is 0.2 km nearer, but SoMa already delivers to the area
+        second = self.place("37.780000", "-122.411000")
+        Dispatcher().dispatch(second)
+        self.assertEqual(Order.objects.get(pk=second[0]).vendor_id, self.soma.id)
+        self.assertEqual(DeliveryRun.objects.get().order_count, 2)
+        third = self.place("37.780000", "-122.411000")
+        Dispatcher(detour_km=0.1).dispatch(third)
+        self.assertEqual(Order.objects.get(pk=third[0]).vendor_id, self.mission.id)
+
+        # A full run is followed by a new one
+        Vendor.objects.filter(pk=self.soma.pk).update(order_capacity=10)
+        fourth = self.place("37.780000", "-122.402000")
+        Dispatcher(run_size=2, detour_km=0).dispatch(fourth)
+        self.assertEqual(
+            list(DeliveryRun.objects.filter(vendor=self.soma).order_by('id').values_list('order_count', flat=True)),
+            [2, 1]
+        )
+
+    def test_orders_are_dispatched_in_the_background(self):
+        response = self.client.post(reverse('order-create'), {
+            'service': self.service.id, 'pages': 12, 'copies': 2,
+            'delivery_latitude': '37.781000', 'delivery_longitude': '-122.419000',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], Order.PENDING)
+        self.assertTrue(Job.objects.filter(task='orders.tasks.dispatch_orders').exists())
+
+        Worker().run_once()
+        response = self.client.get(reverse('order-detail', args=[response.data['id']]))
+        self.assertEqual((response.data['status'], response.data['vendor']), (Order.ASSIGNED, self.mission.id))
+        run = self.client.get(reverse('delivery-run-detail', args=[response.data['run']])).data
+        self.assertEqual([order['id'] for order in run['orders']], [response.data['id']])
+
+        for invalid in ({'pages': 0}, {'delivery_latitude': '91'}, {'service': 999}):
+            response = self.client.post(reverse('order-create'), {
+                'service': self.service.id, 'delivery_latitude': '37.781000', 'delivery_longitude': '-122.419000',
+                **invalid,
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SimulateDispatchCommandTestCase(TestCase):
+    def test_simulation_report(self):
+        out = StringIO()
+        call_command('simulate_dispatch', vendors=30, orders=50, hours=1, tick=600, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Replayed 50 orders over 1 simulated hours', output)
+        self.assertIn('Assignment latency', output)
+        self.assertIn('orders/s dispatching', output)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Vendor.objects.exists())
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import DeliveryRunDetailView, OrderCreateView, OrderDetailView
+
+urlpatterns = [
+    path('', OrderCreateView.as_view(), name='order-create'),
+    path('<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
+    path('runs/<int:pk>/', DeliveryRunDetailView.as_view(), name='delivery-run-detail'),
+]
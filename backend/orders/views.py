@@ -0,0 +1,29 @@
+from django.db import transaction
+from rest_framework import generics
+from .models import DeliveryRun, Order
+from .serializers import DeliveryRunSerializer, OrderSerializer
+from .tasks import dispatch_orders
+
+
+class OrderCreateView(generics.CreateAPIView):
+    """Place an order; it is assigned to a vendor in the background."""
+    queryset = Order.objects.all()
+    serializer_class = OrderSerializer
+
+    def perform_create(self, serializer):
+        # Queued together with the order, so every stored order gets dispatched
+        with transaction.atomic():
+            order = serializer.save()
+            dispatch_orders.enqueue({'order_id': order.pk})
+
+
+class OrderDetailView(generics.RetrieveAPIView):
+    """The state of an order: its vendor, delivery window and run once assigned."""
+    queryset = Order.objects.all()
+    serializer_class = OrderSerializer
+
+
+class DeliveryRunDetailView(generics.RetrieveAPIView):
+    """A courier run with the addresses to deliver to."""
+    queryset = DeliveryRun.objects.prefetch_related('orders')
+    serializer_class = DeliveryRunSerializer
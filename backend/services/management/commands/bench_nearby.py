@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.models import Service
+from vendors.models import Vendor
+from vendors.nearby import find_nearby, find_nearby_many, haversine_distance, tile_cache
+from vendors.service_index import service_index
+from vendors.synthetic import random_point, seed_vendors
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark nearby-vendor search latency against synthetic catalogs of increasing size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 100000, 1000000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--radius', type=float, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=50, help='Locations per batched query.')
+        parser.add_argument(
+            '--full-scan-limit', type=int, default=100000,
+            help='Skip the unindexed full-scan comparison above this many vendors.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'vendors':>10} {'cold p50':>10} {'cold p99':>10} {'warm p50':>10} {'warm p99':>10}"
+            f" {'scan p50':>10} {'scan p99':>10} {'query/s':>10} {'batched/s':>10}   (ms)"
+        )
+        for size in options['sizes']:
+            tile_cache.clear()
+            service_index.clear()
+            try:
+                with transaction.atomic():
+                    self.run_size(size, options)
+                    raise Rollback
+            except Rollback:
+                pass
+        tile_cache.clear()
+        service_index.clear()
+
+    def run_size(self, size, options):
+        services = [Service.objects.create(name=f'Bench Service {i}') for i in range(5)]
+        seed_vendors(size, seed=options['seed'], services=services)
+
+        rng = random.Random(options['seed'])
+        points = [random_point(rng) for _ in range(options['queries'])]
+
+        # Both sides produce the ids of nearby vendors, nearest first
+        def indexed(point):
+            find_nearby(services[0].pk, point[0], point[1], options['radius'])
+
+        def full_scan(point):
+            list(
+                Vendor.objects.annotate(distance=haversine_distance(*point))
+                .filter(distance__lte=options['radius'], services_offered__id=services[0].pk)
+                .order_by('distance').values_list('distance', 'id')
+            )
+
+        # The first pass loads the geo index, the second one reuses it
+        cold_p50, cold_p99 = self.measure(indexed, points)
+        warm_p50, warm_p99 = self.measure(indexed, points)
+        single_rate = len(points) / self.elapsed(lambda: [indexed(point) for point in points])
+        batch_size = options['batch_size']
+        batches = [points[start:start + batch_size] for start in range(0, len(points), batch_size)]
+        batched_rate = len(points) / self.elapsed(
+            lambda: [find_nearby_many(services[0].pk, batch, options['radius']) for batch in batches]
+        )
+        if size <= options['full_scan_limit']:
+            scan_p50, scan_p99 = (f'{value:.2f}' for value in self.measure(full_scan, points))
+        else:
+            scan_p50 = scan_p99 = 'skipped'
+        self.stdout.write(
+            f'{size:>10} {cold_p50:>10.2f} {cold_p99:>10.2f} {warm_p50:>10.2f} {warm_p99:>10.2f}'
+            f' {scan_p50:>10} {scan_p99:>10} {single_rate:>10.0f} {batched_rate:>10.0f}'
+        )
+
+    def elapsed(self, func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    def measure(self, func, points):
+        timings = []
+        for point in points:
+            started = time.perf_counter()
+            func(point)
+            timings.append((time.perf_counter() - started) * 1000)
+        quantiles = statistics.quantiles(timings, n=100)
+        return statistics.median(timings), quantiles[98]
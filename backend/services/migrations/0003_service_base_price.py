@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+from backend.normalize import parse_amount
+
+
+def parse_base_price(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    db_alias = schema_editor.connection.alias
+    services = list(Service.objects.using(db_alias).only('id', 'pricing'))
+    for service in services:
+        service.base_price = parse_amount(service.pricing)
+    Service.objects.using(db_alias).bulk_update(services, ['base_price'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_service_icon_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='base_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(parse_base_price, migrations.RunPython.noop),
+    ]
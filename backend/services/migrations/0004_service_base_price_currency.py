@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+from backend.normalize import parse_price
+
+
+def parse_base_price_currency(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    db_alias = schema_editor.connection.alias
+    services = list(Service.objects.using(db_alias).only('id', 'pricing'))
+    for service in services:
+        service.base_price_currency = parse_price(service.pricing)[1]
+    Service.objects.using(db_alias).bulk_update(services, ['base_price_currency'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_service_base_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='base_price_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.RunPython(parse_base_price_currency, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from backend.normalize import parse_price
 
 class Service(models.Model):
     name = models.CharField(max_length=255)
@@ -7,6 +8,17 @@ class Service(models.Model):
     duration = models.CharField(max_length=50)
     terms_and_conditions = models.TextField()
     icon_url = models.URLField(blank=True, null=True)
+    # Parsed from pricing on save
+    base_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, db_index=True, editable=False)
+    # Blank when the pricing names no currency
+    base_price_currency = models.CharField(max_length=3, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.base_price, self.base_price_currency = parse_price(self.pricing)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'base_price', 'base_price_currency'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
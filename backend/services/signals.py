@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from backend.response_cache import invalidate
+from .models import Service
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_responses(sender, instance, **kwargs):
+    invalidate('services', f'service:{instance.pk}')
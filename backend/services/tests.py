@@ -1,3 +1,563 @@
-from django.test import TestCase
+import base64
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from datetime import datetime, timezone
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from backend.normalize import parse_print_prices
+from backend.response_cache import get_versions
+from vendors.geo import bounding_box, covering_geohashes, encode_geohash, haversine_km
+from vendors.hours import open_vendors
+from vendors.models import OpeningInterval, Vendor
+from vendors.nearby import TileCache, find_nearby, find_nearby_many, tile_cache
+from vendors.quotes import PricingRules, pricing_rules
+from vendors.service_index import ServiceVendorIndex, service_index
+from vendors.serializers import VendorListSerializer
+from .models import Service
+from .serializers import ServiceSerializer
 
-# Create your tests here.
+
+class VendorsByServiceViewTestCase(TestCase):
+    def setUp(self):
+        tile_cache.clear()
+        service_index.clear()
+        open_vendors.clear()
+        pricing_rules.clear()
+        self.client = APIClient()
+        self.service = Service.objects.create(name="Test Service")
+        self.vendor_data = {
+            "contact_person": "John Doe",
+            "contact_phone_number": "1234567890",
+            "address": "123 Test St, Test City",
+            "business_hours": "9AM-5PM",
+            "time_zone": "America/Los_Angeles",
+            "accepted_file_formats": "PDF, JPEG",
+            "pricing_information": "Standard rates apply",
+            "payment_methods": "Credit Card, PayPal",
+            "terms_and_conditions": "Standard terms apply"
+        }
+        # Downtown San Francisco, Oakland (~13 km away) and Los Angeles
+        self.near = self.create_vendor("Near Vendor", "37.779026", "-122.419906")
+        self.oakland = self.create_vendor("Oakland Vendor", "37.804363", "-122.271111")
+        self.far = self.create_vendor("Far Vendor", "34.052235", "-118.243683")
+        self.origin = {'latitude': '37.774929', 'longitude': '-122.419416'}
+
+    def create_vendor(self, name, latitude, longitude):
+        vendor = Vendor.objects.create(
+            business_name=name,
+            contact_email=f"{name.split()[0].lower()}@example.com",
+            location_latitude=latitude,
+            location_longitude=longitude,
+            **self.vendor_data
+        )
+        vendor.services_offered.add(self.service)
+        return vendor
+
+    def test_geohash_is_kept_in_sync(self):
+        self.assertEqual(self.near.geohash, encode_geohash(37.779026, -122.419906))
+        self.near.location_latitude = "34.052235"
+        self.near.location_longitude = "-118.243683"
+        self.near.save(update_fields=['location_latitude', 'location_longitude'])
+        self.near.refresh_from_db()
+        self.assertEqual(self.near.geohash, self.far.geohash)
+
+    def test_covering_geohashes_contain_points_in_radius(self):
+        latitude, longitude = 37.774929, -122.419416
+        cells = covering_geohashes(*bounding_box(latitude, longitude, 10))
+        self.assertTrue(cells)
+        for vendor in (self.near, self.oakland):
+            if haversine_km(latitude, longitude, vendor.location_latitude, vendor.location_longitude) <= 10:
+                self.assertTrue(any(vendor.geohash.startswith(cell) for cell in cells))
+
+    def test_nearby_vendors_for_service(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        response = self.client.get(url, self.origin)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([vendor['business_name'] for vendor in response.data], ["Near Vendor"])
+        self.assertNotIn('geohash', response.data[0])
+
+    def test_nearby_vendors_for_all_services(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': 0})
+        response = self.client.get(url, {'latitude': '37.79', 'longitude': '-122.33'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [vendor['business_name'] for vendor in response.data],
+            ["Oakland Vendor", "Near Vendor"]
+        )
+
+    def test_radius_parameter(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        response = self.client.get(url, {**self.origin, 'radius': 20})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [vendor['business_name'] for vendor in response.data],
+            ["Near Vendor", "Oakland Vendor"]
+        )
+
+    def test_invalid_parameters(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        for params in ({'radius': 'far'}, {'radius': -1}, {'latitude': 91}, {'limit': 0}, {'cursor': 'nope'}):
+            response = self.client.get(url, {**self.origin, 'limit': 1, **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for position in ('nan:1', 'inf:1', '-1.0:1'):
+            cursor = base64.urlsafe_b64encode(position.encode()).decode()
+            response = self.client.get(url, {**self.origin, 'limit': 1, 'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nearest_pagination(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        response = self.client.get(url, {**self.origin, 'radius': 20, 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([vendor['business_name'] for vendor in response.data['results']], ["Near Vendor"])
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([vendor['business_name'] for vendor in response.data['results']], ["Oakland Vendor"])
+        self.assertIsNone(response.data['next'])
+
+    def test_compact_representation_and_sparse_fields(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        response = self.client.get(url, self.origin)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Every field by default, the compact representation when asked for
+        self.assertEqual(response.data[0]['services_offered'], [ServiceSerializer(self.service).data])
+        self.assertEqual(response.data[0]['terms_and_conditions'], "Standard terms apply")
+        self.assertLess(response.data[0]['distance'], 1)
+        response = self.client.get(url, {**self.origin, 'fields': 'compact'})
+        self.assertEqual(set(response.data[0]), set(VendorListSerializer.fieldsets['compact']))
+        self.assertLess(response.data[0]['distance'], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {**self.origin, 'fields': 'id,business_name', 'expand': 'services'})
+        self.assertEqual(
+            response.data,
+            [{'id': self.near.id, 'business_name': "Near Vendor", 'services_offered': [
+                ServiceSerializer(self.service).data
+            ]}]
+        )
+        self.assertNotIn('terms_and_conditions', queries[0]['sql'])
+
+        for params in ({'fields': 'id,secret'}, {'fields': ','}, {'expand': 'owner'}):
+            response = self.client.get(url, {**self.origin, **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rating_and_price_are_parsed(self):
+        self.near.reviews_and_ratings = "4.5/5 based on 100 reviews"
+        self.near.pricing_information = "Black & white: $0.10/page, Color: $0.50/page"
+        self.near.save()
+        self.near.refresh_from_db()
+        self.assertEqual((self.near.rating_avg, self.near.rating_count), (Decimal('4.50'), 100))
+        self.assertEqual((self.near.price_per_page, self.near.price_currency), (Decimal('0.1000'), 'USD'))
+        self.assertEqual((self.near.color_price_per_page, self.near.minimum_charge), (Decimal('0.5000'), None))
+        self.oakland.pricing_information = "₹5 per colour page, ₹0.80 per page; minimum charge ₹20"
+        self.oakland.save()
+        self.oakland.refresh_from_db()
+        self.assertEqual(
+            (self.oakland.price_per_page, self.oakland.color_price_per_page, self.oakland.minimum_charge),
+            (Decimal('0.8000'), Decimal('5.0000'), Decimal('20.00'))
+        )
+        # Amounts too large for their columns are left unparsed rather than failing the save
+        self.oakland.pricing_information = "Rs 12345678 per page, minimum charge 123456789"
+        self.oakland.save()
+        self.oakland.refresh_from_db()
+        self.assertEqual(
+            (self.oakland.price_per_page, self.oakland.minimum_charge, self.oakland.price_currency), (None, None, '')
+        )
+        self.assertIsNone(Service.objects.create(name="Framing", pricing="From $123456789").base_price)
+        self.oakland.reviews_and_ratings = "4/5 from 12345678901 reviews"
+        self.oakland.save()
+        self.oakland.refresh_from_db()
+        self.assertEqual((self.oakland.rating_avg, self.oakland.rating_count), (Decimal('4.00'), None))
+        # Labels may follow the price too
+        for text in ("$0.10/page bw, $0.50/page color", "$0.50/page (colour) | $0.10/page (B/W)"):
+            self.assertEqual(parse_print_prices(text), (Decimal('0.10'), Decimal('0.50'), None, 'USD'))
+        self.assertIsNone(self.far.rating_avg)
+        binding = Service.objects.create(name="Binding", pricing="From $2.50")
+        self.assertEqual((binding.base_price, binding.base_price_currency), (Decimal('2.50'), 'USD'))
+
+    def test_rating_and_price_filters_and_ordering(self):
+        self.near.reviews_and_ratings = "3.9/5 based on 12 reviews"
+        self.near.pricing_information = "$0.05 per page"
+        self.near.save()
+        self.oakland.reviews_and_ratings = "4.8/5 based on 40 reviews"
+        self.oakland.pricing_information = "$0.20 per page"
+        self.oakland.save()
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        params = {**self.origin, 'radius': 20}
+
+        def names(**extra):
+            response = self.client.get(url, {**params, **extra})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [vendor['business_name'] for vendor in response.data]
+
+        # Listed in rupees, so only compared with the prices of other rupee vendors
+        self.far.pricing_information = "₹0.04 per page"
+        self.far.location_latitude, self.far.location_longitude = "37.776", "-122.418"
+        self.far.save()
+
+        self.assertEqual(names(ordering='rating'), ["Oakland Vendor", "Near Vendor", "Far Vendor"])
+        self.assertEqual(names(ordering='price', currency='USD'), ["Near Vendor", "Oakland Vendor"])
+        self.assertEqual(names(min_rating=4), ["Oakland Vendor"])
+        self.assertEqual(names(max_price=0.1, currency='USD'), ["Near Vendor"])
+        self.assertEqual(names(max_price=0.1, currency='inr'), ["Far Vendor"])
+        self.assertEqual(names(min_rating=4, max_price=0.1, currency='USD'), [])
+        self.assertEqual(names(currency='USD'), ["Near Vendor", "Oakland Vendor"])
+        with override_settings(NEARBY_SERVICE_INDEX_SIZE=0):
+            service_index.clear()
+            self.assertEqual([vendor_id for _, vendor_id in find_nearby(
+                self.service.id, 37.774929, -122.419416, 20, max_price=0.1, currency='INR')], [self.far.id])
+        for extra in ({'ordering': 'name'}, {'ordering': 'price'}, {'max_price': 0.1}, {'currency': 'dollars'}):
+            response = self.client.get(url, {**params, **extra})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_business_hours_are_parsed(self):
+        self.assertEqual(self.near.opening_intervals.count(), 7)
+        self.near.business_hours = "Mon-Fri, 9 AM - 5 PM; Sat 10-2; Sun closed"
+        self.near.save()
+        intervals = self.near.opening_intervals.order_by('weekday', 'opens').values_list('weekday', 'opens', 'closes')
+        self.assertEqual(list(intervals), [*((day, 540, 1020) for day in range(5)), (5, 600, 840)])
+        self.near.business_hours = "Fri-Sat 6PM-2AM"
+        self.near.save()
+        self.assertEqual(list(intervals.all()), [(4, 1080, 1440), (5, 0, 120), (5, 1080, 1440), (6, 0, 120)])
+        # Unchanged hours are not rewritten
+        with CaptureQueriesContext(connection) as queries:
+            self.near.save(update_fields=['business_name'])
+        self.assertFalse([query for query in queries if 'openinginterval' in query['sql']])
+        self.assertEqual(OpeningInterval.objects.open_at({'America/Los_Angeles': (6, 60)}).get().vendor, self.near)
+
+    def test_open_now_and_open_at_filters(self):
+        self.oakland.business_hours = "Fri-Sat 6PM-2AM"
+        self.oakland.save()
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        params = {**self.origin, 'radius': 20}
+
+        def names(**extra):
+            response = self.client.get(url, {**params, **extra})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [vendor['business_name'] for vendor in response.data]
+
+        self.assertEqual(names(open_at='2026-10-19T10:00'), ["Near Vendor"])
+        self.assertEqual(names(open_at='2026-10-24T01:30'), ["Oakland Vendor"])
+        self.assertEqual(names(open_at='2026-10-19T08:00'), [])
+        # Aware times are converted to the time zone of each vendor
+        self.assertEqual(names(open_at='2026-10-19T17:30:00+00:00'), ["Near Vendor"])
+        self.assertEqual(names(open_at='2026-10-19T10:00:00+00:00'), [])
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 10, 24, 19, tzinfo=timezone.utc)):
+            self.assertEqual(names(open_now='true'), ["Near Vendor"])
+        response = self.client.get(url, {**params, 'open_at': 'tomorrow'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Without NumPy and through the tile cache
+        with mock.patch('vendors.service_index.np', None), mock.patch('vendors.hours.np', None):
+            open_vendors.clear()
+            nearby = find_nearby(self.service.id, 37.774929, -122.419416, 20, open_at=datetime(2026, 10, 24, 1, 30))
+            self.assertEqual(nearby[0][1], self.oakland.id)
+        with override_settings(NEARBY_SERVICE_INDEX_SIZE=0):
+            service_index.clear()
+            self.assertEqual([vendor_id for _, vendor_id in find_nearby(
+                self.service.id, 37.774929, -122.419416, 20, open_at=datetime(2026, 10, 19, 10))], [self.near.id])
+
+    def test_business_hours_in_vendor_time_zones(self):
+        delhi = {'latitude': '28.613939', 'longitude': '77.209023'}
+        self.vendor_data.update(business_hours="Mon-Sat, 10 AM - 8 PM", time_zone="Asia/Kolkata")
+        connaught = self.create_vendor("Connaught Vendor", "28.631451", "77.216667")
+        # Vendors without a time zone are in BUSINESS_HOURS_TIME_ZONE
+        self.vendor_data['time_zone'] = ""
+        karol = self.create_vendor("Karol Vendor", "28.651952", "77.190969")
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+
+        def names(origin, open_at):
+            response = self.client.get(url, {**origin, 'radius': 20, 'open_at': open_at})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [vendor['business_name'] for vendor in response.data]
+
+        with override_settings(BUSINESS_HOURS_TIME_ZONE='Asia/Kolkata'):
+            self.assertEqual(names(delhi, '2026-10-19T11:00:00+05:30'), ["Connaught Vendor", "Karol Vendor"])
+            self.assertEqual(names(delhi, '2026-10-19T05:30:00Z'), ["Connaught Vendor", "Karol Vendor"])
+            self.assertEqual(names(delhi, '2026-10-19T22:00:00+05:30'), [])
+            # 10:00 in San Francisco is 22:30 in Delhi
+            self.assertEqual(names(delhi, '2026-10-19T10:00:00-07:00'), [])
+            self.assertEqual(names(self.origin, '2026-10-19T10:00:00-07:00'), ["Near Vendor", "Oakland Vendor"])
+
+            # Changing the time zone alone rewrites the intervals
+            connaught.time_zone = "UTC"
+            connaught.save(update_fields=['time_zone'])
+            open_vendors.clear()
+            self.assertEqual(names(delhi, '2026-10-19T11:00:00+05:30'), ["Karol Vendor"])
+            self.assertEqual(names(delhi, '2026-10-19T10:30:00Z'), ["Connaught Vendor", "Karol Vendor"])
+        self.assertEqual(karol.opening_intervals.get(weekday=0).time_zone, "")
+
+        with self.assertRaises(ValidationError):
+            Vendor._meta.get_field('time_zone').run_validators("Mars/Olympus_Mons")
+
+    def test_print_quotes(self):
+        self.service.pricing = "$1.00 per job"
+        self.service.save()
+        self.near.pricing_information = "B&W: $0.10/page, Colour: $0.50/page"
+        self.near.save()
+        self.oakland.pricing_information = "Black & white $0.08 per page. Minimum charge $5"
+        self.oakland.save()
+        url = reverse('print-quotes', kwargs={'service_id': self.service.id})
+        params = {**self.origin, 'radius': 20}
+
+        def quotes(**extra):
+            response = self.client.get(url, {**params, **extra})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [(vendor['business_name'], vendor['total_price']) for vendor in response.data]
+
+        # The minimum charge makes the cheaper rate the dearer quote for small jobs
+        self.assertEqual(quotes(pages=10, copies=2), [("Near Vendor", "3.00"), ("Oakland Vendor", "6.00")])
+        self.assertEqual(quotes(pages=100), [("Oakland Vendor", "9.00"), ("Near Vendor", "11.00")])
+        self.assertEqual(quotes(pages=100, limit=1), [("Oakland Vendor", "9.00")])
+        # Oakland lists no colour rate
+        self.assertEqual(quotes(pages=100, color='true'), [("Near Vendor", "51.00")])
+        response = self.client.get(url, {**params, 'pages': 100})
+        self.assertEqual(
+            {key: response.data[0][key] for key in ('price_currency', 'minimum_charge', 'color_price_per_page')},
+            {'price_currency': 'USD', 'minimum_charge': '5.00', 'color_price_per_page': None}
+        )
+
+        # Pricing changes update the rules in place: only the service and the final vendors, with their
+        # services, are loaded
+        self.near.pricing_information = "$0.05 per page"
+        self.near.save()
+        with self.assertNumQueries(4):
+            self.assertEqual(quotes(pages=100), [("Near Vendor", "6.00"), ("Oakland Vendor", "9.00")])
+
+        # Quotes are in the nearest vendor's currency unless one is asked for; the base price is in dollars
+        self.far.pricing_information = "₹0.50 per page"
+        self.far.location_latitude, self.far.location_longitude = "37.776", "-122.418"
+        self.far.save()
+        self.assertEqual(quotes(pages=100), [("Far Vendor", "50.00")])
+        self.assertEqual(quotes(pages=100, currency='usd'), [("Near Vendor", "6.00"), ("Oakland Vendor", "9.00")])
+        self.assertEqual(quotes(pages=100, color='true', currency='USD'), [("Near Vendor", "6.00")])
+
+        for extra in ({}, {'pages': 0}, {'pages': 'ten'}, {'pages': 1, 'copies': 0}):
+            response = self.client.get(url, {**params, **extra})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('print-quotes', kwargs={'service_id': 999}), {**params, 'pages': 1})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_print_quotes_without_numpy(self):
+        self.near.pricing_information = "$0.10 per page, minimum charge $2"
+        self.near.save()
+        self.oakland.pricing_information = "Colour: $0.40 per page"
+        self.oakland.save()
+        self.far.pricing_information = "₹0.50 per page"
+        self.far.location_latitude, self.far.location_longitude = "37.804", "-122.271"
+        self.far.save()
+        nearby = find_nearby(self.service.id, 37.774929, -122.419416, 20) + [(1.0, 0)]
+        columns = pricing_rules.get_columns()
+        with mock.patch('vendors.quotes.np', None):
+            fallback = PricingRules(ttl=60).get_columns()
+            for units, color, currency in ((5, False, None), (50, False, 'INR'), (50, True, None), (5, False, 'EUR')):
+                self.assertEqual(fallback.price(nearby, units, color, 1.5, currency=currency, base_currency='USD'),
+                                 columns.price(nearby, units, color, 1.5, currency=currency, base_currency='USD'))
+            quotes = fallback.price(nearby, 50, False, 1.5, currency='INR', base_currency='USD')
+            self.assertEqual([(total, vendor_id, currency) for total, _, vendor_id, currency in quotes],
+                             [(25.0, self.far.id, 'INR')])
+            self.assertEqual([quote[2] for quote in fallback.price(nearby, 50, True)], [self.near.id, self.oakland.id])
+
+    def test_tile_cache_reuse_and_invalidation(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        self.client.get(url, self.origin)
+        # Only the final vendors, and their services, are loaded from then on
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'latitude': '37.775', 'longitude': '-122.4195'})
+        self.assertEqual([vendor['business_name'] for vendor in response.data], ["Near Vendor"])
+
+        # Moving a vendor into the area invalidates the tiles it falls in
+        self.far.location_latitude = "37.776"
+        self.far.location_longitude = "-122.418"
+        self.far.save()
+        response = self.client.get(url, self.origin)
+        self.assertEqual([vendor['business_name'] for vendor in response.data], ["Far Vendor", "Near Vendor"])
+
+        self.far.services_offered.remove(self.service)
+        response = self.client.get(url, self.origin)
+        self.assertEqual([vendor['business_name'] for vendor in response.data], ["Near Vendor"])
+
+        self.near.delete()
+        self.assertEqual(self.client.get(url, self.origin).data, [])
+
+    def test_service_index_is_updated_in_place(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        params = {**self.origin, 'radius': 20}
+        self.client.get(url, params)
+        other = Service.objects.create(name="Other Service")
+        self.oakland.services_offered.set([other])
+        self.far.location_latitude = "37.776"
+        self.far.location_longitude = "-122.418"
+        self.far.save()
+        # Only the final vendors are loaded; the service's vendors were not reloaded
+        with self.assertNumQueries(1):
+            self.client.get(url, {**params, 'fields': 'compact'})
+        with self.assertNumQueries(3):
+            response = self.client.get(url, params)
+        self.assertEqual([vendor['business_name'] for vendor in response.data], ["Far Vendor", "Near Vendor"])
+
+        other.vendors.add(self.near)
+        self.assertEqual(find_nearby(other.id, 37.774929, -122.419416, 20), [
+            (haversine_km(37.774929, -122.419416, 37.779026, -122.419906), self.near.id),
+            (haversine_km(37.774929, -122.419416, 37.804363, -122.271111), self.oakland.id),
+        ])
+        other.delete()
+        self.assertNotIn(other.id, service_index.entries)
+
+    def test_service_index_without_numpy(self):
+        self.near.reviews_and_ratings = "4.5/5"
+        self.near.save()
+        index = ServiceVendorIndex(ttl=60)
+        with mock.patch('vendors.service_index.np', None):
+            points = index.get_points(self.service.id)
+            nearby = points.within(37.774929, -122.419416, 20)
+            self.assertEqual([vendor_id for _, vendor_id in nearby], [self.near.id, self.oakland.id])
+            self.assertEqual(points.within(37.774929, -122.419416, 20, min_rating=4), nearby[:1])
+            self.assertEqual(points.within(37.774929, -122.419416, 20, after=nearby[0]), nearby[1:])
+            self.assertEqual(points.within(37.774929, -122.419416, 20, ordering='rating', limit=1), nearby[:1])
+            self.assertEqual(points.within_many([(37.774929, -122.419416), (34.05, -118.24)], 20), [
+                nearby, [(points.within(34.05, -118.24, 20)[0][0], self.far.id)]
+            ])
+            index.update_vendor(self.near.id)
+            self.assertEqual(index.get_points(self.service.id).within(37.774929, -122.419416, 20), nearby[1:])
+
+    def test_batched_nearby_search(self):
+        locations = [(37.774929, -122.419416), (37.79, -122.33), (34.05, -118.24), (-33.87, 151.21)]
+        for service_id in (0, self.service.id):
+            self.assertEqual(
+                find_nearby_many(service_id, locations, 20, limit=1),
+                [find_nearby(service_id, *location, 20, limit=1) for location in locations]
+            )
+
+    @override_settings(NEARBY_SERVICE_INDEX_SIZE=2)
+    def test_services_over_the_index_budget_use_the_tile_cache(self):
+        self.oakland.reviews_and_ratings = "4.8/5 based on 40 reviews"
+        self.oakland.save()
+        url = reverse('vendors-by-service', kwargs={'service_id': self.service.id})
+        response = self.client.get(url, {**self.origin, 'radius': 20, 'ordering': 'rating'})
+        self.assertEqual([vendor['business_name'] for vendor in response.data], ["Oakland Vendor", "Near Vendor"])
+        self.assertIsNone(service_index.entries[self.service.id][1])
+
+        response = self.client.get(url, {**self.origin, 'radius': 20, 'limit': 1})
+        response = self.client.get(response.data['next'])
+        self.assertEqual([vendor['business_name'] for vendor in response.data['results']], ["Oakland Vendor"])
+        self.assertTrue(tile_cache.entries)
+
+    def test_service_index_memory_budget(self):
+        # Each service costs one slot plus one per vendor
+        index = ServiceVendorIndex(max_size=5, ttl=60)
+        other = Service.objects.create(name="Other Service")
+        self.near.services_offered.add(other)
+        index.get_points(self.service.id)
+        index.get_points(other.id)
+        self.assertEqual(list(index.entries), [other.id])
+        self.assertEqual(index.size, 2)
+
+    def test_tile_cache_memory_budget(self):
+        # Each tile costs one slot plus one per candidate
+        cache = TileCache(max_size=4, ttl=60)
+        cache.get_candidates(self.service.id, [self.near.geohash[:5]])
+        cache.get_candidates(self.service.id, [self.far.geohash[:5]])
+        self.assertEqual(list(cache.entries), [
+            (self.service.id, self.near.geohash[:5]), (self.service.id, self.far.geohash[:5]),
+        ])
+        cache.get_candidates(self.service.id, [self.oakland.geohash[:5]])
+        self.assertEqual(cache.size, 4)
+        self.assertNotIn((self.service.id, self.near.geohash[:5]), cache.entries)
+
+
+class CachedResponseTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.service = Service.objects.create(name="Test Service")
+        self.vendor = Vendor.objects.create(
+            business_name="Test Vendor",
+            contact_person="John Doe",
+            contact_email="john@example.com",
+            contact_phone_number="1234567890",
+            address="123 Test St, Test City",
+            location_latitude="40.712776",
+            location_longitude="-74.005974",
+            business_hours="9AM-5PM",
+            accepted_file_formats="PDF, JPEG",
+            pricing_information="Standard rates apply",
+            payment_methods="Credit Card, PayPal",
+            terms_and_conditions="Standard terms apply"
+        )
+
+    def test_service_list_is_cached_until_a_service_changes(self):
+        url = reverse('service-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual([service['name'] for service in response.data], ["Test Service"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('service-register'), {
+                'name': "New Service", 'description': "New", 'pricing': "$1",
+                'duration': "1 day", 'terms_and_conditions': "None"
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(url)
+        self.assertEqual([service['name'] for service in response.data], ["Test Service", "New Service"])
+
+    def test_conditional_requests(self):
+        url = reverse('service-detail', kwargs={'pk': self.service.pk})
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.service.name = "Renamed Service"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], "Renamed Service")
+
+    def test_versions_are_bumped_when_the_write_commits(self):
+        url = reverse('service-detail', kwargs={'pk': self.service.pk})
+        self.client.get(url)
+        versions = get_versions(['services', f'service:{self.service.pk}'])
+        self.service.name = "Renamed Service"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.service.save()
+            # A read before the commit is cached under the old versions only
+            self.assertEqual(get_versions(['services', f'service:{self.service.pk}']), versions)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_versions(['services', f'service:{self.service.pk}']), versions)
+        self.assertEqual(self.client.get(url).data['name'], "Renamed Service")
+
+    def test_vendor_detail_invalidation(self):
+        url = reverse('vendor-detail', kwargs={'pk': self.vendor.pk})
+        self.assertEqual(self.client.get(url).data['services_offered'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.services_offered.add(self.service)
+        response = self.client.get(url)
+        self.assertEqual([service['name'] for service in response.data['services_offered']], ["Test Service"])
+
+        self.service.name = "Renamed Service"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.save()
+        response = self.client.get(url)
+        self.assertEqual([service['name'] for service in response.data['services_offered']], ["Renamed Service"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.delete()
+        self.assertEqual(self.client.get(url).data['services_offered'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('vendor-delete', kwargs={'pk': self.vendor.pk}))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
@@ -1,10 +1,14 @@
 from django.urls import path
-from .views import ServiceCreateView, ServiceDetailView, ServiceListView, VendorsByServiceView
+from .views import (
+    PrintQuoteView, ServiceCreateView, ServiceDetailView, ServiceExportView, ServiceListView, VendorsByServiceView,
+)
 
 urlpatterns = [
     path('', ServiceListView.as_view(), name='service-list'),
     path('register/', ServiceCreateView.as_view(), name='service-register'),
+    path('export/', ServiceExportView.as_view(), name='service-export'),
     path('<int:pk>/', ServiceDetailView.as_view(), name='service-detail'),
     path('<int:service_id>/vendors/', VendorsByServiceView.as_view(), name='vendors-by-service'),
+    path('<int:service_id>/quotes/', PrintQuoteView.as_view(), name='print-quotes'),
 
 ]
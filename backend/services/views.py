@@ -1,81 +1,278 @@
+import base64
 import math
+from functools import cached_property
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics
 from .models import Service
 from .serializers import ServiceSerializer
-from django.db.models import F, FloatField
-from django.db.models.functions import Sqrt, Power, Cast, Radians, Sin, Cos, ATan2
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from backend.fast_serializers import ValuesSerializer
+from backend.response_cache import CachedResponseMixin
+from backend.sparse_fields import SparseFieldsViewMixin
+from backend.streaming import EXPORT_CHUNK_SIZE, json_lines_response
 from vendors.models import Vendor
-from vendors.serializers import VendorSerializer
+from vendors.nearby import find_nearby, find_nearest
+from vendors.quotes import find_quotes
+from vendors.serializers import VendorListSerializer, VendorQuoteSerializer
 
 class ServiceCreateView(generics.CreateAPIView):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
 
-class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ServiceDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
 
-class ServiceListView(generics.ListAPIView):
+    def get_cache_scopes(self):
+        return [f"service:{self.kwargs['pk']}"]
+
+class ServiceListView(CachedResponseMixin, generics.ListAPIView):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
 
-class VendorsByServiceView(generics.ListAPIView):
-    serializer_class = VendorSerializer
+    def get_cache_scopes(self):
+        return ['services']
 
-    def get_queryset(self):
-        service_id = self.kwargs.get('service_id')
-        user_latitude = float(self.request.query_params.get('latitude', 0))
-        user_longitude = float(self.request.query_params.get('longitude', 0))
-        radius_km = 10  # Radius in kilometers
-
-        # Convert latitude and longitude to radians
-        user_lat_rad = math.radians(user_latitude)
-        user_lon_rad = math.radians(user_longitude)
-
-        # Haversine formula to calculate distance
-        vendors = Vendor.objects.annotate(
-            distance=(
-                6371 * 2 * ATan2(
-                    Sqrt(
-                        Sin(
-                            (Radians(F('location_latitude')) - user_lat_rad) / 2,
-                            output_field=FloatField()
-                        ) ** 2 +
-                        Cos(user_lat_rad) * Cos(Radians(F('location_latitude'))) *
-                        Sin(
-                            (Radians(F('location_longitude')) - user_lon_rad) / 2,
-                            output_field=FloatField()
-                        ) ** 2
-                    ),
-                    Sqrt(
-                        1 - (
-                            Sin(
-                                (Radians(F('location_latitude')) - user_lat_rad) / 2,
-                                output_field=FloatField()
-                            ) ** 2 +
-                            Cos(user_lat_rad) * Cos(Radians(F('location_latitude'))) *
-                            Sin(
-                                (Radians(F('location_longitude')) - user_lon_rad) / 2,
-                                output_field=FloatField()
-                            ) ** 2
-                        ),
-                        output_field=FloatField()
-                    ),
-                    output_field=FloatField()
-                )
+class ServiceExportView(generics.GenericAPIView):
+    """Every service as JSON Lines, streamed in primary-key order."""
+    queryset = Service.objects.all()
+    serializer_class = ServiceSerializer
+    chunk_size = EXPORT_CHUNK_SIZE
+
+    def get(self, request, *args, **kwargs):
+        serializer = ValuesSerializer(self.get_serializer())
+        return json_lines_response(request, serializer, self.get_queryset(), 'services.jsonl', self.chunk_size)
+
+class VendorsByServiceView(SparseFieldsViewMixin, generics.ListAPIView):
+    serializer_class = VendorListSerializer
+
+    default_radius_km = 10
+    max_radius_km = 100
+    max_limit = 100
+    # Radius of the first ring searched in k-nearest mode; it doubles until
+    # enough vendors are found or the requested radius is reached
+    initial_ring_km = 1
+    # Orderings accepted in list mode, applied by the geo index: rating high
+    # to low and price low to high, missing values last and ties nearest first
+    orderings = ('distance', 'rating', 'price')
+
+    def get_float_param(self, name, default, minimum=None, maximum=None):
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValidationError({name: 'A valid number is required.'})
+        if not math.isfinite(value) or (minimum is not None and value < minimum) or \
+                (maximum is not None and value > maximum):
+            raise ValidationError({name: f'Must be between {minimum} and {maximum}.'})
+        return value
+
+    def get_int_param(self, name, default, minimum, maximum):
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+        if not minimum <= value <= maximum:
+            raise ValidationError({name: f'Must be between {minimum} and {maximum}.'})
+        return value
+
+    def get_bool_param(self, name):
+        return self.request.query_params.get(name, '').lower() in ('1', 'true', 'yes')
+
+    def get_location(self):
+        latitude = self.get_float_param('latitude', 0, -90, 90)
+        longitude = self.get_float_param('longitude', 0, -180, 180)
+        return latitude, longitude
+
+    def get_radius(self):
+        return self.get_float_param('radius', self.default_radius_km, 0, self.max_radius_km)
+
+    def get_filters(self):
+        max_price = self.get_float_param('max_price', None, 0)
+        currency = self.get_currency()
+        if max_price is not None and currency is None:
+            raise ValidationError({'currency': 'This parameter is required with max_price.'})
+        return {
+            'min_rating': self.get_float_param('min_rating', None, 0, 5),
+            'max_price': max_price,
+            'open_at': self.get_open_at(),
+            'currency': currency,
+        }
+
+    def get_currency(self):
+        """
+        The ISO 4217 code, like ``INR``, of the only currency whose vendors are
+        kept. Prices in different currencies cannot be compared, so it is
+        required to filter or order by price.
+        """
+        currency = self.request.query_params.get('currency')
+        if not currency:
+            return None
+        if len(currency) != 3 or not currency.isalpha() or not currency.isascii():
+            raise ValidationError({'currency': 'A three-letter currency code is required.'})
+        return currency.upper()
+
+    def get_open_at(self):
+        """
+        The time vendors must be open at: ``open_at`` as an ISO 8601 date and
+        time, read in each vendor's time zone when it has no offset, or the
+        current time with ``open_now=true``.
+        """
+        open_at = self.request.query_params.get('open_at')
+        if open_at:
+            try:
+                moment = parse_datetime(open_at)
+            except ValueError:
+                moment = None
+            if moment is None:
+                raise ValidationError({'open_at': 'A valid ISO 8601 date and time is required.'})
+            return moment
+        if self.get_bool_param('open_now'):
+            return timezone.now()
+        return None
+
+    def get_ordering(self):
+        ordering = self.request.query_params.get('ordering') or 'distance'
+        if ordering not in self.orderings:
+            raise ValidationError({'ordering': f"Must be one of {', '.join(self.orderings)}."})
+        if ordering == 'price' and self.get_currency() is None:
+            raise ValidationError({'currency': 'This parameter is required with price ordering.'})
+        return ordering
+
+    def get_limit(self):
+        return self.get_int_param('limit', None, 1, self.max_limit)
+
+    def get_vendors(self, nearby):
+        """Load the rows of the vendors of ``[(distance, id), ...]`` with their distance, in that order."""
+        vendors = self.values_serializer.in_bulk(Vendor.objects.all(), [vendor_id for _, vendor_id in nearby])
+        ordered = []
+        for distance, vendor_id in nearby:
+            if vendor_id in vendors:
+                row = vendors[vendor_id]
+                row['distance'] = distance
+                ordered.append(row)
+        return ordered
+
+    def get_in_radius(self):
+        user_latitude, user_longitude = self.get_location()
+        radius_km = self.get_radius()
+
+        # Filtered and ordered by the in-memory geo index
+        nearby = find_nearby(
+            self.kwargs.get('service_id'), user_latitude, user_longitude, radius_km,
+            ordering=self.get_ordering(), **self.get_filters()
+        )
+        return self.get_vendors(nearby)
+
+    def get_nearest(self, limit, after=None):
+        """
+        Return up to ``limit`` vendors closest to the user, ordered by distance
+        and id, starting after the ``(distance, id)`` position of a cursor.
+        Rings of growing radius are searched so dense areas stop early.
+        """
+        user_latitude, user_longitude = self.get_location()
+        nearby = find_nearest(
+            self.kwargs.get('service_id'), user_latitude, user_longitude, limit, self.get_radius(),
+            after=after, initial_ring_km=self.initial_ring_km, **self.get_filters()
+        )
+        return self.get_vendors(nearby)
+
+    @cached_property
+    def values_serializer(self):
+        return ValuesSerializer(self.get_serializer())
+
+    def encode_cursor(self, row):
+        position = f"{row['distance']!r}:{row['id']}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self):
+        cursor = self.request.query_params.get('cursor')
+        if not cursor:
+            return None
+        try:
+            distance, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+            distance, pk = float(distance), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        # A NaN or infinite distance would never reach the radius in find_nearest
+        if not math.isfinite(distance) or distance < 0:
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        return distance, pk
+
+    def list(self, request, *args, **kwargs):
+        limit = self.get_limit()
+        if limit is None:
+            rows = self.get_in_radius()
+            return Response(self.values_serializer.represent(rows))
+
+        if self.get_ordering() != 'distance':
+            raise ValidationError({'ordering': 'Only distance ordering is supported with limit.'})
+        # k-nearest mode: fetch one extra vendor to know if there is a next page
+        rows = self.get_nearest(limit + 1, after=self.decode_cursor())
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', self.encode_cursor(rows[-1])
             )
-        ).filter(distance__lte=radius_km)
+        return Response({
+            'next': next_url,
+            'results': self.values_serializer.represent(rows)
+        })
 
-        if service_id != 0:
-            vendors = vendors.filter(services_offered__id=service_id)
 
-        # Sort by distance and then by reviews and ratings
-        vendors = vendors.order_by('distance', '-reviews_and_ratings')
+class PrintQuoteView(VendorsByServiceView):
+    """
+    The total price of a print job at every vendor of the service around the
+    user, cheapest first. ``pages``, ``copies`` and ``color`` describe the
+    job; the location, radius and filters are those of the nearby search and
+    ``limit`` keeps the cheapest vendors only. Vendors without a rate for the
+    job are left out. Quotes are in ``currency`` when it is given, and
+    otherwise in the currency of the nearest vendor that can print the job;
+    vendors pricing in other currencies are left out too.
+    """
+    serializer_class = VendorQuoteSerializer
 
-        return vendors
+    max_pages = 100000
+    max_copies = 10000
+
+    def get_job(self):
+        """Return ``(pages, copies, color)``."""
+        pages = self.get_int_param('pages', None, 1, self.max_pages)
+        if pages is None:
+            raise ValidationError({'pages': 'This parameter is required.'})
+        return pages, self.get_int_param('copies', 1, 1, self.max_copies), self.get_bool_param('color')
+
+    def get_base_price(self):
+        """Return ``(price, currency)`` of the service, the price being added to every quote in that currency."""
+        service_id = self.kwargs.get('service_id')
+        if service_id == 0:
+            return 0.0, ''
+        prices = Service.objects.filter(pk=service_id).values_list('base_price', 'base_price_currency')
+        if not prices:
+            raise NotFound('No such service.')
+        price, currency = prices[0]
+        return float(price or 0), currency
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        pages, copies, color = self.get_job()
+        user_latitude, user_longitude = self.get_location()
+        base_price, base_currency = self.get_base_price()
+        # Priced in one pass over the vendors found by the geo index
+        quotes = find_quotes(
+            self.kwargs.get('service_id'), user_latitude, user_longitude, self.get_radius(), pages, copies, color,
+            base_price, limit=self.get_limit(), base_currency=base_currency, **self.get_filters()
+        )
+        rows = self.get_vendors([(distance, vendor_id) for _, distance, vendor_id, _ in quotes])
+        totals = {vendor_id: total for total, _, vendor_id, _ in quotes}
+        for row in rows:
+            row['total_price'] = totals[row['id']]
+        return Response(self.values_serializer.represent(rows))
@@ -0,0 +1,338 @@
+"""
+Batched vendor writes shared by the import command and the batch API.
+
+Records are validated without per-row queries: service ids are checked
+against one lookup per batch and email uniqueness against one query per
+batch, then vendors and their service links are written with bulk_create.
+"""
+import json
+import re
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
+
+from services.models import Service
+from .models import OpeningInterval, Vendor
+
+SERVICE_IDS_FIELD = 'services_offered_ids'
+
+# Model fields a record may set; anything else in a record is ignored
+VENDOR_FIELDS = [
+    field.name for field in Vendor._meta.concrete_fields
+    if field.editable and not field.primary_key
+]
+DECIMAL_FIELDS = [
+    field.name for field in Vendor._meta.concrete_fields
+    if isinstance(field, models.DecimalField)
+]
+
+# Give up on a JSON array once a single record grows past this many characters
+MAX_RECORD_SIZE = 1024 * 1024
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_records(stream, chunk_size=65536):
+    """
+    Yield ``(position, record)`` from a seekable JSON array or JSON Lines
+    stream without loading the whole document. Lines that are not valid JSON
+    are yielded as the ``json.JSONDecodeError`` instead of a record.
+    """
+    start = stream.read(chunk_size)
+    is_array = start.lstrip().startswith('[')
+    stream.seek(0)
+    if not is_array:
+        position = 0
+        for line in stream:
+            if line.strip():
+                position += 1
+                try:
+                    yield position, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield position, exc
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size)
+    offset = buffer.index('[') + 1
+    position = 0
+    while True:
+        offset = _SEPARATORS.match(buffer, offset).end()
+        if offset < len(buffer) and buffer[offset] == ']':
+            return
+        try:
+            if offset == len(buffer):
+                raise json.JSONDecodeError('Unterminated array', buffer, offset)
+            record, offset = decoder.raw_decode(buffer, offset)
+        except json.JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk or len(buffer) - offset > MAX_RECORD_SIZE:
+                raise
+            buffer, offset = buffer[offset:] + chunk, 0
+            continue
+        position += 1
+        yield position, record
+        if offset > chunk_size:
+            buffer, offset = buffer[offset:], 0
+
+
+def clean_vendor(record, service_ids):
+    """
+    Build an unsaved Vendor and its service id list from a record, raising
+    ValidationError for bad data. ``service_ids`` is the set of known ids.
+    """
+    if isinstance(record, json.JSONDecodeError):
+        raise ValidationError(f'Invalid JSON: {record}')
+    if not isinstance(record, dict):
+        raise ValidationError('Each record must be a JSON object.')
+
+    values = {field: record[field] for field in VENDOR_FIELDS if field in record}
+    for field in DECIMAL_FIELDS:
+        # Parse JSON numbers like 37.7749 as written, not as binary floats
+        if isinstance(values.get(field), float):
+            values[field] = Decimal(repr(values[field]))
+    vendor = Vendor(**values)
+    errors = {}
+    # Derived before validation, so that derived values the columns cannot
+    # hold are reported for the record rather than failing the batch insert
+    try:
+        vendor.update_derived_fields()
+    except (TypeError, ValueError, ArithmeticError):
+        # Source values of the wrong type: derive from their cleaned form, or
+        # leave full_clean to report them
+        try:
+            vendor.clean_fields(exclude=['geohash', *Vendor.DERIVED_FIELDS])
+        except ValidationError:
+            pass
+        else:
+            vendor.update_derived_fields()
+    try:
+        vendor.full_clean(exclude=['geohash'], validate_unique=False)
+    except ValidationError as exc:
+        errors.update(exc.message_dict)
+
+    offered = record.get(SERVICE_IDS_FIELD, [])
+    if not isinstance(offered, list) or not all(isinstance(pk, int) for pk in offered):
+        errors[SERVICE_IDS_FIELD] = ['Expected a list of service ids.']
+    elif not set(offered) <= service_ids:
+        unknown = sorted(set(offered) - service_ids)
+        errors[SERVICE_IDS_FIELD] = [f'Unknown service ids: {unknown}.']
+    if errors:
+        raise ValidationError(errors)
+    return vendor, list(dict.fromkeys(offered))
+
+
+def error_messages(exc):
+    return exc.message_dict if hasattr(exc, 'error_dict') else {'record': exc.messages}
+
+
+def create_vendors(records, service_ids=None):
+    """
+    Validate and insert a batch of ``(position, record)`` pairs in one
+    transaction. Returns ``(created, errors)`` where ``errors`` maps the
+    position of each rejected record to its error messages.
+    """
+    if service_ids is None:
+        service_ids = set(Service.objects.values_list('id', flat=True))
+    errors = {}
+    valid = []
+    for position, record in records:
+        try:
+            valid.append((position, *clean_vendor(record, service_ids)))
+        except ValidationError as exc:
+            errors[position] = error_messages(exc)
+
+    # Emails must be unique across the batch and against existing vendors
+    emails = {}
+    for position, vendor, _ in valid:
+        emails.setdefault(vendor.contact_email, []).append(position)
+    taken = set(Vendor.objects.filter(contact_email__in=emails).values_list('contact_email', flat=True))
+    duplicates = {
+        position for email, positions in emails.items()
+        for position in (positions if email in taken else positions[1:])
+    }
+    for position in duplicates:
+        errors[position] = {'contact_email': ['Vendor with this contact email already exists.']}
+    valid = [row for row in valid if row[0] not in duplicates]
+    if not valid:
+        return 0, errors
+
+    with transaction.atomic():
+        Vendor.objects.bulk_create([vendor for _, vendor, _ in valid])
+        # MySQL does not return primary keys from bulk inserts
+        ids = dict(Vendor.objects.filter(
+            contact_email__in=[vendor.contact_email for _, vendor, _ in valid]
+        ).values_list('contact_email', 'id'))
+        through = Vendor.services_offered.through
+        links = []
+        for _, vendor, offered in valid:
+            vendor.pk = ids[vendor.contact_email]
+            links.extend(through(vendor_id=vendor.pk, service_id=service_id) for service_id in offered)
+        through.objects.bulk_create(links)
+        OpeningInterval.objects.replace_for([vendor for _, vendor, _ in valid])
+    return len(valid), errors
+
+
+def apply_batch(items):
+    """
+    Apply a list of vendor upserts and service-link changes in one
+    transaction and return one result per item, in order. Items are either
+
+        {"op": "upsert", "vendor": {...}}
+            Create a vendor, or replace the one matching ``vendor["id"]`` or
+            else ``vendor["contact_email"]``. Its services are replaced too
+            when ``services_offered_ids`` is given.
+        {"op": "link", "vendor_id": 1, "set": [...], "add": [...], "remove": [...]}
+            Change the services linked to an existing vendor.
+
+    Invalid items are reported and skipped; the valid ones are still applied.
+    """
+    service_ids = set(Service.objects.values_list('id', flat=True))
+    results = [None] * len(items)
+    upserts = []
+    links = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict) or item.get('op') not in ('upsert', 'link'):
+                raise ValidationError({'op': ["Expected 'upsert' or 'link'."]})
+            if item['op'] == 'upsert':
+                record = item.get('vendor')
+                vendor, offered = clean_vendor(record, service_ids)
+                target = record.get('id')
+                if target is not None and not isinstance(target, int):
+                    raise ValidationError({'id': ['Expected a vendor id.']})
+                upserts.append((index, vendor, offered if SERVICE_IDS_FIELD in record else None, target))
+            else:
+                links.append((index, *clean_link(item, service_ids)))
+        except ValidationError as exc:
+            results[index] = {'status': 'error', 'errors': error_messages(exc)}
+
+    with transaction.atomic():
+        touched = apply_upserts(upserts, results)
+        touched |= apply_links(links, results)
+
+    if touched:
+        # Bulk writes skip model signals, so refresh derived data here
+        from .signals import vendors_changed
+        vendors_changed(touched)
+    return results
+
+
+def clean_link(item, service_ids):
+    errors = {}
+    vendor_id = item.get('vendor_id')
+    if not isinstance(vendor_id, int):
+        errors['vendor_id'] = ['Expected a vendor id.']
+    changes = {}
+    for key in ('set', 'add', 'remove'):
+        value = item.get(key, None if key == 'set' else [])
+        if value is None:
+            changes[key] = None
+        elif not isinstance(value, list) or not all(isinstance(pk, int) for pk in value):
+            errors[key] = ['Expected a list of service ids.']
+        elif not set(value) <= service_ids:
+            errors[key] = [f'Unknown service ids: {sorted(set(value) - service_ids)}.']
+        else:
+            changes[key] = set(value)
+    if errors:
+        raise ValidationError(errors)
+    return vendor_id, changes['set'], changes['add'], changes['remove']
+
+
+def apply_upserts(upserts, results):
+    """Create or update vendors in bulk, returning the ids of the touched vendors."""
+    if not upserts:
+        return set()
+    targets = {target for _, _, _, target in upserts if target is not None}
+    existing_ids = set(Vendor.objects.filter(id__in=targets).values_list('id', flat=True))
+    owners = dict(Vendor.objects.filter(
+        contact_email__in=[vendor.contact_email for _, vendor, _, _ in upserts]
+    ).values_list('contact_email', 'id'))
+
+    creates, updates = [], []
+    seen_emails, seen_targets = set(), set()
+    for index, vendor, offered, target in upserts:
+        if target is not None and target not in existing_ids:
+            results[index] = {'status': 'error', 'errors': {'id': ['Vendor not found.']}}
+            continue
+        owner = owners.get(vendor.contact_email)
+        if target is None:
+            target = owner
+        if (owner is not None and owner != target) or vendor.contact_email in seen_emails:
+            results[index] = {'status': 'error', 'errors': {
+                'contact_email': ['Vendor with this contact email already exists.']
+            }}
+            continue
+        if target in seen_targets:
+            results[index] = {'status': 'error', 'errors': {'id': ['Vendor is changed twice in this batch.']}}
+            continue
+        seen_emails.add(vendor.contact_email)
+        if target is None:
+            creates.append((index, vendor, offered))
+        else:
+            seen_targets.add(target)
+            vendor.pk = target
+            updates.append((index, vendor, offered))
+
+    Vendor.objects.bulk_create([vendor for _, vendor, _ in creates])
+    if creates:
+        # MySQL does not return primary keys from bulk inserts
+        ids = dict(Vendor.objects.filter(
+            contact_email__in=[vendor.contact_email for _, vendor, _ in creates]
+        ).values_list('contact_email', 'id'))
+        for _, vendor, _ in creates:
+            vendor.pk = ids[vendor.contact_email]
+    Vendor.objects.bulk_update([vendor for _, vendor, _ in updates], fields=[*VENDOR_FIELDS, *Vendor.DERIVED_FIELDS])
+    OpeningInterval.objects.replace_for([vendor for _, vendor, _ in creates + updates])
+
+    through = Vendor.services_offered.through
+    through.objects.filter(vendor_id__in=[
+        vendor.pk for _, vendor, offered in updates if offered is not None
+    ]).delete()
+    through.objects.bulk_create([
+        through(vendor_id=vendor.pk, service_id=service_id)
+        for _, vendor, offered in creates + updates if offered is not None
+        for service_id in offered
+    ])
+
+    for status, rows in (('created', creates), ('updated', updates)):
+        for index, vendor, _ in rows:
+            results[index] = {'status': status, 'id': vendor.pk}
+    return {vendor.pk for _, vendor, _ in creates + updates}
+
+
+def apply_links(links, results):
+    """Apply service-link changes in item order with one delete and one insert."""
+    if not links:
+        return set()
+    through = Vendor.services_offered.through
+    vendor_ids = {vendor_id for _, vendor_id, _, _, _ in links}
+    current = {vendor_id: set() for vendor_id in Vendor.objects.filter(id__in=vendor_ids).values_list('id', flat=True)}
+    rows = through.objects.filter(vendor_id__in=current).values_list('vendor_id', 'service_id')
+    for vendor_id, service_id in rows:
+        current[vendor_id].add(service_id)
+
+    final = {vendor_id: set(services) for vendor_id, services in current.items()}
+    for index, vendor_id, replace, add, remove in links:
+        if vendor_id not in final:
+            results[index] = {'status': 'error', 'errors': {'vendor_id': ['Vendor not found.']}}
+            continue
+        if replace is not None:
+            final[vendor_id] = set(replace)
+        final[vendor_id] = (final[vendor_id] | add) - remove
+        results[index] = {'status': 'linked', 'id': vendor_id}
+
+    removed = Q()
+    added = []
+    for vendor_id, services in final.items():
+        if current[vendor_id] - services:
+            removed |= Q(vendor_id=vendor_id, service_id__in=current[vendor_id] - services)
+        added.extend(
+            through(vendor_id=vendor_id, service_id=service_id) for service_id in services - current[vendor_id]
+        )
+    if removed:
+        through.objects.filter(removed).delete()
+    through.objects.bulk_create(added)
+    return {vendor_id for vendor_id, services in final.items() if services != current[vendor_id]}
@@ -0,0 +1,142 @@
+"""
+Process-wide caches of data loaded from the database.
+
+The geo tiles, the per-service geo index, the open vendors and the pricing
+rules are each kept in a ``LoadedCache``: an LRU bounded by the total weight
+of its values, whose entries expire after a TTL so that writes made by other
+processes are picked up. Writes made by this process update or drop entries
+in place through the vendor signals. Every such change bumps a generation
+counter, and values whose load started before the latest change are returned
+to their caller but not cached, as they may predate the write.
+
+Values are loaded from the primary database: a replica that is behind would
+keep a write that was just made out of every request for a whole TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from backend.db.routers import use_primary
+
+
+class LoadedCache:
+    """
+    LRU of ``key -> value`` keeping values of at most ``max_size`` total
+    ``weigh()`` for ``ttl`` seconds each. Unset limits come from the
+    ``size_setting`` and ``ttl_setting`` settings, else ``default_size`` and
+    ``default_ttl``.
+    """
+    size_setting = ttl_setting = None
+    default_size = default_ttl = None
+
+    def __init__(self, max_size=None, ttl=None):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (loaded_at, value)
+        self.size = 0
+        self.generation = 0
+
+    def get_max_size(self):
+        if self.max_size is not None:
+            return self.max_size
+        return getattr(settings, self.size_setting, self.default_size) if self.size_setting else self.default_size
+
+    def get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, self.ttl_setting, self.default_ttl) if self.ttl_setting else self.default_ttl
+
+    def weigh(self, value):
+        """The share of ``max_size`` taken by ``value``."""
+        return 1
+
+    def stored(self, key, value):
+        """Called with the lock held when ``value`` is cached."""
+
+    def discarded(self, key, value):
+        """Called with the lock held when ``value`` is dropped."""
+
+    def get(self, key, load):
+        """Return the value of ``key``, from ``load()`` when it is missing or expired."""
+        return self.get_many([key], lambda keys: {key: load()})[key]
+
+    def get_many(self, keys, load):
+        """
+        Return ``{key: value}`` for ``keys``. The missing and expired ones are
+        loaded together by ``load(missing_keys)``, returning them as a dict.
+        """
+        values = {}
+        missing = []
+        expired_before = time.monotonic() - self.get_ttl()
+        with self.lock:
+            generation = self.generation
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None or entry[0] < expired_before:
+                    missing.append(key)
+                else:
+                    self.entries.move_to_end(key)
+                    values[key] = entry[1]
+        if missing:
+            loaded_at = time.monotonic()
+            with use_primary():
+                loaded = load(missing)
+            with self.lock:
+                if generation == self.generation:
+                    for key, value in loaded.items():
+                        self.store(key, value, loaded_at)
+                    self.evict()
+            values.update(loaded)
+        return values
+
+    def store(self, key, value, loaded_at):
+        weight = self.weigh(value)
+        if weight > self.get_max_size():
+            return
+        self.discard(key)
+        self.entries[key] = (loaded_at, value)
+        self.size += weight
+        self.stored(key, value)
+
+    def discard(self, key):
+        """Drop ``key``; call with the lock held."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= self.weigh(entry[1])
+            self.discarded(key, entry[1])
+
+    def evict(self):
+        max_size = self.get_max_size()
+        while self.size > max_size:
+            self.discard(next(iter(self.entries)))
+
+    def changed(self):
+        """Record a write; call with the lock held before changing entries for it."""
+        self.generation += 1
+
+    def clear(self):
+        self.invalidate(self.entries)
+
+    def invalidate(self, keys):
+        """Drop ``keys``, an iterable that is consumed with the lock held."""
+        with self.lock:
+            self.changed()
+            for key in list(keys):
+                self.discard(key)
+
+    def update(self, replace):
+        """
+        Replace each cached value with ``replace(key, value)``, which returns
+        ``value`` itself when it is unchanged. Entries keep their load time.
+        """
+        with self.lock:
+            self.changed()
+            for key, (loaded_at, value) in list(self.entries.items()):
+                updated = replace(key, value)
+                if updated is not value:
+                    self.size += self.weigh(updated) - self.weigh(value)
+                    self.entries[key] = (loaded_at, updated)
+            self.evict()
@@ -0,0 +1,106 @@
+import math
+
+EARTH_RADIUS_KM = 6371
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+GEOHASH_PRECISION = 9
+
+# Cap on the number of geohash cells a single bounding box may expand to.
+# Coarser cells are used when a finer precision would exceed it.
+MAX_COVERING_CELLS = 9
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits = bits << 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """Return the (lat, lon) size in degrees of a geohash cell."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) enclosing the circle of
+    ``radius_km`` around the point. Longitude bounds are None when the box
+    reaches a pole or crosses the antimeridian.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+    cos_lat = math.cos(math.radians(latitude))
+    if min_lat <= -90.0 or max_lat >= 90.0 or cos_lat <= 0:
+        return min_lat, max_lat, None, None
+    lon_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    min_lon = longitude - lon_delta
+    max_lon = longitude + lon_delta
+    if min_lon < -180.0 or max_lon > 180.0:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def geohash_cells(min_lat, max_lat, min_lon, max_lon, precision):
+    """Return the geohash cells of the given precision overlapping the bounding box."""
+    lat_size, lon_size = geohash_cell_size(precision)
+    rows = math.floor(max_lat / lat_size) - math.floor(min_lat / lat_size) + 1
+    cols = math.floor(max_lon / lon_size) - math.floor(min_lon / lon_size) + 1
+    lats = [min_lat + row * lat_size for row in range(rows)] + [max_lat]
+    lons = [min_lon + col * lon_size for col in range(cols)] + [max_lon]
+    return sorted({encode_geohash(lat, lon, precision) for lat in lats for lon in lons})
+
+
+def covering_geohashes(min_lat, max_lat, min_lon, max_lon, max_cells=MAX_COVERING_CELLS,
+                       precisions=range(GEOHASH_PRECISION, 0, -1)):
+    """
+    Return the geohash prefixes whose cells cover the bounding box, using the
+    finest of ``precisions`` that needs at most ``max_cells`` cells.
+    """
+    for precision in precisions:
+        lat_size, lon_size = geohash_cell_size(precision)
+        rows = math.floor(max_lat / lat_size) - math.floor(min_lat / lat_size) + 1
+        cols = math.floor(max_lon / lon_size) - math.floor(min_lon / lon_size) + 1
+        if rows * cols <= max_cells:
+            return geohash_cells(min_lat, max_lat, min_lon, max_lon, precision)
+    return []
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
@@ -0,0 +1,79 @@
+"""
+Opening hours filter for nearby search.
+
+Business hours are parsed into ``OpeningInterval`` rows when vendors are
+saved, in the vendor's local time: its ``time_zone``, or
+``BUSINESS_HOURS_TIME_ZONE`` (``TIME_ZONE`` by default) when it has none. The
+vendors open at a moment come from one range query over the covering
+``(time_zone, weekday, opens, closes, vendor)`` index, matching each time
+zone's intervals against the local time of the moment there. They are cached
+per process for ``OPEN_VENDORS_TTL`` seconds and applied by the geo index
+along with the rating and price filters, before ordering and pagination.
+Nearby search only goes to the database for the final page of vendors, so
+the intervals are not joined into a nearby query: that would give up the
+geo index for every ``open_at`` search. Queries made without the index, over
+a pole or the antimeridian, filter on the intervals in the database.
+
+Naive datetimes are taken as local time wherever the vendor is.
+"""
+import datetime
+import zoneinfo
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from django.conf import settings
+from django.utils import timezone
+
+from .caches import LoadedCache
+from .models import OpeningInterval
+
+# Distinct times whose open vendors are kept
+OPEN_VENDORS_CACHE_SIZE = 16
+
+# Seconds before the open vendors of a time are queried again
+OPEN_VENDORS_TTL = 60
+
+
+def get_time_zone(name=''):
+    """The time zone called ``name``; blank is the one business hours are written in by default."""
+    return zoneinfo.ZoneInfo(name or getattr(settings, 'BUSINESS_HOURS_TIME_ZONE', settings.TIME_ZONE))
+
+
+def week_minute(moment, time_zone=''):
+    """Return ``(weekday, minute after midnight)`` of a datetime in ``time_zone``; naive ones are kept as they are."""
+    if timezone.is_aware(moment):
+        moment = moment.astimezone(get_time_zone(time_zone))
+    return moment.weekday(), moment.hour * 60 + moment.minute
+
+
+def open_intervals(moment):
+    """The opening intervals covering ``moment`` in the local time of their vendors."""
+    intervals = OpeningInterval.objects.all()
+    time_zones = intervals.order_by().values_list('time_zone', flat=True).distinct()
+    return intervals.open_at({time_zone: week_minute(moment, time_zone) for time_zone in time_zones})
+
+
+class OpenVendorCache(LoadedCache):
+    """LRU of ``minute -> (ids, array)`` of the vendors open then."""
+    default_size, default_ttl = OPEN_VENDORS_CACHE_SIZE, OPEN_VENDORS_TTL
+
+    def get(self, moment, vectorized=False):
+        """
+        Return the ids of the vendors open at ``moment`` as a frozenset or,
+        with ``vectorized`` and NumPy installed, a sorted array.
+        """
+        moment = moment.replace(second=0, microsecond=0)
+        if timezone.is_aware(moment):
+            moment = moment.astimezone(datetime.timezone.utc)
+        ids, array = super().get(moment, lambda: self.load(moment))
+        return array if vectorized and np is not None else ids
+
+    def load(self, moment):
+        ids = frozenset(open_intervals(moment).values_list('vendor_id', flat=True))
+        return ids, np.fromiter(sorted(ids), dtype=np.int64, count=len(ids)) if np is not None else None
+
+
+open_vendors = OpenVendorCache()
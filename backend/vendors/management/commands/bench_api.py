@@ -0,0 +1,162 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from services.models import Service
+from vendors.models import Vendor
+from vendors.nearby import tile_cache
+from vendors.search import catalog_index
+from vendors.service_index import service_index
+from vendors.synthetic import random_point, seed_vendors
+
+SERVICE_NAMES = ['Black & White Printing', 'Color Printing', 'Binding', 'Lamination', 'Photo Prints', 'Scanning']
+SEARCH_QUERIES = ['print', 'color', 'synthetic shop', 'binding', 'pdf', 'shop 42']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the vendor/service API end to end against a synthetic catalog, and compare the '
+        'results with a saved baseline. Runs on whatever database is configured; all data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--endpoints', nargs='+', help='Only run these endpoints.')
+        parser.add_argument('--baseline', help='JSON file of a previous run to compare against.')
+        parser.add_argument('--save-baseline', help='Write the results to this JSON file.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Fail when an endpoint p50 is this fraction slower than the baseline; p99 only warns.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                results = self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # In-process indexes and caches may now refer to rolled back rows
+            catalog_index.reset()
+            tile_cache.clear()
+            service_index.clear()
+            cache.clear()
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2)
+            self.stdout.write(f"Saved baseline to {options['save_baseline']}")
+        if options['baseline']:
+            self.compare(results, options)
+
+    def run(self, options):
+        services = [
+            Service.objects.create(name=name, description=f'{name} service', pricing='$0.10 per page')
+            for name in SERVICE_NAMES
+        ]
+        started = time.perf_counter()
+        seed_vendors(options['vendors'], seed=options['seed'], services=services)
+        self.stdout.write(f"Seeded {options['vendors']} vendors in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(options['seed'])
+        client = APIClient(HTTP_HOST='127.0.0.1')
+        vendor_ids = list(Vendor.objects.values_list('id', flat=True))
+        created = iter(range(options['requests'] * 2))
+
+        def nearby_params(**extra):
+            latitude, longitude = random_point(rng)
+            return {'latitude': latitude, 'longitude': longitude, **extra}
+
+        def vendor_record():
+            index = next(created)
+            latitude, longitude = random_point(rng)
+            return {
+                'business_name': f'Bench Shop {index}', 'contact_person': 'Bench Owner',
+                'contact_email': f'bench{index}@synthetic.example', 'contact_phone_number': '5550100',
+                'address': f'{index} Bench St', 'location_latitude': f'{latitude:.6f}',
+                'location_longitude': f'{longitude:.6f}', 'business_hours': '9AM-5PM',
+                'accepted_file_formats': 'PDF', 'pricing_information': '$0.10 per page',
+                'payment_methods': 'Cash', 'terms_and_conditions': 'None',
+                'services_offered_ids': [rng.choice(services).pk],
+            }
+
+        # Each endpoint is a function issuing one request
+        endpoints = {
+            'list': lambda: client.get(reverse('vendor-list'), {'page_size': 20}),
+            'detail': lambda: client.get(reverse('vendor-detail', kwargs={'pk': rng.choice(vendor_ids)})),
+            'search': lambda: client.get(reverse('vendor-service-search'), {'q': rng.choice(SEARCH_QUERIES)}),
+            'suggest': lambda: client.get(reverse('vendor-service-suggest'), {'q': rng.choice(SEARCH_QUERIES)[:3]}),
+            'nearby': lambda: client.get(
+                reverse('vendors-by-service', kwargs={'service_id': rng.choice(services).pk}), nearby_params()
+            ),
+            'nearest': lambda: client.get(
+                reverse('vendors-by-service', kwargs={'service_id': rng.choice(services).pk}),
+                nearby_params(limit=20, radius=50)
+            ),
+            'create': lambda: client.post(reverse('vendor-register'), vendor_record(), format='json'),
+            'update': lambda: client.patch(
+                reverse('vendor-edit', kwargs={'pk': rng.choice(vendor_ids)}),
+                {'business_name': f'Renamed Shop {rng.randint(1, 10 ** 6)}'}, format='json'
+            ),
+        }
+        selected = options['endpoints'] or list(endpoints)
+        unknown = set(selected) - set(endpoints)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        self.stdout.write(f"{'endpoint':<10} {'req/s':>9} {'p50':>9} {'p99':>9}   (ms)")
+        results = {'vendors': options['vendors'], 'requests': options['requests'], 'endpoints': {}}
+        for name in selected:
+            request = endpoints[name]
+            request()  # warm up lazily built indexes
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    raise CommandError(f'{name} returned {response.status_code}: {response.content[:200]!r}')
+            result = {
+                'rps': round(1000 * len(timings) / sum(timings), 1),
+                'p50_ms': round(statistics.median(timings), 3),
+                'p99_ms': round(statistics.quantiles(timings, n=100)[98], 3),
+            }
+            results['endpoints'][name] = result
+            self.stdout.write(f"{name:<10} {result['rps']:>9.1f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+        return results
+
+    def compare(self, results, options):
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline['vendors'], baseline['requests']) != (results['vendors'], results['requests']):
+            self.stderr.write(
+                f"Baseline was recorded with {baseline['vendors']} vendors and {baseline['requests']} requests; "
+                f"comparing anyway."
+            )
+        regressions = []
+        for name, result in results['endpoints'].items():
+            previous = baseline['endpoints'].get(name)
+            if previous is None:
+                continue
+            if result['p50_ms'] > previous['p50_ms'] * (1 + options['tolerance']):
+                regressions.append(f"{name} p50: {result['p50_ms']:.2f} ms > {previous['p50_ms']:.2f} ms baseline")
+            # Tail latency of a short run is too noisy to fail on
+            if result['p99_ms'] > previous['p99_ms'] * (1 + options['tolerance']):
+                self.stderr.write(f"{name} p99: {result['p99_ms']:.2f} ms > {previous['p99_ms']:.2f} ms baseline")
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(f"No regressions beyond {options['tolerance']:.0%} of the baseline.")
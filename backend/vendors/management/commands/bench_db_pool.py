@@ -0,0 +1,123 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.utils import load_backend
+
+from backend.db.pool import pools
+
+ENGINE = 'backend.db.backends.sqlite3'
+
+MODES = {
+    'no reuse': {'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'persistent': {'CONN_MAX_AGE': 60, 'OPTIONS': {}},
+    # Sized to --threads
+    'pool': {'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': {}}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare request latency with a new connection per request, persistent connections and the '
+        'connection pool, on a SQLite stand-in. --connect-latency emulates the TCP and auth handshake '
+        'of a networked MySQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--connect-latency', type=float, default=0, help='Milliseconds added to each connect.')
+        parser.add_argument(
+            '--fresh-threads', action='store_true',
+            help='Run every request on a new thread, as ASGI does for sync database work.',
+        )
+
+    def handle(self, *args, **options):
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        try:
+            self.create_table(path)
+            self.stdout.write(f"{'mode':<12} {'p50':>8} {'p99':>8} {'connects':>9}   (ms)")
+            for mode, overrides in MODES.items():
+                if 'pool' in overrides['OPTIONS']:
+                    overrides = {**overrides, 'OPTIONS': {'pool': {'max_size': options['threads']}}}
+                self.run_mode(mode, path, overrides, options)
+        finally:
+            os.remove(path)
+
+    def make_wrapper(self, path, overrides, latency, alias='bench'):
+        settings_dict = {
+            'ENGINE': ENGINE, 'NAME': path, 'ATOMIC_REQUESTS': False, 'AUTOCOMMIT': True,
+            'CONN_HEALTH_CHECKS': True, 'TIME_ZONE': None, 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+            'TEST': {}, **overrides,
+        }
+        wrapper_class = load_backend(ENGINE).DatabaseWrapper
+        connects = self.connects
+
+        class DatabaseWrapper(wrapper_class):
+            def create_connection(self, conn_params):
+                connects.append(1)
+                time.sleep(latency / 1000)
+                return super().create_connection(conn_params)
+
+        return DatabaseWrapper(settings_dict, alias)
+
+    def create_table(self, path):
+        self.connects = []
+        connection = self.make_wrapper(path, MODES['no reuse'], 0, alias='setup')
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)')
+            cursor.executemany('INSERT INTO item (name) VALUES (%s)', [(f'item {i}',) for i in range(10000)])
+        connection.close()
+
+    def run_mode(self, mode, path, overrides, options):
+        self.connects = []
+        timings = []
+        lock = threading.Lock()
+        remaining = iter(range(options['requests']))
+        local = threading.local()
+
+        def request():
+            # Like a Django request: run a query, then close_old_connections()
+            if not hasattr(local, 'connection'):
+                local.connection = self.make_wrapper(path, overrides, options['connect_latency'])
+            connection = local.connection
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT id, name FROM item WHERE id = %s', [random.randint(1, 10000)])
+                cursor.fetchall()
+            connection.close_if_unusable_or_obsolete()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                timings.append(elapsed)
+
+        def worker():
+            while True:
+                with lock:
+                    index = next(remaining, None)
+                if index is None:
+                    break
+                if options['fresh_threads']:
+                    thread = threading.Thread(target=request)
+                    thread.start()
+                    thread.join()
+                else:
+                    request()
+            if hasattr(local, 'connection'):
+                local.connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool = pools.pop(('bench', path), None)
+        if pool is not None:
+            pool.close_idle()
+
+        p99 = statistics.quantiles(timings, n=100)[98]
+        self.stdout.write(f'{mode:<12} {statistics.median(timings):>8.3f} {p99:>8.3f} {len(self.connects):>9}')
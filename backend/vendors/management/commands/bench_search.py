@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from services.models import Service
+from vendors.models import Vendor
+from vendors.search import catalog_index
+from vendors.synthetic import seed_vendors
+from vendors.views import VendorServiceSearchView, VendorServiceSuggestView
+
+QUERIES = ['print', 'synthetic shop', 'pdf', 'binding', 'st', 'shop 12', 'owner', 'docx jpeg']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark vendor/service search latency against a large synthetic catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        catalog_index.reset()
+
+    def run(self, options):
+        names = ['Binding', 'Color Printing', 'Lamination', 'Photo Prints', 'Scanning']
+        services = [Service.objects.create(name=name, description=f'{name} service') for name in names]
+        seed_vendors(options['vendors'], seed=options['seed'], services=services)
+
+        started = time.perf_counter()
+        catalog_index.rebuild()
+        self.stdout.write(f"Indexed {options['vendors']} vendors in {time.perf_counter() - started:.2f}s")
+
+        # Mix broad queries with selective ones such as a specific shop
+        rng = random.Random(options['seed'])
+        queries = [
+            rng.choice(QUERIES) if rng.random() < 0.5 else f"shop {rng.randint(1, options['vendors'])}"
+            for _ in range(options['queries'])
+        ]
+        factory = APIRequestFactory(HTTP_HOST='127.0.0.1')
+        view = VendorServiceSearchView.as_view()
+        suggest_view = VendorServiceSuggestView.as_view()
+
+        def indexed(query):
+            catalog_index.search_vendors(query, limit=20)
+            catalog_index.search_services(query, limit=20)
+
+        def endpoint(query):
+            view(factory.get('/', {'q': query})).render()
+
+        def suggest(query):
+            # Every keystroke of the query, as a search box would send them
+            for end in range(1, len(query) + 1):
+                suggest_view(factory.get('/', {'q': query[:end]})).render()
+
+        def icontains(query):
+            list(Vendor.objects.filter(business_name__icontains=query).values_list('id', flat=True))
+            list(Service.objects.filter(name__icontains=query).values_list('id', flat=True))
+
+        self.stdout.write(f"{'':<26} {'p50 ms':>10} {'p99 ms':>10}")
+        self.report('index lookup (ids)', indexed, queries)
+        self.report('search endpoint (page 1)', endpoint, queries)
+        self.report('icontains scan (ids)', icontains, queries)
+        self.report('suggest, per keystroke', suggest, queries, per_call=lambda query: len(query))
+        self.report('suggest, 8 threads', suggest, queries, per_call=lambda query: len(query), threads=8)
+
+    def report(self, label, func, queries, per_call=lambda query: 1, threads=1):
+        def timed(query):
+            started = time.perf_counter()
+            func(query)
+            return (time.perf_counter() - started) * 1000 / per_call(query)
+
+        if threads == 1:
+            timings = [timed(query) for query in queries]
+        else:
+            # Only for database-free paths: worker threads cannot see the
+            # uncommitted synthetic catalog
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                timings = list(executor.map(timed, queries))
+        p99 = statistics.quantiles(timings, n=100)[98]
+        self.stdout.write(f'{label:<26} {statistics.median(timings):>10.2f} {p99:>10.2f}')
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from backend.fast_serializers import ValuesSerializer
+from backend.renderers import FastJSONRenderer
+from services.models import Service
+from vendors.models import Vendor
+from vendors.serializers import VendorListSerializer, VendorSerializer
+from vendors.synthetic import seed_vendors
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare vendors serialized per second by ModelSerializer and by the .values() fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        services = [Service.objects.create(name=f'Bench Service {i}', pricing='$1') for i in range(5)]
+        seed_vendors(options['vendors'], seed=options['seed'], services=services)
+
+        self.stdout.write(
+            f"{'representation':<16} {'serializer':>14} {'fast path':>14} {'speedup':>8}"
+            "   (vendors/s, query + serialize + render)"
+        )
+        for name, serializer_class, fields, expand in (
+            ('full', VendorSerializer, None, ['services']),
+            ('compact', VendorListSerializer, ['compact'], []),
+            ('compact+services', VendorListSerializer, ['compact'], ['services']),
+        ):
+            def model_serializer():
+                queryset = Vendor.objects.all()
+                if expand:
+                    queryset = queryset.with_services()
+                data = serializer_class(queryset, many=True, fields=fields, expand=expand).data
+                return JSONRenderer().render(data)
+
+            def fast_path():
+                data = ValuesSerializer(serializer_class(fields=fields, expand=expand)).serialize(Vendor.objects.all())
+                return FastJSONRenderer().render(data)
+
+            slow = self.measure(model_serializer, options)
+            fast = self.measure(fast_path, options)
+            self.stdout.write(f'{name:<16} {slow:>14,.0f} {fast:>14,.0f} {fast / slow:>7.1f}x')
+
+    def measure(self, func, options):
+        best = None
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return options['vendors'] / best
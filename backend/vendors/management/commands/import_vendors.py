@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.models import Service
+from vendors.bulk import create_vendors, iter_json_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Import vendors from a JSON array or JSON Lines file in batches. Bad records are '
+        'reported and skipped. Running servers pick up the new vendors once their search '
+        'index and nearby caches expire.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--errors', help='Write rejected records and their errors to this JSON Lines file.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        service_ids = set(Service.objects.values_list('id', flat=True))
+        created = rejected = 0
+        error_file = open(options['errors'], 'w') if options['errors'] else None
+        try:
+            with open(options['path']) as stream:
+                batch = []
+                try:
+                    for position, record in iter_json_records(stream):
+                        batch.append((position, record))
+                        if len(batch) >= options['batch_size']:
+                            batch_created, batch_rejected = self.import_batch(batch, service_ids, error_file)
+                            created, rejected = created + batch_created, rejected + batch_rejected
+                            batch = []
+                except json.JSONDecodeError as exc:
+                    raise CommandError(f'Malformed JSON array: {exc}')
+                finally:
+                    if batch:
+                        batch_created, batch_rejected = self.import_batch(batch, service_ids, error_file)
+                        created, rejected = created + batch_created, rejected + batch_rejected
+        except OSError as exc:
+            raise CommandError(exc)
+        finally:
+            if error_file:
+                error_file.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} vendors, rejected {rejected} records in {elapsed:.1f}s.'
+        ))
+
+    def import_batch(self, batch, service_ids, error_file):
+        created, errors = create_vendors(batch, service_ids)
+        records = dict(batch)
+        for position, messages in sorted(errors.items()):
+            self.stderr.write(f'Record {position}: {json.dumps(messages)}')
+            if error_file:
+                record = records[position]
+                if isinstance(record, json.JSONDecodeError):
+                    record = record.doc
+                error_file.write(json.dumps({'record': position, 'errors': messages, 'data': record}) + '\n')
+        return created, len(errors)
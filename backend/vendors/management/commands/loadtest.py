@@ -0,0 +1,81 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+# Read-heavy endpoints; {vendor} and {service} are filled in from the command line
+PATHS = [
+    '/vendors/{vendor}/',
+    '/vendors/search/?q=print&page_size=20',
+    '/services/{service}/vendors/?latitude=37.7749&longitude=-122.4194&limit=20',
+    '/services/{service}/vendors/?latitude=40.7128&longitude=-74.0060&radius=5',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running deployment, e.g. gunicorn (WSGI) against uvicorn (ASGI), '
+        'with concurrent clients cycling through the read endpoints.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Base URL of the deployment, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--vendor', type=int, default=1)
+        parser.add_argument('--service', type=int, default=1)
+        parser.add_argument('--paths', nargs='+', default=PATHS)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        paths = [path.format(vendor=options['vendor'], service=options['service']) for path in options['paths']]
+        timings = {path: [] for path in paths}
+        errors = {path: 0 for path in paths}
+        lock = threading.Lock()
+        counter = iter(range(options['requests']))
+
+        def client():
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                path = paths[index % len(paths)]
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(base_url + path, timeout=options['timeout']) as response:
+                        response.read()
+                    ok = True
+                except (urllib.error.URLError, OSError):
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    if ok:
+                        timings[path].append(elapsed)
+                    else:
+                        errors[path] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            for _ in range(options['concurrency']):
+                executor.submit(client)
+        elapsed = time.perf_counter() - started
+
+        completed = sum(len(values) for values in timings.values())
+        self.stdout.write(
+            f"{completed} requests in {elapsed:.2f}s ({completed / elapsed:.0f} req/s) "
+            f"with {options['concurrency']} concurrent clients, {sum(errors.values())} errors"
+        )
+        self.stdout.write(f"{'p50':>9} {'p99':>9} {'errors':>7}  path   (ms)")
+        for path in paths:
+            values = timings[path]
+            if len(values) < 2:
+                self.stdout.write(f"{'-':>9} {'-':>9} {errors[path]:>7}  {path}")
+                continue
+            p99 = statistics.quantiles(values, n=100)[98]
+            self.stdout.write(f'{statistics.median(values):>9.2f} {p99:>9.2f} {errors[path]:>7}  {path}')
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+from vendors.geo import encode_geohash
+
+
+def populate_geohash(apps, schema_editor):
+    Vendor = apps.get_model('vendors', 'Vendor')
+    vendors = Vendor.objects.using(schema_editor.connection.alias).only('id', 'location_latitude', 'location_longitude')
+    for vendor in vendors.iterator(chunk_size=2000):
+        vendor.geohash = encode_geohash(vendor.location_latitude, vendor.location_longitude)
+        vendor.save(update_fields=['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0002_remove_vendor_vendor_logo_vendor_vendor_logo_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['location_latitude', 'location_longitude'], name='vendor_location_idx'),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
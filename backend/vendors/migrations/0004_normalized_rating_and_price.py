@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+from backend.normalize import parse_price_per_page, parse_rating
+
+
+def parse_rating_and_price(apps, schema_editor):
+    Vendor = apps.get_model('vendors', 'Vendor')
+    db_alias = schema_editor.connection.alias
+    vendors = Vendor.objects.using(db_alias).only('id', 'reviews_and_ratings', 'pricing_information')
+    batch = []
+    for vendor in vendors.iterator(chunk_size=2000):
+        vendor.rating_avg, vendor.rating_count = parse_rating(vendor.reviews_and_ratings)
+        vendor.price_per_page, vendor.price_currency = parse_price_per_page(vendor.pricing_information)
+        batch.append(vendor)
+        if len(batch) >= 2000:
+            Vendor.objects.using(db_alias).bulk_update(batch, ['rating_avg', 'rating_count', 'price_per_page', 'price_currency'])
+            batch = []
+    Vendor.objects.using(db_alias).bulk_update(batch, ['rating_avg', 'rating_count', 'price_per_page', 'price_currency'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0003_vendor_geohash_vendor_location_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='price_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='price_per_page',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='rating_avg',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='rating_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(parse_rating_and_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_normalized_rating_and_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='vendor_logo_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='vendor_logo_checked_url',
+            field=models.URLField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from backend.normalize import parse_business_hours
+
+
+def parse_opening_intervals(apps, schema_editor):
+    Vendor = apps.get_model('vendors', 'Vendor')
+    OpeningInterval = apps.get_model('vendors', 'OpeningInterval')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    vendors = Vendor.objects.using(db_alias).values_list('id', 'business_hours')
+    for vendor_id, business_hours in vendors.iterator(chunk_size=2000):
+        batch.extend(
+            OpeningInterval(vendor_id=vendor_id, weekday=weekday, opens=opens, closes=closes)
+            for weekday, opens, closes in parse_business_hours(business_hours)
+        )
+        if len(batch) >= 2000:
+            OpeningInterval.objects.using(db_alias).bulk_create(batch)
+            batch = []
+    OpeningInterval.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0005_vendor_logo_check'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('opens', models.PositiveSmallIntegerField()),
+                ('closes', models.PositiveSmallIntegerField()),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_intervals', to='vendors.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['weekday', 'opens', 'closes', 'vendor'], name='opening_interval_idx')],
+            },
+        ),
+        migrations.RunPython(parse_opening_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0006_opening_intervals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='color_price_per_page',
+            field=models.DecimalField(blank=True, decimal_places=4, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='minimum_charge',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0007_print_pricing_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='order_capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
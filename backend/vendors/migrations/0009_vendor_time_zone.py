@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:02
+
+import vendors.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0008_vendor_order_capacity'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='openinginterval',
+            name='opening_interval_idx',
+        ),
+        migrations.AddField(
+            model_name='openinginterval',
+            name='time_zone',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='time_zone',
+            field=models.CharField(blank=True, max_length=64, validators=[vendors.models.validate_time_zone]),
+        ),
+        migrations.AddIndex(
+            model_name='openinginterval',
+            index=models.Index(fields=['time_zone', 'weekday', 'opens', 'closes', 'vendor'], name='opening_interval_idx'),
+        ),
+    ]
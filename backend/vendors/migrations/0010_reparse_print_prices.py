@@ -0,0 +1,109 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+PRICE_FIELDS = ['price_per_page', 'color_price_per_page', 'minimum_charge', 'price_currency']
+
+# A copy of backend.normalize.parse_print_prices as of this migration, so
+# that later changes to the parser do not change what it writes
+
+CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '₹': 'INR',
+    '€': 'EUR',
+    '£': 'GBP',
+}
+RATE_DIGITS = (10, 4)
+CHARGE_DIGITS = (10, 2)
+
+_COLOR = r'colou?r'
+_BLACK_AND_WHITE = r'\bb\s*(?:&|/|and)?\s*w\b|black|mono(?:chrome)?|gr[ae]y(?:scale)?'
+_PER_PAGE_RE = re.compile(
+    r'(?P<symbol>[$₹€£])?\s*(?P<amount>\d+(?:\.\d+)?)\s*(?:per|/)\s*(?:a\d\s+)?'
+    rf'(?:(?P<kind>{_COLOR}|{_BLACK_AND_WHITE})(?:\s*(?:&|and)\s*white)?\s+)?(?:page|sheet|print)\b'
+    r'|per\s+(?:a\d\s+)?'
+    rf'(?:(?P<kind2>{_COLOR}|{_BLACK_AND_WHITE})(?:\s*(?:&|and)\s*white)?\s+)?(?:page|sheet|print)'
+    r'\s*:?\s*(?P<symbol2>[$₹€£])?\s*(?P<amount2>\d+(?:\.\d+)?)',
+    re.I,
+)
+_PRICE_LABEL_RE = re.compile(r'[^,;\n|]*$')
+_PRICE_SUFFIX_RE = re.compile(r'[^,;\n|]*')
+_COLOR_RE = re.compile(_COLOR, re.I)
+_BLACK_AND_WHITE_RE = re.compile(_BLACK_AND_WHITE, re.I)
+_MINIMUM_RE = re.compile(
+    r'\bmin(?:imum|\.)?\s*(?:charge|order|fee|price|amount)?\s*(?:of|is)?\s*:?\s*(?P<symbol>[$₹€£])?\s*'
+    r'(?P<amount>\d+(?:\.\d+)?)\b(?!\s*(?:pages?|sheets?|prints?|copies|copy)\b)',
+    re.I,
+)
+
+
+def parse_print_prices(text):
+    text = text or ''
+    prices = {}
+    symbol = None
+    matches = list(_PER_PAGE_RE.finditer(text))
+    for index, match in enumerate(matches):
+        label_start = matches[index - 1].end() if index else 0
+        label_end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        label = _PRICE_LABEL_RE.search(text, label_start, match.start()).group()
+        kind = _price_kind(match.group('kind') or match.group('kind2') or label) or \
+            _price_kind(_PRICE_SUFFIX_RE.match(text, match.end(), label_end).group())
+        prices.setdefault(kind, _decimal(match.group('amount') or match.group('amount2'), RATE_DIGITS))
+        symbol = symbol or match.group('symbol') or match.group('symbol2')
+    black_and_white = prices.get('black_and_white', prices.get(None))
+    color = prices.get('color', prices.get(None))
+    minimum = None
+    match = _MINIMUM_RE.search(text)
+    if match:
+        minimum = _decimal(match.group('amount'), CHARGE_DIGITS)
+        symbol = symbol or match.group('symbol')
+    if black_and_white is None and color is None and minimum is None:
+        symbol = None
+    return black_and_white, color, minimum, CURRENCY_SYMBOLS.get(symbol, '')
+
+
+def _price_kind(label):
+    if _COLOR_RE.search(label):
+        return 'color'
+    if _BLACK_AND_WHITE_RE.search(label):
+        return 'black_and_white'
+    return None
+
+
+def _decimal(value, digits):
+    try:
+        max_digits, decimal_places = digits
+        value = Decimal(value).quantize(Decimal(1).scaleb(-decimal_places))
+    except (InvalidOperation, TypeError):
+        return None
+    return value if value.adjusted() < max_digits - decimal_places else None
+
+
+def reparse_print_prices(apps, schema_editor):
+    # Fills the columns added in 0007, and reads labels after a price, like
+    # "$0.50/page color", that were not read before
+    Vendor = apps.get_model('vendors', 'Vendor')
+    db_alias = schema_editor.connection.alias
+    vendors = Vendor.objects.using(db_alias).only('id', 'pricing_information')
+    batch = []
+    for vendor in vendors.iterator(chunk_size=2000):
+        black_and_white, vendor.color_price_per_page, vendor.minimum_charge, vendor.price_currency = \
+            parse_print_prices(vendor.pricing_information)
+        vendor.price_per_page = black_and_white if black_and_white is not None else vendor.color_price_per_page
+        batch.append(vendor)
+        if len(batch) >= 2000:
+            Vendor.objects.using(db_alias).bulk_update(batch, PRICE_FIELDS)
+            batch = []
+    Vendor.objects.using(db_alias).bulk_update(batch, PRICE_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0009_vendor_time_zone'),
+    ]
+
+    operations = [
+        migrations.RunPython(reparse_print_prices, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,26 @@
-from django.db import models
+import zoneinfo
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
+from backend.normalize import parse_business_hours, parse_file_formats, parse_print_prices, parse_rating
 from services.models import Service 
+from .geo import encode_geohash
+
+
+def validate_time_zone(value):
+    try:
+        zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f'{value!r} is not a known time zone.')
+
+
+class VendorQuerySet(models.QuerySet):
+    def with_services(self):
+        # VendorSerializer nests every offered service, so load them all in
+        # one extra query instead of one query per vendor
+        return self.prefetch_related('services_offered')
+
 
 class Vendor(models.Model):
     business_name = models.CharField(max_length=255)
@@ -10,6 +31,8 @@ class Vendor(models.Model):
     location_latitude = models.DecimalField(max_digits=9, decimal_places=6)
     location_longitude = models.DecimalField(max_digits=9, decimal_places=6)
     business_hours = models.CharField(max_length=255)
+    # IANA name, such as Asia/Kolkata, of the time business_hours are in; unset means BUSINESS_HOURS_TIME_ZONE
+    time_zone = models.CharField(max_length=64, blank=True, validators=[validate_time_zone])
     services_offered = services_offered = models.ManyToManyField(Service, related_name='vendors')
     accepted_file_formats = models.CharField(max_length=255)
     pricing_information = models.TextField()
@@ -18,6 +41,121 @@ class Vendor(models.Model):
     printer_specifications = models.TextField(blank=True, null=True)
     vendor_logo_url = models.URLField(blank=True, null=True)
     reviews_and_ratings = models.TextField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    # Orders the vendor takes per delivery window; unset means DISPATCH_VENDOR_CAPACITY
+    order_capacity = models.PositiveIntegerField(blank=True, null=True)
+
+    # Parsed from reviews_and_ratings and pricing_information on save
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True, db_index=True, editable=False)
+    rating_count = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    price_per_page = models.DecimalField(max_digits=10, decimal_places=4, blank=True, null=True, db_index=True, editable=False)
+    price_currency = models.CharField(max_length=3, blank=True, editable=False)
+    # Pricing rules of print quotes; price_per_page is the black and white rate
+    color_price_per_page = models.DecimalField(max_digits=10, decimal_places=4, blank=True, null=True, editable=False)
+    minimum_charge = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, editable=False)
+
+    # Set by the vendors.tasks.check_vendor_logos background job
+    vendor_logo_available = models.BooleanField(blank=True, null=True, editable=False)
+    vendor_logo_checked_url = models.URLField(blank=True, null=True, editable=False)
+
+    objects = VendorQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location_latitude', 'location_longitude'], name='vendor_location_idx'),
+        ]
+
+    DERIVED_FIELDS = [
+        'geohash', 'rating_avg', 'rating_count', 'price_per_page', 'color_price_per_page', 'minimum_charge',
+        'price_currency',
+    ]
+
+    def update_derived_fields(self):
+        """Recompute the indexed fields derived from location, ratings and pricing."""
+        self.geohash = encode_geohash(self.location_latitude, self.location_longitude)
+        self.rating_avg, self.rating_count = parse_rating(self.reviews_and_ratings)
+        black_and_white, self.color_price_per_page, self.minimum_charge, self.price_currency = \
+            parse_print_prices(self.pricing_information)
+        # Vendors listing a colour rate only are sorted and filtered on it
+        self.price_per_page = black_and_white if black_and_white is not None else self.color_price_per_page
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saves rewrite the opening intervals only when the hours or their time zone changed
+        instance._saved_business_hours = instance.get_business_hours()
+        return instance
+
+    def get_business_hours(self):
+        return self.__dict__.get('business_hours'), self.__dict__.get('time_zone')
+
+    def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+        hours_changed = (update_fields is None or {'business_hours', 'time_zone'} & {*update_fields}) and \
+            self.get_business_hours() != getattr(self, '_saved_business_hours', None)
+        if not hours_changed:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            OpeningInterval.objects.replace_for([self])
+        self._saved_business_hours = self.get_business_hours()
+
+    def accepted_formats(self):
+        """The set of format names, such as ``pdf`` and ``jpeg``, the vendor prints from."""
+        return parse_file_formats(self.accepted_file_formats)
+
+    def needs_logo_check(self):
+        return bool(self.vendor_logo_url) and self.vendor_logo_url != self.vendor_logo_checked_url
 
     def __str__(self):
         return self.business_name
+
+
+class OpeningIntervalQuerySet(models.QuerySet):
+    def open_at(self, local_times):
+        """
+        The intervals covering, in each time zone of ``local_times``, its
+        ``(weekday, minute after midnight)`` there (Monday is 0).
+        """
+        query = Q()
+        for time_zone, (weekday, minute) in local_times.items():
+            query |= Q(time_zone=time_zone, weekday=weekday, opens__lte=minute, closes__gt=minute)
+        return self.filter(query) if query else self.none()
+
+    def replace_for(self, vendors):
+        """Replace the intervals of ``vendors`` with the ones parsed from their business hours."""
+        self.filter(vendor__in=[vendor.pk for vendor in vendors]).delete()
+        self.bulk_create([
+            OpeningInterval(
+                vendor_id=vendor.pk, time_zone=vendor.time_zone, weekday=weekday, opens=opens, closes=closes
+            )
+            for vendor in vendors
+            for weekday, opens, closes in parse_business_hours(vendor.business_hours)
+        ], batch_size=2000)
+
+
+class OpeningInterval(models.Model):
+    """A weekly opening interval of a vendor, parsed from its business hours on save."""
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='opening_intervals')
+    # The vendor's, so that open_at reads the intervals of each time zone from the index alone
+    time_zone = models.CharField(max_length=64, blank=True)
+    # Monday is 0
+    weekday = models.PositiveSmallIntegerField()
+    # Minutes after midnight, local time; closes is at most 1440
+    opens = models.PositiveSmallIntegerField()
+    closes = models.PositiveSmallIntegerField()
+
+    objects = OpeningIntervalQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Covers open_at: the vendors open at a time are read from the index alone
+            models.Index(fields=['time_zone', 'weekday', 'opens', 'closes', 'vendor'], name='opening_interval_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.vendor_id}: {self.weekday} {self.opens}-{self.closes}'
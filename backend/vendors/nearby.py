@@ -0,0 +1,232 @@
+"""
+Nearby-vendor lookups.
+
+Candidates are grouped into geohash tiles and cached per (service_id, tile)
+in a bounded LRU, so users in the same neighbourhood share the database work
+and only the exact distance check and sort run per request. Searches are
+answered from the in-memory geo index of ``service_index`` first; the tiles
+serve the services too large for its memory budget.
+"""
+import math
+
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ATan2, Cos, Radians, Sin, Sqrt
+
+from .caches import LoadedCache
+from .geo import EARTH_RADIUS_KM, bounding_box, covering_geohashes, haversine_km
+from .hours import open_intervals, open_vendors
+from .models import Vendor
+from .service_index import optional_float, order_hits, service_index
+
+# Geohash precisions used as cache tiles, finest first: from ~1.2 km x 0.6 km
+# cells up to ~1250 km x 625 km
+TILE_PRECISIONS = (6, 5, 4, 3, 2)
+
+# Upper bound on the number of cached vendor candidates across all tiles
+TILE_CACHE_SIZE = 500000
+
+# Seconds a tile is kept
+TILE_CACHE_TTL = 60
+
+
+def haversine_distance(latitude, longitude):
+    """Haversine distance in km from the given point to each vendor's location."""
+    lat_rad = math.radians(latitude)
+    lon_rad = math.radians(longitude)
+    a = (
+        Sin((Radians(F('location_latitude')) - lat_rad) / 2, output_field=FloatField()) ** 2 +
+        Cos(lat_rad) * Cos(Radians(F('location_latitude'))) *
+        Sin((Radians(F('location_longitude')) - lon_rad) / 2, output_field=FloatField()) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * ATan2(
+        Sqrt(a),
+        Sqrt(1 - a, output_field=FloatField()),
+        output_field=FloatField()
+    )
+
+
+def within_bounding_box(latitude, longitude, radius_km):
+    """
+    Cheap, index-backed prefilter selecting the vendors that can possibly lie
+    within ``radius_km``: a geohash prefix lookup plus a lat/lon range check.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    condition = Q(location_latitude__range=(round(min_lat, 6), round(max_lat, 6)))
+    if min_lon is None:
+        return condition
+
+    condition &= Q(location_longitude__range=(round(min_lon, 6), round(max_lon, 6)))
+    cells = covering_geohashes(min_lat, max_lat, min_lon, max_lon)
+    if cells:
+        cell_condition = Q()
+        for cell in cells:
+            cell_condition |= Q(geohash__startswith=cell)
+        condition &= cell_condition
+    return condition
+
+
+def vendors_for_service(service_id):
+    vendors = Vendor.objects.all()
+    if service_id != 0:
+        vendors = vendors.filter(services_offered__id=service_id)
+    return vendors
+
+
+class TileCache(LoadedCache):
+    """
+    LRU of ``(service_id, tile) -> ((vendor_id, latitude, longitude, rating_avg,
+    price_per_page, price_currency), ...)`` holding at most ``max_size``
+    candidates in total.
+    """
+    size_setting, default_size = 'NEARBY_TILE_CACHE_SIZE', TILE_CACHE_SIZE
+    ttl_setting, default_ttl = 'NEARBY_TILE_CACHE_TTL', TILE_CACHE_TTL
+
+    def __init__(self, max_size=None, ttl=None):
+        super().__init__(max_size, ttl)
+        self.vendor_keys = {}  # vendor_id -> {key, ...} of tiles holding it
+
+    def weigh(self, candidates):
+        return len(candidates) + 1
+
+    def stored(self, key, candidates):
+        for vendor_id, *_ in candidates:
+            self.vendor_keys.setdefault(vendor_id, set()).add(key)
+
+    def discarded(self, key, candidates):
+        for vendor_id, *_ in candidates:
+            keys = self.vendor_keys.get(vendor_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.vendor_keys[vendor_id]
+
+    def get_candidates(self, service_id, tiles):
+        """Return the candidates of every tile, fetching missing ones in one query."""
+        tiles = self.get_many([(service_id, tile) for tile in tiles], self.fetch)
+        return [candidate for candidates in tiles.values() for candidate in candidates]
+
+    def fetch(self, keys):
+        service_id = keys[0][0]
+        precision = len(keys[0][1])
+        fetched = {tile: [] for _, tile in keys}
+        tile_condition = Q()
+        for tile in fetched:
+            tile_condition |= Q(geohash__startswith=tile)
+        rows = vendors_for_service(service_id).filter(tile_condition).values_list(
+            'id', 'geohash', 'location_latitude', 'location_longitude', 'rating_avg', 'price_per_page', 'price_currency'
+        )
+        for vendor_id, geohash, latitude, longitude, rating, price, currency in rows:
+            fetched[geohash[:precision]].append((vendor_id, float(latitude), float(longitude), rating, price, currency))
+        return {(service_id, tile): tuple(candidates) for tile, candidates in fetched.items()}
+
+    def invalidate_vendor(self, vendor_id, geohash=None, service_ids=()):
+        """
+        Drop the tiles that held the vendor and, when it has a location, the
+        tiles it now falls in for each of its services.
+        """
+        with self.lock:
+            self.changed()
+            keys = set(self.vendor_keys.get(vendor_id, ()))
+            if geohash:
+                for service_id in (0, *service_ids):
+                    keys.update((service_id, geohash[:precision]) for precision in TILE_PRECISIONS)
+            for key in keys:
+                self.discard(key)
+
+    def invalidate_service(self, service_id):
+        self.invalidate(key for key in self.entries if key[0] == service_id)
+
+
+tile_cache = TileCache()
+
+
+def find_nearby(service_id, latitude, longitude, radius_km, min_rating=None, max_price=None,
+                ordering='distance', after=None, limit=None, open_at=None, currency=None):
+    """
+    Return ``[(distance_km, vendor_id), ...]`` within ``radius_km``, keeping
+    only vendors rated at least ``min_rating``, charging at most
+    ``max_price`` per page, open at the datetime ``open_at`` and pricing in
+    the currency code ``currency`` when those are given. They are ordered
+    nearest first, or by rating or price with ties nearest first; ``after``
+    skips to past a ``(distance, id)`` position and ``limit`` caps the result.
+    Prices are compared as they are, so callers filtering or ordering on them
+    pass a ``currency``.
+    """
+    points = service_index.get_points(service_id)
+    if points is not None:
+        vendor_ids = open_vendors.get(open_at, vectorized=True) if open_at is not None else None
+        return points.within(
+            latitude, longitude, radius_km, min_rating, max_price, ordering, after, limit, vendor_ids, currency
+        )
+
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    tiles = []
+    if min_lon is not None:
+        tiles = covering_geohashes(min_lat, max_lat, min_lon, max_lon, precisions=TILE_PRECISIONS)
+    if not tiles:
+        # Boxes over a pole or the antimeridian are rare; query them directly
+        vendors = vendors_for_service(service_id).filter(within_bounding_box(latitude, longitude, radius_km))
+        if min_rating is not None:
+            vendors = vendors.filter(rating_avg__gte=min_rating)
+        if max_price is not None:
+            vendors = vendors.filter(price_per_page__lte=max_price)
+        if currency is not None:
+            vendors = vendors.filter(price_currency=currency)
+        if open_at is not None:
+            vendors = vendors.filter(id__in=open_intervals(open_at).values('vendor_id'))
+        rows = vendors.annotate(
+            distance=haversine_distance(latitude, longitude)
+        ).filter(distance__lte=radius_km).values_list('distance', 'id', 'rating_avg', 'price_per_page')
+        hits = [(distance, vendor_id, optional_float(rating), optional_float(price))
+                for distance, vendor_id, rating, price in rows]
+        return order_hits(hits, ordering, after, limit)
+
+    vendor_ids = open_vendors.get(open_at) if open_at is not None else None
+    hits = []
+    for vendor_id, vendor_latitude, vendor_longitude, rating, price, vendor_currency in \
+            tile_cache.get_candidates(service_id, tiles):
+        if vendor_ids is not None and vendor_id not in vendor_ids:
+            continue
+        if currency is not None and vendor_currency != currency:
+            continue
+        if min_rating is not None and (rating is None or rating < min_rating):
+            continue
+        if max_price is not None and (price is None or price > max_price):
+            continue
+        if not min_lat <= vendor_latitude <= max_lat or not min_lon <= vendor_longitude <= max_lon:
+            continue
+        distance = haversine_km(latitude, longitude, vendor_latitude, vendor_longitude)
+        if distance <= radius_km:
+            hits.append((distance, vendor_id, optional_float(rating), optional_float(price)))
+    return order_hits(hits, ordering, after, limit)
+
+
+def find_nearest(service_id, latitude, longitude, limit, radius_km, after=None, initial_ring_km=1, **filters):
+    """
+    Return up to ``limit`` of the vendors of ``find_nearby`` closest to the
+    point, past the ``(distance, id)`` position ``after``. Rings of growing
+    radius are searched, starting at ``initial_ring_km``, so dense areas stop
+    early.
+    """
+    start_km = after[0] if after is not None else 0
+    ring_km = min(start_km + initial_ring_km, radius_km)
+    while True:
+        nearby = find_nearby(service_id, latitude, longitude, ring_km, after=after, limit=limit, **filters)
+        # Negated so that a NaN ring ends the search too
+        if len(nearby) >= limit or not ring_km < radius_km:
+            return nearby
+        ring_km = min(start_km + (ring_km - start_km) * 2, radius_km)
+
+
+def find_nearby_many(service_id, locations, radius_km, min_rating=None, max_price=None,
+                     ordering='distance', limit=None, open_at=None, currency=None):
+    """``find_nearby`` for each ``(latitude, longitude)`` of ``locations``, vectorized across them when possible."""
+    points = service_index.get_points(service_id)
+    if points is not None:
+        vendor_ids = open_vendors.get(open_at, vectorized=True) if open_at is not None else None
+        return points.within_many(locations, radius_km, min_rating, max_price, ordering, limit, vendor_ids, currency)
+    return [
+        find_nearby(service_id, latitude, longitude, radius_km, min_rating, max_price, ordering, limit=limit,
+                    open_at=open_at, currency=currency)
+        for latitude, longitude in locations
+    ]
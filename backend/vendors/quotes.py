@@ -0,0 +1,163 @@
+"""
+Print quotes.
+
+A job of ``pages`` printed ``copies`` times, in black and white or colour,
+costs ``max(pages x copies x rate, minimum charge)`` at a vendor, plus the
+base price of the service. A search is priced in a single currency, the one
+asked for or else the one of the nearest vendor with a rate for the job, as
+amounts in different currencies cannot be ranked together; a base price in
+another currency is not added. The rates and minimum charges are parsed from the
+pricing information when vendors are saved; ``PricingRules`` keeps them for
+every vendor as columns sorted by vendor id, so the vendors found by a
+nearby search are looked up and priced in one vectorized pass with NumPy,
+and in a loop otherwise. Vendors without a rate for the job are left out.
+
+The rules are loaded with one query, updated in place by the vendor signals
+when pricing changes and reloaded after ``PRICING_RULES_TTL`` seconds to pick
+up writes from other processes.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .caches import LoadedCache
+from .models import Vendor
+from .nearby import find_nearby
+from .service_index import optional_float
+
+# Seconds the pricing rules are kept
+PRICING_RULES_TTL = 60
+
+PRICING_COLUMNS = ('id', 'price_per_page', 'color_price_per_page', 'minimum_charge', 'price_currency')
+
+
+def pricing_row(black_and_white, color, minimum, currency):
+    """Normalize the pricing of a vendor; missing rates become NaN and a missing minimum charge 0."""
+    return optional_float(black_and_white), optional_float(color), float(minimum or 0), currency
+
+
+def vendor_pricing_row(vendor):
+    return pricing_row(vendor.price_per_page, vendor.color_price_per_page, vendor.minimum_charge, vendor.price_currency)
+
+
+class PricingColumns:
+    """
+    Immutable pricing columns of vendors ordered by id, over ``{vendor_id: row}``
+    rows. With NumPy they are built by the first quote.
+    """
+    __slots__ = ('rows', 'arrays')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.arrays = None
+
+    def updated(self, updates):
+        """Return the columns with ``{vendor_id: row}`` applied; vendors without a row are dropped."""
+        rows = dict(self.rows)
+        for vendor_id, row in updates.items():
+            if row is None:
+                rows.pop(vendor_id, None)
+            else:
+                rows[vendor_id] = row
+        return self if rows == self.rows else PricingColumns(rows)
+
+    def get_arrays(self):
+        """Return ``(ids, black_and_white, color, minimums, currencies)``, sorted by id."""
+        if self.arrays is None:
+            vendor_ids = sorted(self.rows)
+            black_and_white, color, minimums, currencies = zip(*map(self.rows.__getitem__, vendor_ids)) or [()] * 4
+            self.arrays = (
+                np.array(vendor_ids, dtype=np.int64), np.array(black_and_white, dtype=np.float64),
+                np.array(color, dtype=np.float64), np.array(minimums, dtype=np.float64),
+                np.array(currencies, dtype=np.str_),
+            )
+        return self.arrays
+
+    def price(self, nearby, units, color=False, base_price=0.0, limit=None, currency=None, base_currency=''):
+        """
+        Price ``units`` pages at each vendor of ``[(distance, id), ...]``
+        pricing in ``currency``, by default the currency of the nearest one
+        with a rate for the job, and return ``[(total, distance, id,
+        currency), ...]`` cheapest first, ties nearest first. ``base_price``
+        is added unless ``base_currency`` names another currency.
+        """
+        if np is None:
+            priced = []
+            for distance, vendor_id in nearby:
+                row = self.rows.get(vendor_id)
+                if row is not None and not math.isnan(row[1 if color else 0]):
+                    priced.append((distance, vendor_id, row))
+            if currency is None and priced:
+                currency = min(priced, key=lambda quote: quote[:2])[2][3]
+            if base_currency and base_currency != currency:
+                base_price = 0.0
+            quotes = []
+            for distance, vendor_id, (black_and_white, color_rate, minimum, vendor_currency) in priced:
+                if vendor_currency == currency:
+                    rate = color_rate if color else black_and_white
+                    quotes.append((max(rate * units, minimum) + base_price, distance, vendor_id, currency))
+            quotes.sort()
+            return quotes[:limit]
+
+        if not nearby or not self.rows:
+            return []
+        ids, black_and_white, color_rates, minimums, currencies = self.get_arrays()
+        distances = np.fromiter((distance for distance, _ in nearby), dtype=np.float64, count=len(nearby))
+        vendor_ids = np.fromiter((vendor_id for _, vendor_id in nearby), dtype=np.int64, count=len(nearby))
+        positions = np.minimum(np.searchsorted(ids, vendor_ids), len(ids) - 1)
+        rates = (color_rates if color else black_and_white)[positions]
+        priced = (ids[positions] == vendor_ids) & ~np.isnan(rates)
+        if currency is None:
+            if not priced.any():
+                return []
+            nearest = np.flatnonzero(priced)[np.lexsort((vendor_ids[priced], distances[priced]))[0]]
+            currency = str(currencies[positions[nearest]])
+        if base_currency and base_currency != currency:
+            base_price = 0.0
+        priced = np.flatnonzero(priced & (currencies[positions] == currency))
+        positions, distances, vendor_ids = positions[priced], distances[priced], vendor_ids[priced]
+        totals = np.maximum(rates[priced] * units, minimums[positions]) + base_price
+        # np.lexsort sorts by the last key first
+        order = np.lexsort((vendor_ids, distances, totals))[:limit]
+        return [
+            (total, distance, vendor_id, currency)
+            for total, distance, vendor_id in zip(
+                totals[order].tolist(), distances[order].tolist(), vendor_ids[order].tolist()
+            )
+        ]
+
+
+class PricingRules(LoadedCache):
+    """The ``PricingColumns`` of every vendor, as the single entry of a cache."""
+    ttl_setting, default_ttl = 'PRICING_RULES_TTL', PRICING_RULES_TTL
+    default_size = 1
+
+    def get_columns(self):
+        return self.get(None, self.load)
+
+    def load(self):
+        return PricingColumns({row[0]: pricing_row(*row[1:]) for row in Vendor.objects.values_list(*PRICING_COLUMNS)})
+
+    def update_vendors(self, updates):
+        """Apply ``{vendor_id: row}`` to the loaded rules; vendors without a row are dropped."""
+        self.update(lambda key, columns: columns.updated(updates))
+
+
+pricing_rules = PricingRules()
+
+
+def find_quotes(service_id, latitude, longitude, radius_km, pages, copies=1, color=False, base_price=0.0,
+                limit=None, currency=None, base_currency='', **filters):
+    """
+    Price a print job at every vendor of ``service_id`` within ``radius_km``
+    that matches the ``find_nearby`` filters, returning ``[(total, distance,
+    id, currency), ...]`` cheapest first, all in one currency (see
+    ``PricingColumns.price``).
+    """
+    nearby = find_nearby(service_id, latitude, longitude, radius_km, currency=currency, **filters)
+    return pricing_rules.get_columns().price(
+        nearby, pages * copies, color, base_price, limit, currency, base_currency
+    )
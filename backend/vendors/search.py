@@ -0,0 +1,324 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from backend.db.routers import use_primary
+from services.models import Service
+from .models import Vendor
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Relative weight of each indexed field in the ranking
+VENDOR_FIELD_WEIGHTS = {
+    'business_name': 3.0,
+    'services': 2.0,
+    'address': 1.0,
+    'accepted_file_formats': 1.0,
+}
+SERVICE_FIELD_WEIGHTS = {
+    'name': 3.0,
+    'description': 1.0,
+}
+
+# Seconds before the index is rebuilt, to pick up writes the signal handlers
+# do not see: other processes, bulk imports and background jobs
+SEARCH_INDEX_MAX_AGE = 60
+
+# Recent query results kept per index; any change to the index drops them
+RESULT_CACHE_SIZE = 256
+
+# Query tokens also match longer indexed tokens they are a prefix of, at a
+# discount relative to exact matches
+PREFIX_MATCH_FACTOR = 0.5
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def vendor_document(vendor):
+    return {
+        'business_name': vendor.business_name,
+        'services': ' '.join(service.name for service in vendor.services_offered.all()),
+        'address': vendor.address,
+        'accepted_file_formats': vendor.accepted_file_formats,
+    }
+
+
+def service_document(service):
+    return {
+        'name': service.name,
+        'description': service.description,
+    }
+
+
+class InvertedIndex:
+    """Ranked token index over one kind of document."""
+
+    def __init__(self, field_weights):
+        self.field_weights = field_weights
+        self.postings = {}  # token -> {doc_id: weight}
+        self.documents = {}  # doc_id -> {token: weight}
+        self.tokens = []  # sorted tokens, for prefix expansion
+        self.results = OrderedDict()  # (tokens, limit) -> (count, ids)
+
+    def add(self, doc_id, fields):
+        self.remove(doc_id)
+        for token in self.index(doc_id, fields):
+            bisect.insort(self.tokens, token)
+
+    def add_many(self, documents):
+        """``add`` each ``(doc_id, fields)`` of ``documents``, sorting their new tokens in once."""
+        documents = dict(documents)
+        for doc_id in documents:
+            self.remove(doc_id)
+        new_tokens = [token for doc_id, fields in documents.items() for token in self.index(doc_id, fields)]
+        if new_tokens:
+            self.tokens.extend(new_tokens)
+            self.tokens.sort()
+
+    def index(self, doc_id, fields):
+        """Record a document that is not indexed; return the tokens it adds to the index."""
+        self.results.clear()
+        weights = {}
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0) + self.field_weights[field]
+        self.documents[doc_id] = weights
+        new_tokens = []
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                new_tokens.append(token)
+            self.postings[token][doc_id] = weight
+        return new_tokens
+
+    def remove(self, doc_id):
+        if doc_id in self.documents:
+            self.results.clear()
+        for token in self.documents.pop(doc_id, {}):
+            posting = self.postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def expand(self, token):
+        start = bisect.bisect_left(self.tokens, token)
+        end = bisect.bisect_left(self.tokens, token + '\uffff', start)
+        return self.tokens[start:end]
+
+    def search(self, query, limit=None):
+        """
+        Return ``(count, ids)`` for the documents matching every query token,
+        with ``ids`` holding the best ``limit`` matches in rank order.
+        """
+        query_tokens = tuple(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return 0, []
+        key = (query_tokens, limit)
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+        result = self.rank(query_tokens, limit)
+        self.results[key] = result
+        if len(self.results) > RESULT_CACHE_SIZE:
+            self.results.popitem(last=False)
+        return result
+
+    def rank(self, query_tokens, limit):
+        total = len(self.documents)
+        terms = []
+        for query_token in query_tokens:
+            expansions = []
+            for token in self.expand(query_token):
+                posting = self.postings[token]
+                factor = 1.0 if token == query_token else PREFIX_MATCH_FACTOR
+                expansions.append((posting, math.log(1 + total / len(posting)) * factor))
+            if not expansions:
+                return 0, []
+            terms.append(expansions)
+
+        # Start from the rarest term so later terms only score surviving docs
+        terms.sort(key=lambda expansions: sum(len(posting) for posting, _ in expansions))
+        scores = {}
+        for posting, boost in terms[0]:
+            for doc_id, weight in posting.items():
+                score = weight * boost
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+        for expansions in terms[1:]:
+            matched = {}
+            for doc_id, score in scores.items():
+                best = 0
+                for posting, boost in expansions:
+                    weight = posting.get(doc_id)
+                    if weight is not None and weight * boost > best:
+                        best = weight * boost
+                if best:
+                    matched[doc_id] = score + best
+            scores = matched
+            if not scores:
+                return 0, []
+
+        def rank(doc_id):
+            return scores[doc_id], -doc_id
+
+        if limit is None:
+            return len(scores), sorted(scores, key=rank, reverse=True)
+        return len(scores), heapq.nlargest(limit, scores, key=rank)
+
+
+class PrefixIndex:
+    """
+    Sorted array of lowercased names, one entry per word start, so a prefix
+    of any word in a name finds it with a binary search.
+    """
+
+    def __init__(self):
+        self.entries = []  # sorted (key, id)
+        self.names = {}  # id -> name
+        self.keys = {}  # id -> [key, ...]
+
+    def add(self, doc_id, name):
+        self.remove(doc_id)
+        for key in self.index(doc_id, name):
+            bisect.insort(self.entries, (key, doc_id))
+
+    def add_many(self, names):
+        """``add`` each ``(doc_id, name)`` of ``names``, sorting their entries in once."""
+        names = dict(names)
+        for doc_id in names:
+            self.remove(doc_id)
+        self.entries.extend((key, doc_id) for doc_id, name in names.items() for key in self.index(doc_id, name))
+        self.entries.sort()
+
+    def index(self, doc_id, name):
+        """Record the name of an id that is not indexed; return its keys."""
+        name = name or ''
+        words = name.lower().split()
+        keys = [' '.join(words[position:]) for position in range(len(words))]
+        self.names[doc_id] = name
+        self.keys[doc_id] = keys
+        return keys
+
+    def remove(self, doc_id):
+        self.names.pop(doc_id, None)
+        for key in self.keys.pop(doc_id, ()):
+            del self.entries[bisect.bisect_left(self.entries, (key, doc_id))]
+
+    def suggest(self, prefix, limit):
+        """Return up to ``limit`` ``(id, name)`` pairs with a word starting with the prefix."""
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        found = {}
+        index = bisect.bisect_left(self.entries, (prefix,))
+        while index < len(self.entries) and len(found) < limit:
+            key, doc_id = self.entries[index]
+            if not key.startswith(prefix):
+                break
+            found.setdefault(doc_id, self.names[doc_id])
+            index += 1
+        return list(found.items())
+
+
+class CatalogSearchIndex:
+    """
+    Process-wide search index over vendors and services. It is built lazily
+    from the database on first use and kept current by the signal handlers in
+    ``vendors.signals``, and rebuilt once it is ``SEARCH_INDEX_MAX_AGE``
+    seconds old to pick up writes made elsewhere. It is built from the
+    primary database, as replicas may lag behind.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.vendors = None
+        self.services = None
+        self.vendor_names = None
+        self.service_names = None
+        self.built_at = None
+
+    def reset(self):
+        with self.lock:
+            self.vendors = self.services = self.built_at = None
+            self.vendor_names = self.service_names = None
+
+    def rebuild(self):
+        vendors = InvertedIndex(VENDOR_FIELD_WEIGHTS)
+        vendor_names = PrefixIndex()
+        services = InvertedIndex(SERVICE_FIELD_WEIGHTS)
+        service_names = PrefixIndex()
+        # Each index is sorted once rather than inserted into per document
+        with use_primary():
+            vendor_documents = [(vendor.pk, vendor_document(vendor)) for vendor in Vendor.objects.with_services().only(
+                'id', 'business_name', 'address', 'accepted_file_formats').iterator(chunk_size=2000)]
+            service_documents = [(service.pk, service_document(service)) for service in Service.objects.only(
+                'id', 'name', 'description').iterator(chunk_size=2000)]
+        vendors.add_many(vendor_documents)
+        vendor_names.add_many((vendor_id, document['business_name']) for vendor_id, document in vendor_documents)
+        services.add_many(service_documents)
+        service_names.add_many((service_id, document['name']) for service_id, document in service_documents)
+        with self.lock:
+            self.vendors, self.services = vendors, services
+            self.vendor_names, self.service_names = vendor_names, service_names
+            self.built_at = time.monotonic()
+
+    def ensure_built(self):
+        max_age = getattr(settings, 'SEARCH_INDEX_MAX_AGE', SEARCH_INDEX_MAX_AGE)
+        with self.lock:
+            if self.built_at is not None and (max_age is None or time.monotonic() - self.built_at < max_age):
+                return
+            self.rebuild()
+
+    def is_built(self):
+        return self.built_at is not None
+
+    def search_vendors(self, query, limit=None):
+        self.ensure_built()
+        with self.lock:
+            return self.vendors.search(query, limit)
+
+    def search_services(self, query, limit=None):
+        self.ensure_built()
+        with self.lock:
+            return self.services.search(query, limit)
+
+    def suggest(self, prefix, limit):
+        self.ensure_built()
+        with self.lock:
+            return self.vendor_names.suggest(prefix, limit), self.service_names.suggest(prefix, limit)
+
+    def index_vendor(self, vendor):
+        with self.lock:
+            if self.is_built():
+                self.vendors.add(vendor.pk, vendor_document(vendor))
+                self.vendor_names.add(vendor.pk, vendor.business_name)
+
+    def remove_vendor(self, vendor_id):
+        with self.lock:
+            if self.is_built():
+                self.vendors.remove(vendor_id)
+                self.vendor_names.remove(vendor_id)
+
+    def index_service(self, service):
+        with self.lock:
+            if self.is_built():
+                self.services.add(service.pk, service_document(service))
+                self.service_names.add(service.pk, service.name)
+
+    def remove_service(self, service_id):
+        with self.lock:
+            if self.is_built():
+                self.services.remove(service_id)
+                self.service_names.remove(service_id)
+
+
+catalog_index = CatalogSearchIndex()
@@ -1,9 +1,10 @@
 from rest_framework import serializers
+from backend.sparse_fields import SparseFieldsMixin
 from .models import Vendor
 from services.models import Service
 from services.serializers import ServiceSerializer
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Read-only field that shows full details of the services
     services_offered = ServiceSerializer(many=True, read_only=True)
 
@@ -16,6 +17,34 @@ class VendorSerializer(serializers.ModelSerializer):
         required=False
     )
 
+    # Set by nearby search only; left out of the output otherwise
+    distance = serializers.FloatField(read_only=True)
+    # Set by print quotes only
+    total_price = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
+
+    expandable_fields = {'services': 'services_offered'}
+
     class Meta:
         model = Vendor
-        fields = '__all__'
+        exclude = ['geohash', 'vendor_logo_checked_url']
+
+
+COMPACT_FIELDS = [
+    'id', 'business_name', 'vendor_logo_url', 'address', 'distance',
+    'rating_avg', 'rating_count', 'price_per_page', 'price_currency',
+]
+
+
+class VendorListSerializer(VendorSerializer):
+    """
+    Vendor representation of list screens: every field, like the other
+    vendor endpoints, unless ``?fields=`` asks for some. ``?fields=compact``
+    picks the few a list shows, and ``?expand=services`` adds the nested
+    services to them.
+    """
+    fieldsets = {'compact': COMPACT_FIELDS}
+
+
+class VendorQuoteSerializer(VendorListSerializer):
+    """Vendor representation with the price of a print job; its compact form keeps the rates it was priced at."""
+    fieldsets = {'compact': [*COMPACT_FIELDS, 'color_price_per_page', 'minimum_charge', 'total_price']}
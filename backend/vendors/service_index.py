@@ -0,0 +1,355 @@
+"""
+In-memory geo index of vendors for nearby search.
+
+For every service, and for service 0 meaning every vendor, the ids,
+coordinates, ratings, prices and price currencies of the vendors offering it
+are kept as
+parallel columns sorted by latitude. A query binary-searches the latitude
+band of its bounding box and computes distances only within it, so the
+database is left with loading the final page of vendors. Radius, k-nearest
+(``after``/``limit``) and rating/price ordered queries are answered from the
+columns, vectorized with NumPy when it is installed and in pure Python
+otherwise; ``within_many`` answers a batch of locations at once. Prices are
+only comparable within one currency, which the caller narrows them to.
+
+Entries are loaded lazily with one query per service and updated in place by
+the vendor and ``services_offered`` signals; a TTL picks up writes made by
+other processes. Services too large for the memory budget are left to the
+geo tile cache.
+"""
+import bisect
+import heapq
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .caches import LoadedCache
+from .geo import EARTH_RADIUS_KM, bounding_box
+from .models import Vendor
+
+# Upper bound on the number of vendor entries held across all services
+SERVICE_INDEX_SIZE = 1000000
+
+# Seconds the vendors of a service are kept
+SERVICE_INDEX_TTL = 60
+
+# Largest locations x vendors distance matrix computed in one pass by within_many
+BATCH_CELLS = 1 << 20
+
+VENDOR_COLUMNS = ('id', 'location_latitude', 'location_longitude', 'rating_avg', 'price_per_page', 'price_currency')
+
+
+def optional_float(value):
+    return math.nan if value is None else float(value)
+
+
+def point_row(vendor_id, latitude, longitude, rating, price, currency):
+    """Normalize a vendor row; missing ratings and prices become NaN, which no filter accepts."""
+    return vendor_id, float(latitude), float(longitude), optional_float(rating), optional_float(price), currency
+
+
+def vendor_row(vendor):
+    return point_row(
+        vendor.pk, vendor.location_latitude, vendor.location_longitude, vendor.rating_avg, vendor.price_per_page,
+        vendor.price_currency,
+    )
+
+
+def nulls_last(value):
+    return math.inf if math.isnan(value) else value
+
+
+# Sort keys of (distance, id, rating, price) hits; ties are nearest first
+ORDERING_KEYS = {
+    'distance': None,
+    'rating': lambda hit: (nulls_last(-hit[2]), hit[0], hit[1]),
+    'price': lambda hit: (nulls_last(hit[3]), hit[0], hit[1]),
+}
+
+
+def order_hits(hits, ordering='distance', after=None, limit=None):
+    """
+    Order ``[(distance, id, rating, price), ...]`` hits, keep the ones past the
+    ``(distance, id)`` position ``after`` and at most ``limit`` of them, and
+    return them as ``[(distance, id), ...]``.
+    """
+    if after is not None:
+        hits = [hit for hit in hits if hit[:2] > after]
+    key = ORDERING_KEYS[ordering]
+    hits = sorted(hits, key=key) if limit is None else heapq.nsmallest(limit, hits, key)
+    return [hit[:2] for hit in hits]
+
+
+# Column typecodes: the array module's, plus 'U' for strings
+NUMPY_TYPES = {'q': np.int64, 'd': np.float64, 'U': np.str_} if np is not None else {}
+
+
+def make_column(values, typecode):
+    if np is not None:
+        return np.array(values, dtype=NUMPY_TYPES[typecode])
+    return list(values) if typecode == 'U' else array(typecode, values)
+
+
+def concat_column(*parts):
+    if np is not None:
+        return np.concatenate(parts)
+    column = parts[0][:0]
+    for part in parts:
+        column += part
+    return column
+
+
+class VendorPoints:
+    """Immutable columns of vendors ordered by latitude; updates return a copy."""
+    __slots__ = ('ids', 'latitudes', 'longitudes', 'ratings', 'prices', 'currencies')
+    typecodes = ('q', 'd', 'd', 'd', 'd', 'U')
+
+    def __init__(self, rows=(), columns=None):
+        if columns is None:
+            rows = sorted(rows, key=lambda row: (row[1], row[0]))
+            values = list(zip(*rows)) or [()] * len(self.typecodes)
+            columns = [make_column(column, typecode) for column, typecode in zip(values, self.typecodes)]
+        self.ids, self.latitudes, self.longitudes, self.ratings, self.prices, self.currencies = columns
+
+    def __len__(self):
+        return len(self.ids)
+
+    def columns(self):
+        return self.ids, self.latitudes, self.longitudes, self.ratings, self.prices, self.currencies
+
+    def position(self, vendor_id):
+        if np is not None:
+            hits = np.flatnonzero(self.ids == vendor_id)
+            return int(hits[0]) if len(hits) else None
+        try:
+            return self.ids.index(vendor_id)
+        except ValueError:
+            return None
+
+    def splice(self, start, stop, rows):
+        values = list(zip(*rows)) or [()] * len(self.typecodes)
+        return VendorPoints(columns=[
+            concat_column(column[:start], make_column(new, typecode), column[stop:])
+            for column, new, typecode in zip(self.columns(), values, self.typecodes)
+        ])
+
+    def without(self, vendor_id):
+        index = self.position(vendor_id)
+        if index is None:
+            return self
+        return self.splice(index, index + 1, ())
+
+    def with_row(self, row):
+        points = self.without(row[0])
+        return points.splice(*[points.lower_bound(row[1])] * 2, [row])
+
+    def replace(self, vendor_ids, rows):
+        """Return the points without ``vendor_ids`` and with ``rows`` added."""
+        if len(vendor_ids) == 1 and len(rows) <= 1:
+            # Splice a single vendor in or out, without re-sorting
+            return self.with_row(rows[0]) if rows else self.without(next(iter(vendor_ids)))
+        if np is not None:
+            keep = ~np.isin(self.ids, np.fromiter(vendor_ids, dtype=np.int64))
+            if keep.all() and not rows:
+                return self
+            kept = [column[keep] for column in self.columns()]
+            added = [make_column(values, typecode) for values, typecode in zip(
+                list(zip(*rows)) or [()] * len(self.typecodes), self.typecodes
+            )]
+            columns = [np.concatenate(pair) for pair in zip(kept, added)]
+            order = np.lexsort((columns[0], columns[1]))
+            return VendorPoints(columns=[column[order] for column in columns])
+        vendor_ids = set(vendor_ids)
+        kept = [row for row in zip(*self.columns()) if row[0] not in vendor_ids]
+        if len(kept) == len(self) and not rows:
+            return self
+        return VendorPoints(kept + rows)
+
+    def lower_bound(self, latitude):
+        if np is not None:
+            return int(np.searchsorted(self.latitudes, latitude, 'left'))
+        return bisect.bisect_left(self.latitudes, latitude)
+
+    def upper_bound(self, latitude):
+        if np is not None:
+            return int(np.searchsorted(self.latitudes, latitude, 'right'))
+        return bisect.bisect_right(self.latitudes, latitude)
+
+    def within(self, latitude, longitude, radius_km, min_rating=None, max_price=None,
+               ordering='distance', after=None, limit=None, vendor_ids=None, currency=None):
+        """
+        Return ``[(distance_km, vendor_id), ...]`` within ``radius_km``, ordered
+        by ``ordering`` (see ``order_hits`` for ``after`` and ``limit``). Only
+        ``vendor_ids`` are kept when given, a sorted array with NumPy and a set
+        otherwise, and only vendors pricing in ``currency`` when it is given.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        start, stop = self.lower_bound(min_lat), self.upper_bound(max_lat)
+        if np is not None:
+            lat1, lon1 = math.radians(latitude), math.radians(longitude)
+            lat2 = np.radians(self.latitudes[start:stop])
+            lon2 = np.radians(self.longitudes[start:stop])
+            a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+            distances = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+            mask = self.filter_mask(distances <= radius_km, start, stop, min_rating, max_price, vendor_ids, currency)
+            hits = np.flatnonzero(mask)
+            return self.order_vectorized(distances[hits], start + hits, ordering, after, limit)
+
+        ids, latitudes, longitudes, ratings, prices, currencies = self.columns()
+        if min_lon is None:
+            min_lon, max_lon = -180.0, 180.0
+        # haversine_km, with the per-query terms hoisted out of the loop
+        lat1, lon1 = math.radians(latitude), math.radians(longitude)
+        cos_lat1 = math.cos(lat1)
+        radians, sin, cos, sqrt, atan2 = math.radians, math.sin, math.cos, math.sqrt, math.atan2
+        hits = []
+        for index in range(start, stop):
+            vendor_longitude = longitudes[index]
+            if not min_lon <= vendor_longitude <= max_lon:
+                continue
+            if min_rating is not None and not ratings[index] >= min_rating:
+                continue
+            if max_price is not None and not prices[index] <= max_price:
+                continue
+            if currency is not None and currencies[index] != currency:
+                continue
+            if vendor_ids is not None and ids[index] not in vendor_ids:
+                continue
+            lat2 = radians(latitudes[index])
+            a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(vendor_longitude) - lon1) / 2) ** 2
+            distance = EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a))
+            if distance <= radius_km:
+                hits.append((distance, ids[index], ratings[index], prices[index]))
+        return order_hits(hits, ordering, after, limit)
+
+    def within_many(self, locations, radius_km, min_rating=None, max_price=None, ordering='distance', limit=None,
+                    vendor_ids=None, currency=None):
+        """
+        Answer ``within`` for each ``(latitude, longitude)`` of ``locations``.
+        Locations whose latitude bands overlap are grouped, and the distances
+        of each group computed in one vectorized pass.
+        """
+        if np is None:
+            return [
+                self.within(latitude, longitude, radius_km, min_rating, max_price, ordering, limit=limit,
+                            vendor_ids=vendor_ids, currency=currency)
+                for latitude, longitude in locations
+            ]
+        bands = []
+        for latitude, longitude in locations:
+            min_lat, max_lat, _, _ = bounding_box(latitude, longitude, radius_km)
+            bands.append((self.lower_bound(min_lat), self.upper_bound(max_lat)))
+
+        # Grow a group while its shared band costs at most twice the separate ones
+        groups = []
+        group, group_start, group_stop, separate = [], 0, 0, 0
+        for index in sorted(range(len(locations)), key=bands.__getitem__):
+            start, stop = bands[index]
+            if group:
+                cells = (max(stop, group_stop) - group_start) * (len(group) + 1)
+                if cells > 2 * (separate + stop - start) or cells > BATCH_CELLS:
+                    groups.append((group, group_start, group_stop))
+                    group = []
+            if not group:
+                group_start, group_stop, separate = start, stop, 0
+            group.append(index)
+            group_stop = max(group_stop, stop)
+            separate += stop - start
+        if group:
+            groups.append((group, group_start, group_stop))
+
+        results = [None] * len(locations)
+        for group, start, stop in groups:
+            lat1 = np.radians([locations[index][0] for index in group])[:, None]
+            lon1 = np.radians([locations[index][1] for index in group])[:, None]
+            lat2 = np.radians(self.latitudes[start:stop])
+            lon2 = np.radians(self.longitudes[start:stop])
+            a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+            distances = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+            mask = self.filter_mask(distances <= radius_km, start, stop, min_rating, max_price, vendor_ids, currency)
+            for index, row_distances, row_mask in zip(group, distances, mask):
+                hits = np.flatnonzero(row_mask)
+                results[index] = self.order_vectorized(row_distances[hits], start + hits, ordering, None, limit)
+        return results
+
+    def filter_mask(self, mask, start, stop, min_rating, max_price, vendor_ids=None, currency=None):
+        if min_rating is not None:
+            mask &= self.ratings[start:stop] >= min_rating
+        if max_price is not None:
+            mask &= self.prices[start:stop] <= max_price
+        if vendor_ids is not None:
+            mask &= np.isin(self.ids[start:stop], vendor_ids)
+        if currency is not None:
+            mask &= self.currencies[start:stop] == currency
+        return mask
+
+    def order_vectorized(self, distances, positions, ordering, after, limit):
+        ids = self.ids[positions]
+        if after is not None:
+            keep = (distances > after[0]) | ((distances == after[0]) & (ids > after[1]))
+            distances, ids, positions = distances[keep], ids[keep], positions[keep]
+        # np.lexsort sorts by the last key first
+        keys = [ids, distances]
+        if ordering == 'rating':
+            keys.append(np.where(np.isnan(self.ratings[positions]), np.inf, -self.ratings[positions]))
+        elif ordering == 'price':
+            keys.append(np.where(np.isnan(self.prices[positions]), np.inf, self.prices[positions]))
+        order = np.lexsort(keys)[:limit]
+        return list(zip(distances[order].tolist(), ids[order].tolist()))
+
+
+class ServiceVendorIndex(LoadedCache):
+    """
+    LRU of ``service_id -> VendorPoints`` holding at most ``max_size`` vendor
+    entries in total. Service 0 holds every vendor; services over the budget
+    are kept as None.
+    """
+    size_setting, default_size = 'NEARBY_SERVICE_INDEX_SIZE', SERVICE_INDEX_SIZE
+    ttl_setting, default_ttl = 'NEARBY_SERVICE_INDEX_TTL', SERVICE_INDEX_TTL
+
+    def weigh(self, points):
+        return 1 if points is None else len(points) + 1
+
+    def get_points(self, service_id):
+        """Return the ``VendorPoints`` of a service, or None when it does not fit the memory budget."""
+        return self.get(service_id, lambda: self.load(service_id))
+
+    def load(self, service_id):
+        vendors = Vendor.objects.all()
+        if service_id != 0:
+            vendors = vendors.filter(services_offered__id=service_id)
+        rows = vendors.values_list(*VENDOR_COLUMNS)
+        points = VendorPoints([point_row(*row) for row in rows])
+        return points if self.weigh(points) <= self.get_max_size() else None
+
+    def update_vendor(self, vendor_id, row=None, service_ids=()):
+        self.update_vendors({vendor_id: (row, service_ids)})
+
+    def update_vendors(self, updates):
+        """
+        Apply ``{vendor_id: (row, service_ids)}``: put each vendor's row into
+        the loaded entries of its services and of service 0, and drop it from
+        every other one; vendors without a row are dropped everywhere.
+        """
+        updates = {vendor_id: (row, set(service_ids)) for vendor_id, (row, service_ids) in updates.items()}
+
+        def replace(service_id, points):
+            if points is None:
+                return None
+            rows = [
+                row for row, service_ids in updates.values()
+                if row is not None and (service_id == 0 or service_id in service_ids)
+            ]
+            return points.replace(updates.keys(), rows)
+
+        self.update(replace)
+
+    def invalidate_service(self, service_id):
+        self.invalidate([service_id])
+
+
+service_index = ServiceVendorIndex()
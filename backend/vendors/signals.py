@@ -0,0 +1,104 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from backend.db.routers import use_primary
+from backend.response_cache import invalidate
+from jobs.deferred import defer
+from services.models import Service
+from .hours import open_vendors
+from .models import Vendor
+from .nearby import tile_cache
+from .quotes import pricing_rules, vendor_pricing_row
+from .search import catalog_index
+from .service_index import service_index, vendor_row
+from .tasks import check_vendor_logos
+
+
+def refresh_vendors(vendor_ids):
+    """
+    Update the search and geo indexes and the pricing rules of the vendors
+    from the database, dropping deleted ones, and queue checks of new logo
+    URLs.
+    """
+    updates = dict.fromkeys(vendor_ids, (None, ()))
+    if not updates:
+        return
+    pricing = dict.fromkeys(updates)
+    logo_checks = []
+    # Replicas may not have the writes yet
+    with use_primary():
+        vendors = list(Vendor.objects.with_services().filter(id__in=updates))
+    for vendor in vendors:
+        catalog_index.index_vendor(vendor)
+        service_ids = [service.pk for service in vendor.services_offered.all()]
+        tile_cache.invalidate_vendor(vendor.pk, vendor.geohash, service_ids)
+        updates[vendor.pk] = (vendor_row(vendor), service_ids)
+        pricing[vendor.pk] = vendor_pricing_row(vendor)
+        if vendor.needs_logo_check():
+            logo_checks.append((f'vendor:{vendor.pk}', {'vendor_id': vendor.pk}))
+    for vendor_id, (row, _) in updates.items():
+        if row is None:
+            catalog_index.remove_vendor(vendor_id)
+            tile_cache.invalidate_vendor(vendor_id)
+    service_index.update_vendors(updates)
+    pricing_rules.update_vendors(pricing)
+    open_vendors.clear()
+    if logo_checks:
+        check_vendor_logos.enqueue_many(logo_checks)
+
+
+def vendors_changed(vendor_ids):
+    """
+    Drop the cached responses of the vendors once the write commits, and
+    refresh their derived data once the response is sent.
+    """
+    vendor_ids = list(vendor_ids)
+    if vendor_ids:
+        invalidate(*(f'vendor:{vendor_id}' for vendor_id in vendor_ids))
+        defer(refresh_vendors, *vendor_ids)
+
+
+@receiver(post_save, sender=Vendor)
+def vendor_saved(sender, instance, **kwargs):
+    vendors_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Vendor)
+def vendor_deleted(sender, instance, **kwargs):
+    vendors_changed([instance.pk])
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, **kwargs):
+    catalog_index.index_service(instance)
+    # Vendors nest their services and are searchable by their names
+    vendors_changed(instance.vendors.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Service)
+def service_deleting(sender, instance, **kwargs):
+    # The links are gone by post_delete, so remember who offered the service
+    instance._vendor_ids = list(instance.vendors.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Service)
+def service_deleted(sender, instance, **kwargs):
+    catalog_index.remove_service(instance.pk)
+    tile_cache.invalidate_service(instance.pk)
+    service_index.invalidate_service(instance.pk)
+    vendors_changed(getattr(instance, '_vendor_ids', []))
+
+
+@receiver(m2m_changed, sender=Vendor.services_offered.through)
+def vendor_services_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            vendors_changed([instance.pk])
+        return
+    # Changed from the service side: pk_set holds vendor ids, except on clear
+    if action == 'pre_clear':
+        instance._vendor_ids = list(instance.vendors.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        vendors_changed(pk_set)
+    elif action == 'post_clear':
+        vendors_changed(getattr(instance, '_vendor_ids', []))
@@ -0,0 +1,83 @@
+import random
+from decimal import Decimal
+
+from django.db.models import Max
+
+from .models import Vendor
+
+# Metro areas used to spread synthetic vendors over real-world coordinates
+CITIES = [
+    ('San Francisco', 37.7749, -122.4194),
+    ('New York', 40.7128, -74.0060),
+    ('London', 51.5074, -0.1278),
+    ('Delhi', 28.7041, 77.1025),
+    ('Mumbai', 19.0760, 72.8777),
+    ('Bengaluru', 12.9716, 77.5946),
+    ('Singapore', 1.3521, 103.8198),
+    ('Sydney', -33.8688, 151.2093),
+    ('Sao Paulo', -23.5505, -46.6333),
+    ('Nairobi', -1.2921, 36.8219),
+]
+
+
+def random_point(rng, spread_km=25):
+    """Pick a random city and jitter around it by roughly ``spread_km``."""
+    _, latitude, longitude = rng.choice(CITIES)
+    spread = spread_km / 111.0
+    return latitude + rng.gauss(0, spread / 2), longitude + rng.gauss(0, spread / 2)
+
+
+def build_vendors(count, seed=0, start=1):
+    """
+    Yield unsaved Vendor instances ready for ``bulk_create``. Primary keys are
+    assigned up front since MySQL does not return them from bulk inserts.
+    """
+    rng = random.Random(seed)
+    for index in range(start, start + count):
+        latitude, longitude = random_point(rng)
+        latitude = Decimal(latitude).quantize(Decimal('0.000001'))
+        longitude = Decimal(longitude).quantize(Decimal('0.000001'))
+        vendor = Vendor(
+            id=index,
+            business_name=f'Synthetic Print Shop {index}',
+            contact_person=f'Owner {index}',
+            contact_email=f'vendor{index}@synthetic.example',
+            contact_phone_number=f'+1{index:010d}'[:15],
+            address=f'{index} Synthetic St',
+            location_latitude=latitude,
+            location_longitude=longitude,
+            business_hours='Mon-Fri, 9 AM - 5 PM',
+            accepted_file_formats='PDF, DOCX, JPEG',
+            pricing_information=f'Standard pricing per page: ${rng.randint(5, 50) / 100:.2f}',
+            payment_methods='Credit Card, Cash',
+            terms_and_conditions='All prints are non-refundable.',
+            reviews_and_ratings=f'{rng.randint(20, 50) / 10}/5 based on {rng.randint(1, 500)} reviews',
+        )
+        vendor.update_derived_fields()
+        yield vendor
+
+
+def seed_vendors(count, seed=0, batch_size=5000, services=()):
+    """Insert ``count`` synthetic vendors, linking each to a few of ``services``."""
+    rng = random.Random(seed)
+    through = Vendor.services_offered.through
+    start = (Vendor.objects.aggregate(last_id=Max('id'))['last_id'] or 0) + 1
+    batch = []
+    for vendor in build_vendors(count, seed=seed, start=start):
+        batch.append(vendor)
+        if len(batch) >= batch_size:
+            _flush(batch, through, services, rng, batch_size)
+            batch = []
+    if batch:
+        _flush(batch, through, services, rng, batch_size)
+
+
+def _flush(batch, through, services, rng, batch_size):
+    Vendor.objects.bulk_create(batch, batch_size=batch_size)
+    if not services:
+        return
+    links = []
+    for vendor in batch:
+        for service in rng.sample(services, min(len(services), rng.randint(1, 3))):
+            links.append(through(vendor_id=vendor.pk, service_id=service.pk))
+    through.objects.bulk_create(links, batch_size=batch_size)
@@ -0,0 +1,42 @@
+import urllib.error
+import urllib.request
+
+from backend.response_cache import invalidate
+from jobs.queue import task
+from .models import Vendor
+
+LOGO_CHECK_TIMEOUT = 10
+
+
+def logo_available(url):
+    """
+    Whether ``url`` answers a HEAD request with a success status. Timeouts and
+    server errors are raised, so the check is retried later.
+    """
+    request = urllib.request.Request(url, method='HEAD', headers={'User-Agent': 'vendor-logo-check'})
+    try:
+        with urllib.request.urlopen(request, timeout=LOGO_CHECK_TIMEOUT) as response:
+            return response.status < 400
+    except urllib.error.HTTPError as exc:
+        if exc.code >= 500:
+            raise
+        return False
+    except urllib.error.URLError as exc:
+        if isinstance(exc.reason, TimeoutError):
+            raise
+        return False
+    except ValueError:
+        return False
+
+
+@task(batch_size=20, max_attempts=4, retry_delay=60)
+def check_vendor_logos(payloads):
+    """Record whether the logo URL of each ``{"vendor_id": ...}`` vendor can be fetched."""
+    vendor_ids = {payload['vendor_id'] for payload in payloads}
+    vendors = Vendor.objects.filter(id__in=vendor_ids).exclude(vendor_logo_url=None).exclude(vendor_logo_url='')
+    for vendor_id, url in vendors.values_list('id', 'vendor_logo_url'):
+        available = logo_available(url)
+        # Skipped if the URL changed meanwhile; that change queued a new check
+        if Vendor.objects.filter(id=vendor_id, vendor_logo_url=url).update(
+                vendor_logo_available=available, vendor_logo_checked_url=url):
+            invalidate(f'vendor:{vendor_id}')
@@ -1,13 +1,36 @@
-from django.test import TestCase
+import os
+import tempfile
+import urllib.error
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from backend.fast_serializers import ValuesSerializer
+from backend.normalize import parse_print_prices
+from backend.renderers import FastJSONRenderer
+from jobs.models import Job
+from jobs.queue import Worker
+from .caches import LoadedCache
 from .models import Vendor
+from .search import SEARCH_INDEX_MAX_AGE, SERVICE_FIELD_WEIGHTS, InvertedIndex, PrefixIndex, catalog_index
+from .serializers import VendorListSerializer, VendorSerializer
+from .service_index import service_index
+from .signals import refresh_vendors
+from .views import VendorExportView
 from services.models import Service
 import json
 
 class VendorViewsTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.vendor_data = {
             "business_name": "Test Vendor",
@@ -25,6 +48,7 @@ class VendorViewsTestCase(TestCase):
         }
         self.vendor = Vendor.objects.create(**self.vendor_data)
         self.service = Service.objects.create(name="Test Service")
+        catalog_index.reset()
 
     def test_create_vendor(self):
         url = reverse('vendor-register')  # Changed from 'vendor-create' to 'vendor-register'
@@ -47,6 +71,49 @@ class VendorViewsTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['business_name'], self.vendor.business_name)
 
+    def test_read_endpoint_errors(self):
+        response = self.client.get(reverse('vendor-detail', kwargs={'pk': self.vendor.pk + 1}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('vendor-service-search'), {'page': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('vendor-list'))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_values_serializer_matches_model_serializer(self):
+        self.vendor.reviews_and_ratings = "4.5/5 based on 100 reviews \u2028"
+        self.vendor.pricing_information = "$0.10/page"
+        self.vendor.save()
+        self.vendor.services_offered.set([self.service, Service.objects.create(name="Binding", pricing="$2")])
+        vendors = Vendor.objects.with_services().order_by('id')
+        for fields, expand in ((None, ()), (['compact'], ()), (['id', 'rating_avg'], ['services'])):
+            for serializer_class in (VendorSerializer, VendorListSerializer):
+                expected = serializer_class(vendors, many=True, fields=fields, expand=expand).data
+                actual = ValuesSerializer(serializer_class(fields=fields, expand=expand)).serialize(vendors)
+                self.assertEqual(actual, expected)
+                self.assertEqual(FastJSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_export_streams_json_lines(self):
+        for index in range(4):
+            Vendor.objects.create(**{**self.vendor_data, 'contact_email': f'vendor{index}@example.com'})
+        with mock.patch.object(VendorExportView, 'chunk_size', 2):
+            response = self.client.get(reverse('vendor-export'), {'fields': 'id,business_name'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            # Read a chunk at a time by WSGI servers, not buffered
+            self.assertFalse(response.is_async)
+            chunks = list(response.streaming_content)
+        records = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        ids = list(Vendor.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(records, [{'id': pk, 'business_name': 'Test Vendor'} for pk in ids])
+
+    async def test_export_streams_asynchronously_over_asgi(self):
+        with mock.patch.object(VendorExportView, 'chunk_size', 2):
+            response = await AsyncClient().get(reverse('vendor-export'), {'fields': 'id'})
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(b''.join(chunks), f'{{"id":{self.vendor.pk}}}\n'.encode())
+
     def test_update_vendor(self):
         url = reverse('vendor-edit', kwargs={'pk': self.vendor.pk})  # Changed from 'vendor-update' to 'vendor-edit'
         updated_data = {
@@ -66,6 +133,43 @@ class VendorViewsTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Vendor.objects.count(), 0)
 
+    def test_derived_data_is_refreshed_after_the_response(self):
+        catalog_index.rebuild()
+        url = reverse('vendor-edit', kwargs={'pk': self.vendor.pk})
+        data = {'business_name': 'Renamed Vendor', 'services_offered_ids': [self.service.id]}
+        with mock.patch('vendors.signals.refresh_vendors', wraps=refresh_vendors) as refresh:
+            response = self.client.patch(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The save and the service links are refreshed together
+        refresh.assert_called_once_with([self.vendor.pk])
+        self.assertEqual(catalog_index.search_vendors('renamed'), (1, [self.vendor.pk]))
+
+    def test_logo_urls_are_checked_in_the_background(self):
+        self.vendor.vendor_logo_url = 'https://example.com/logo.png'
+        self.vendor.save()
+        self.vendor.save()
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.payload), ('vendors.tasks.check_vendor_logos', {'vendor_id': self.vendor.pk}))
+
+        with mock.patch('vendors.tasks.urllib.request.urlopen') as urlopen:
+            urlopen.return_value.__enter__.return_value.status = 200
+            self.assertEqual(Worker().run_once(), 1)
+        self.assertEqual(urlopen.call_args[0][0].get_method(), 'HEAD')
+        self.vendor.refresh_from_db()
+        self.assertTrue(self.vendor.vendor_logo_available)
+        self.vendor.save()
+        self.assertFalse(Job.objects.exists())
+
+        self.vendor.vendor_logo_url = 'https://example.com/missing.png'
+        self.vendor.save()
+        error = urllib.error.HTTPError(self.vendor.vendor_logo_url, 404, 'Not Found', {}, None)
+        with mock.patch('vendors.tasks.urllib.request.urlopen', side_effect=error):
+            with self.captureOnCommitCallbacks(execute=True):
+                Worker().run_once()
+        response = self.client.get(reverse('vendor-detail', kwargs={'pk': self.vendor.pk}))
+        self.assertIs(response.data['vendor_logo_available'], False)
+        self.assertNotIn('vendor_logo_checked_url', response.data)
+
     def test_vendor_service_search(self):
         url = reverse('vendor-service-search')
         response = self.client.get(url, {'q': 'Test'})
@@ -74,4 +178,359 @@ class VendorViewsTestCase(TestCase):
         self.assertEqual(len(data['vendors']), 1)
         self.assertEqual(len(data['services']), 1)
         self.assertEqual(data['vendors'][0]['business_name'], 'Test Vendor')
-        self.assertEqual(data['services'][0]['name'], 'Test Service')
\ No newline at end of file
+        self.assertEqual(data['services'][0]['name'], 'Test Service')
+
+    def test_vendor_service_search_ranking(self):
+        Vendor.objects.create(**{
+            **self.vendor_data,
+            'business_name': 'Corner Copies',
+            'contact_email': 'corner@example.com',
+            'address': '1 Test Plaza',
+        })
+        self.vendor.services_offered.add(Service.objects.create(name="Binding"))
+        url = reverse('vendor-service-search')
+
+        response = self.client.get(url, {'q': 'test'})
+        names = [vendor['business_name'] for vendor in response.data['vendors']]
+        self.assertEqual(names, ['Test Vendor', 'Corner Copies'])
+
+        # Prefixes match, and vendors are found by the services they offer
+        response = self.client.get(url, {'q': 'bind'})
+        self.assertEqual([vendor['business_name'] for vendor in response.data['vendors']], ['Test Vendor'])
+        self.assertEqual([service['name'] for service in response.data['services']], ['Binding'])
+
+        self.vendor.delete()
+        response = self.client.get(url, {'q': 'test vendor'})
+        self.assertEqual(response.data['vendor_count'], 0)
+
+    def test_search_index_picks_up_other_writes_once_expired(self):
+        url = reverse('vendor-service-search')
+        self.assertEqual(self.client.get(url, {'q': 'druckerei'}).data['vendor_count'], 0)
+        # Bulk writes send no signals, so the index only sees them once rebuilt
+        Vendor.objects.bulk_create([Vendor(**{
+            **self.vendor_data,
+            'business_name': 'Druckerei Müller',
+            'contact_email': 'mueller@example.com',
+        })])
+        self.assertEqual(self.client.get(url, {'q': 'druckerei'}).data['vendor_count'], 0)
+        catalog_index.built_at -= SEARCH_INDEX_MAX_AGE
+        response = self.client.get(url, {'q': 'müller'})
+        self.assertEqual([vendor['business_name'] for vendor in response.data['vendors']], ['Druckerei Müller'])
+
+    def test_vendor_service_suggest(self):
+        url = reverse('vendor-service-suggest')
+        response = self.client.get(url, {'q': 'te'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['vendors'], [{'id': self.vendor.id, 'business_name': 'Test Vendor'}])
+        self.assertEqual(response.data['services'], [{'id': self.service.id, 'name': 'Test Service'}])
+
+        # Any word of a name can be completed, and writes are reflected at once
+        self.vendor.business_name = 'Corner Copies'
+        self.vendor.save()
+        response = self.client.get(url, {'q': 'cop'})
+        self.assertEqual(response.data['vendors'], [{'id': self.vendor.id, 'business_name': 'Corner Copies'}])
+        self.assertEqual(self.client.get(url, {'q': 'test v'}).data['vendors'], [])
+
+        self.service.delete()
+        self.assertEqual(self.client.get(url, {'q': 'test'}).data['services'], [])
+
+    def test_vendor_service_search_pagination(self):
+        url = reverse('vendor-service-search')
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['vendor_count'], 1)
+        self.assertEqual(len(response.data['vendors']), 1)
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.data['vendors'], [])
+        self.assertIsNotNone(response.data['previous'])
+
+        response = self.client.get(url, {'page': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class VendorQueryCountTestCase(TestCase):
+    """The number of queries per endpoint must not grow with the number of vendors."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.services = [Service.objects.create(name=f"Test Service {i}") for i in range(3)]
+        self.vendor_count = 0
+        catalog_index.reset()
+        service_index.clear()
+
+    def add_vendors(self, count):
+        for _ in range(count):
+            self.vendor_count += 1
+            vendor = Vendor.objects.create(
+                business_name=f"Test Vendor {self.vendor_count}",
+                contact_person="John Doe",
+                contact_email=f"vendor{self.vendor_count}@example.com",
+                contact_phone_number="1234567890",
+                address="123 Test St, Test City",
+                location_latitude="40.712776",
+                location_longitude="-74.005974",
+                business_hours="9AM-5PM",
+                accepted_file_formats="PDF, JPEG",
+                pricing_information="Standard rates apply",
+                payment_methods="Credit Card, PayPal",
+                terms_and_conditions="Standard terms apply"
+            )
+            vendor.services_offered.set(self.services)
+
+    def count_queries(self, url, params=None):
+        # Warm up in-process indexes and caches before counting
+        self.client.get(url, params)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def assertConstantQueries(self, url, params=None):
+        self.add_vendors(1)
+        expected = self.count_queries(url, params)
+        self.add_vendors(9)
+        self.assertEqual(self.count_queries(url, params), expected)
+
+    def test_list_vendors(self):
+        self.assertConstantQueries(reverse('vendor-list'))
+
+    def test_vendor_service_search(self):
+        self.assertConstantQueries(reverse('vendor-service-search'), {'q': 'Test'})
+
+    def test_vendors_by_service(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.services[0].id})
+        self.assertConstantQueries(url, {'latitude': '40.712776', 'longitude': '-74.005974'})
+
+    def test_nearest_vendors_by_service(self):
+        url = reverse('vendors-by-service', kwargs={'service_id': self.services[0].id})
+        self.assertConstantQueries(url, {'latitude': '40.712776', 'longitude': '-74.005974', 'limit': 20})
+
+    def test_retrieve_vendor(self):
+        self.add_vendors(1)
+        url = reverse('vendor-detail', kwargs={'pk': Vendor.objects.get().pk})
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+def oversized_print_prices(text):
+    """``parse_print_prices``, with a rate too large for its column for the text "Oversized"."""
+    if text == 'Oversized':
+        return Decimal('12345678'), None, None, 'INR'
+    return parse_print_prices(text)
+
+
+class ImportVendorsCommandTestCase(TestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Test Service")
+        self.record = {
+            "business_name": "Test Vendor",
+            "contact_person": "John Doe",
+            "contact_email": "john@example.com",
+            "contact_phone_number": "1234567890",
+            "address": "123 Test St, Test City",
+            "location_latitude": 40.7128,
+            "location_longitude": -74.006,
+            "business_hours": "9AM-5PM",
+            "services_offered_ids": [self.service.id],
+            "accepted_file_formats": "PDF, JPEG",
+            "pricing_information": "Standard rates apply",
+            "payment_methods": "Credit Card, PayPal",
+            "terms_and_conditions": "Standard terms apply",
+            "insurance_certifications": "Ignored"
+        }
+
+    def import_file(self, content, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, stream.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_vendors', stream.name, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_json_array(self):
+        records = [
+            self.record,
+            {**self.record, "contact_email": "jane@example.com", "services_offered_ids": "Binding, Scanning"},
+            {**self.record, "contact_email": "john@example.com"},
+            {**self.record, "contact_email": "ann@example.com", "business_name": "Second Vendor"},
+        ]
+        out, err = self.import_file(json.dumps(records, indent=2), batch_size=2)
+        self.assertIn('Imported 2 vendors, rejected 2 records', out)
+        self.assertIn('Record 2: {"services_offered_ids"', err)
+        self.assertIn('Record 3: {"contact_email"', err)
+
+        vendor = Vendor.objects.get(contact_email="john@example.com")
+        self.assertEqual(str(vendor.location_latitude), '40.712800')
+        self.assertTrue(vendor.geohash)
+        self.assertEqual(list(vendor.services_offered.all()), [self.service])
+        self.assertTrue(Vendor.objects.filter(business_name="Second Vendor").exists())
+
+    def test_import_json_lines(self):
+        lines = [json.dumps(self.record), '{"business_name": ', json.dumps({**self.record, "contact_email": ""})]
+        out, err = self.import_file('\n'.join(lines) + '\n')
+        self.assertIn('Imported 1 vendors, rejected 2 records', out)
+        self.assertIn('Record 2: {"record": ["Invalid JSON', err)
+        self.assertIn('Record 3: {"contact_email"', err)
+
+    def test_import_reports_derived_values_that_do_not_fit(self):
+        records = [
+            self.record,
+            {**self.record, "contact_email": "jane@example.com", "pricing_information": "Oversized"},
+            {**self.record, "contact_email": "ann@example.com", "location_latitude": "north"},
+        ]
+        with mock.patch('vendors.models.parse_print_prices', side_effect=oversized_print_prices):
+            out, err = self.import_file(json.dumps(records))
+        self.assertIn('Imported 1 vendors, rejected 2 records', out)
+        self.assertIn('Record 2: {"price_per_page"', err)
+        self.assertIn('Record 3: {"location_latitude"', err)
+        self.assertEqual(list(Vendor.objects.values_list('contact_email', flat=True)), ["john@example.com"])
+
+
+class VendorBatchViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.services = [Service.objects.create(name=f"Test Service {i}") for i in range(3)]
+        self.vendor_data = {
+            "business_name": "Test Vendor",
+            "contact_person": "John Doe",
+            "contact_email": "john@example.com",
+            "contact_phone_number": "1234567890",
+            "address": "123 Test St, Test City",
+            "location_latitude": "40.712776",
+            "location_longitude": "-74.005974",
+            "business_hours": "9AM-5PM",
+            "accepted_file_formats": "PDF, JPEG",
+            "pricing_information": "Standard rates apply",
+            "payment_methods": "Credit Card, PayPal",
+            "terms_and_conditions": "Standard terms apply"
+        }
+        self.vendor = Vendor.objects.create(**self.vendor_data)
+        self.vendor.services_offered.set(self.services[:2])
+
+    def test_batch_upserts_and_links(self):
+        service_ids = [service.id for service in self.services]
+        operations = [
+            {'op': 'upsert', 'vendor': {**self.vendor_data, 'business_name': 'Renamed Vendor'}},
+            {'op': 'upsert', 'vendor': {
+                **self.vendor_data, 'contact_email': 'new@example.com', 'services_offered_ids': service_ids[1:]
+            }},
+            {'op': 'link', 'vendor_id': self.vendor.id, 'add': [service_ids[2]], 'remove': [service_ids[0]]},
+            {'op': 'upsert', 'vendor': {**self.vendor_data, 'contact_email': 'not-an-email'}},
+            {'op': 'link', 'vendor_id': 0, 'add': [service_ids[0]]},
+            {'op': 'delete'},
+        ]
+        response = self.client.post(reverse('vendor-batch'), operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        created = Vendor.objects.get(contact_email='new@example.com')
+        self.assertEqual(results[0], {'status': 'updated', 'id': self.vendor.id})
+        self.assertEqual(results[1], {'status': 'created', 'id': created.id})
+        self.assertEqual(results[2], {'status': 'linked', 'id': self.vendor.id})
+        self.assertEqual([result['status'] for result in results[3:]], ['error'] * 3)
+        self.assertIn('contact_email', results[3]['errors'])
+
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.business_name, 'Renamed Vendor')
+        self.assertEqual(set(self.vendor.services_offered.all()), set(self.services[1:]))
+        self.assertEqual(set(created.services_offered.all()), set(self.services[1:]))
+        self.assertTrue(created.geohash)
+
+        # Derived data is refreshed although bulk writes skip model signals
+        url = reverse('vendor-service-suggest')
+        self.assertEqual(self.client.get(url, {'q': 'renamed'}).data['vendors'][0]['id'], self.vendor.id)
+
+    def test_batch_reports_derived_values_that_do_not_fit(self):
+        operations = [
+            {'op': 'upsert', 'vendor': {**self.vendor_data, 'pricing_information': 'Oversized'}},
+            {'op': 'upsert', 'vendor': {**self.vendor_data, 'contact_email': 'new@example.com'}},
+        ]
+        with mock.patch('vendors.models.parse_print_prices', side_effect=oversized_print_prices):
+            response = self.client.post(reverse('vendor-batch'), operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertIn('price_per_page', results[0]['errors'])
+        self.assertEqual(results[1]['status'], 'created')
+
+    def test_batch_rejects_non_list(self):
+        response = self.client.post(reverse('vendor-batch'), {'op': 'upsert'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BenchApiCommandTestCase(TestCase):
+    def bench(self, **options):
+        out = StringIO()
+        call_command('bench_api', vendors=20, requests=3, stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_baseline_comparison(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as baseline:
+            pass
+        self.addCleanup(os.remove, baseline.name)
+        out = self.bench(endpoints=['detail', 'create'], save_baseline=baseline.name)
+        self.assertIn('Saved baseline', out)
+        self.assertFalse(Vendor.objects.exists())
+
+        with open(baseline.name) as stream:
+            results = json.load(stream)
+        self.assertEqual(set(results['endpoints']), {'detail', 'create'})
+        for result in results['endpoints'].values():
+            result['p50_ms'] = 10 ** 6
+        with open(baseline.name, 'w') as stream:
+            json.dump(results, stream)
+        self.assertIn('No regressions', self.bench(endpoints=['detail'], baseline=baseline.name))
+
+        for result in results['endpoints'].values():
+            result['p50_ms'] = 0
+        with open(baseline.name, 'w') as stream:
+            json.dump(results, stream)
+        with self.assertRaisesMessage(CommandError, 'detail p50'):
+            self.bench(endpoints=['detail'], baseline=baseline.name)
+
+
+class LoadedCacheTestCase(SimpleTestCase):
+    def test_loads_racing_with_a_write_are_not_cached(self):
+        cache = LoadedCache(max_size=2, ttl=60)
+
+        def load():
+            cache.invalidate(['other'])
+            return 'stale'
+
+        self.assertEqual(cache.get('key', load), 'stale')
+        self.assertNotIn('key', cache.entries)
+        self.assertEqual(cache.get('key', lambda: 'fresh'), 'fresh')
+        self.assertEqual(cache.get('key', lambda: 'unused'), 'fresh')
+        cache.update(lambda key, value: value.upper())
+        self.assertEqual(cache.get('key', lambda: 'unused'), 'FRESH')
+
+        # The least recently used entries go first
+        cache.get('second', lambda: 2)
+        cache.get('key', lambda: 'unused')
+        cache.get('third', lambda: 3)
+        self.assertEqual(list(cache.entries), ['key', 'third'])
+
+
+class SearchIndexTestCase(SimpleTestCase):
+    def test_bulk_adds_match_single_adds(self):
+        names = [(3, 'Quick Print Shop'), (1, 'Print Hub'), (2, 'The Copy Shop'), (1, 'Printing Hub')]
+        documents = [(doc_id, {'name': name, 'description': 'Copies'}) for doc_id, name in names]
+        prefixes, bulk_prefixes = PrefixIndex(), PrefixIndex()
+        tokens, bulk_tokens = InvertedIndex(SERVICE_FIELD_WEIGHTS), InvertedIndex(SERVICE_FIELD_WEIGHTS)
+        for doc_id, name in names:
+            prefixes.add(doc_id, name)
+        for doc_id, fields in documents:
+            tokens.add(doc_id, fields)
+        bulk_prefixes.add_many(names)
+        bulk_tokens.add_many(documents)
+        self.assertEqual(bulk_prefixes.entries, prefixes.entries)
+        self.assertEqual(bulk_tokens.tokens, tokens.tokens)
+        self.assertEqual(bulk_prefixes.suggest('print', 5), [(3, 'Quick Print Shop'), (1, 'Printing Hub')])
+
+        # Single updates keep the bulk-built arrays sorted
+        bulk_prefixes.add(2, 'Shop Direct')
+        bulk_tokens.add(2, {'name': 'Shop Direct', 'description': ''})
+        self.assertEqual(bulk_prefixes.entries, sorted(bulk_prefixes.entries))
+        self.assertEqual(bulk_tokens.tokens, sorted(bulk_tokens.postings))
+        self.assertEqual(bulk_tokens.search('sh'), (2, [2, 3]))
@@ -1,11 +1,17 @@
 from django.urls import path
-from .views import VendorCreateView, VendorDetailView, VendorListView, VendorUpdateView, VendorDeleteView, VendorServiceSearchView
+from .views import (
+    VendorBatchView, VendorCreateView, VendorDeleteView, VendorDetailView, VendorExportView, VendorListView,
+    VendorServiceSearchView, VendorServiceSuggestView, VendorUpdateView,
+)
 
 urlpatterns = [
     path('register/', VendorCreateView.as_view(), name='vendor-register'),
     path('<int:pk>/', VendorDetailView.as_view(), name='vendor-detail'),  # Retrieve a specific vendor by ID
     path('', VendorListView.as_view(), name='vendor-list'),  # List all vendors
+    path('export/', VendorExportView.as_view(), name='vendor-export'),  # Stream all vendors as JSON Lines
     path('<int:pk>/edit/', VendorUpdateView.as_view(), name='vendor-edit'),
     path('<int:pk>/delete/', VendorDeleteView.as_view(), name='vendor-delete'),
+    path('batch/', VendorBatchView.as_view(), name='vendor-batch'),  # Bulk upserts and service links
     path('search/', VendorServiceSearchView.as_view(), name='vendor-service-search'),  # Search URL
+    path('suggest/', VendorServiceSuggestView.as_view(), name='vendor-service-suggest'),  # Autocomplete URL
 ]
\ No newline at end of file
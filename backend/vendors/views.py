@@ -1,7 +1,17 @@
+from django.db import transaction
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from backend.fast_serializers import ValuesSerializer
+from backend.instrumentation import serialization_timer
+from backend.response_cache import CachedResponseMixin
+from backend.sparse_fields import SparseFieldsViewMixin
+from backend.streaming import EXPORT_CHUNK_SIZE, json_lines_response
+from .bulk import apply_batch
 from .models import Vendor
-from .serializers import VendorSerializer
+from .search import catalog_index
+from .serializers import VendorListSerializer, VendorSerializer
 from services.models import Service
 from services.serializers import ServiceSerializer
 
@@ -20,13 +30,34 @@ class VendorCreateView(generics.CreateAPIView):
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class VendorListView(generics.ListAPIView):
+class VendorListView(SparseFieldsViewMixin, generics.ListAPIView):
+    queryset = Vendor.objects.all()
+    serializer_class = VendorListSerializer
+
+    def list(self, request, *args, **kwargs):
+        # Serialized from .values() rows, skipping model instances
+        serializer = ValuesSerializer(self.get_serializer())
+        return Response(serializer.serialize(self.queryset))
+
+class VendorDetailView(CachedResponseMixin, SparseFieldsViewMixin, generics.RetrieveAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
 
-class VendorDetailView(generics.RetrieveAPIView):
+    def get_queryset(self):
+        return self.sparse_queryset(self.queryset)
+
+    def get_cache_scopes(self):
+        return [f"vendor:{self.kwargs['pk']}"]
+
+class VendorExportView(SparseFieldsViewMixin, generics.GenericAPIView):
+    """Every vendor as JSON Lines, streamed in primary-key order."""
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
+    chunk_size = EXPORT_CHUNK_SIZE
+
+    def get(self, request, *args, **kwargs):
+        serializer = ValuesSerializer(self.get_serializer())
+        return json_lines_response(request, serializer, self.get_queryset(), 'vendors.jsonl', self.chunk_size)
 
 class VendorUpdateView(generics.UpdateAPIView):
     queryset = Vendor.objects.all()
@@ -37,33 +68,103 @@ class VendorUpdateView(generics.UpdateAPIView):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        
-        services_offered_ids = request.data.get('services_offered_ids')
-        if services_offered_ids is not None:
-            instance.services_offered.set(Service.objects.filter(id__in=services_offered_ids))
-        
-        self.perform_update(serializer)
+
+        # Save first so a failed update leaves the service links untouched
+        with transaction.atomic():
+            self.perform_update(serializer)
+            services_offered_ids = request.data.get('services_offered_ids')
+            if services_offered_ids is not None:
+                instance.services_offered.set(Service.objects.filter(id__in=services_offered_ids))
         return Response(serializer.data)
 
 class VendorDeleteView(generics.DestroyAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
 
-class VendorServiceSearchView(generics.ListAPIView):
-    vendor_serializer_class = VendorSerializer
+class VendorBatchView(generics.GenericAPIView):
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of operations.')
+        if len(items) > self.max_batch_size:
+            raise ValidationError(f'At most {self.max_batch_size} operations per batch.')
+        return Response({'results': apply_batch(items)})
+
+class VendorServiceSearchView(SparseFieldsViewMixin, generics.ListAPIView):
+    serializer_class = VendorListSerializer
     service_serializer_class = ServiceSerializer
 
-    def get_queryset(self):
+    page_size = 20
+    max_page_size = 100
+
+    def get_page(self):
+        try:
+            page = int(self.request.query_params.get('page', 1))
+            page_size = int(self.request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            raise ValidationError('page and page_size must be integers.')
+        if page < 1 or not 1 <= page_size <= self.max_page_size:
+            raise ValidationError(f'page must be positive and page_size between 1 and {self.max_page_size}.')
+        return page, page_size
+
+    def get_ids(self):
+        """Return ``(count, ids)`` for the vendors and services on the requested page."""
         query = self.request.query_params.get('q', None)
-        vendors = Vendor.objects.filter(business_name__icontains=query) if query else Vendor.objects.all()
-        services = Service.objects.filter(name__icontains=query) if query else Service.objects.all()
-        return vendors, services
+        page, page_size = self.get_page()
+        start, end = (page - 1) * page_size, page * page_size
+        if query:
+            # Ranked ids from the in-process search index, best match first
+            vendor_count, vendor_ids = catalog_index.search_vendors(query, limit=end)
+            service_count, service_ids = catalog_index.search_services(query, limit=end)
+            return (vendor_count, vendor_ids[start:end]), (service_count, service_ids[start:end])
+        return (
+            (Vendor.objects.count(), list(Vendor.objects.order_by('id').values_list('id', flat=True)[start:end])),
+            (Service.objects.count(), list(Service.objects.order_by('id').values_list('id', flat=True)[start:end]))
+        )
+
+    def get_objects(self, queryset, ids):
+        objects = queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+    def get_vendor_data(self, ids):
+        serializer = ValuesSerializer(self.get_serializer())
+        rows = serializer.in_bulk(Vendor.objects.all(), ids)
+        return serializer.represent([rows[pk] for pk in ids if pk in rows])
 
     def list(self, request, *args, **kwargs):
-        vendors, services = self.get_queryset()
-        vendor_data = self.vendor_serializer_class(vendors, many=True).data
-        service_data = self.service_serializer_class(services, many=True).data
+        (vendor_count, vendor_ids), (service_count, service_ids) = self.get_ids()
+        page, page_size = self.get_page()
+        services = self.get_objects(Service.objects.all(), service_ids)
+
+        vendor_data = self.get_vendor_data(vendor_ids)
+        with serialization_timer():
+            service_data = self.service_serializer_class(services, many=True).data
+        url = request.build_absolute_uri()
+        has_next = page * page_size < max(vendor_count, service_count)
         return Response({
+            'vendor_count': vendor_count,
+            'service_count': service_count,
+            'next': replace_query_param(url, 'page', page + 1) if has_next else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
             'vendors': vendor_data,
             'services': service_data
-        })
\ No newline at end of file
+        })
+
+class VendorServiceSuggestView(generics.ListAPIView):
+    default_limit = 8
+    max_limit = 20
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        # Answered from the in-process prefix index only, without touching the database
+        vendors, services = catalog_index.suggest(query, max(limit, 1))
+        return Response({
+            'vendors': [{'id': pk, 'business_name': name} for pk, name in vendors],
+            'services': [{'id': pk, 'name': name} for pk, name in services]
+        })